@@ -1,24 +1,149 @@
 from flask import Flask, request, jsonify, render_template, send_from_directory
-from flask import redirect, url_for, Response, session
+from flask import redirect, url_for, Response, session, g
 import os
+import sys
 import logging
 import json
 import requests
 import time
 import secrets
+import random
+import threading
+import bisect
+import heapq
+import re
+import base64
+import codecs
+import mmap
+import struct
+from array import array
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 from threading import Timer
 from pathlib import Path
+from contextlib import contextmanager
+from types import MappingProxyType
+from collections import deque, Counter
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: no cross-worker file locks
+    fcntl = None
 
 # Persistent config paths for Render
-RENDER_CONFIG_DIR = '/opt/render/project/config'
+RENDER_CONFIG_DIR = os.getenv('RENDER_CONFIG_DIR', '/opt/render/project/config')
 RENDER_CONFIG_PATH = os.path.join(RENDER_CONFIG_DIR, 'config.json')
 LOCATION_CACHE_DIR = os.path.join(RENDER_CONFIG_DIR, 'location_cache')
 LOCATION_CACHE_METADATA = os.path.join(RENDER_CONFIG_DIR, 'location_cache_metadata.json')
 CACHE_REFRESH_INTERVAL = 24 * 60 * 60  # 1 day in seconds
 
+# Outbound rate limiting (per tenant token bucket, can be overridden per tenant
+# with "rate_limit_per_second" / "rate_limit_burst" in the tenant config)
+RATE_LIMIT_PER_SECOND = float(os.getenv('ALCHEMY_RATE_LIMIT_PER_SECOND', '10'))
+RATE_LIMIT_BURST = float(os.getenv('ALCHEMY_RATE_LIMIT_BURST', '20'))
+RATE_LIMIT_MIN_PER_SECOND = float(os.getenv('ALCHEMY_RATE_LIMIT_MIN_PER_SECOND', '0.5'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('ALCHEMY_RATE_LIMIT_MAX_WAIT', '30'))  # seconds
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('ALCHEMY_RATE_LIMIT_MAX_RETRIES', '2'))
+
+# Circuit breakers per (tenant, endpoint)
+CIRCUIT_FAILURE_RATIO = float(os.getenv('ALCHEMY_CIRCUIT_FAILURE_RATIO', '0.5'))
+CIRCUIT_MIN_REQUESTS = int(os.getenv('ALCHEMY_CIRCUIT_MIN_REQUESTS', '10'))
+CIRCUIT_WINDOW_SIZE = int(os.getenv('ALCHEMY_CIRCUIT_WINDOW_SIZE', '20'))
+CIRCUIT_OPEN_SECONDS = float(os.getenv('ALCHEMY_CIRCUIT_OPEN_SECONDS', '30'))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv('ALCHEMY_CIRCUIT_HALF_OPEN_PROBES', '1'))
+QUEUE_UPDATES_WHEN_CIRCUIT_OPEN = os.getenv('QUEUE_UPDATES_WHEN_CIRCUIT_OPEN', 'false').lower() == 'true'
+PENDING_UPDATES_DIR = os.path.join(RENDER_CONFIG_DIR, 'pending_updates')
+# Queued updates that fail in a way that may pass later are retried with exponential backoff
+PENDING_UPDATE_RETRY_DELAY = float(os.getenv('PENDING_UPDATE_RETRY_DELAY', '30'))  # seconds
+PENDING_UPDATE_MAX_RETRY_DELAY = float(os.getenv('PENDING_UPDATE_MAX_RETRY_DELAY', '3600'))  # seconds
+
+# Per-route time budgets in seconds (can be overridden with "route_time_budgets" in config.json).
+# Every outbound call made while serving the route gets the remaining budget as its timeout.
+ROUTE_TIME_BUDGETS = {
+    "update_location": float(os.getenv('UPDATE_LOCATION_TIME_BUDGET', '25')),
+    "get_locations": float(os.getenv('GET_LOCATIONS_TIME_BUDGET', '10')),
+    "refresh_location_cache": float(os.getenv('REFRESH_LOCATION_CACHE_TIME_BUDGET', '120'))
+}
+# Timeout for outbound calls that are not bound to a route deadline
+DEFAULT_OUTBOUND_TIMEOUT = float(os.getenv('ALCHEMY_DEFAULT_TIMEOUT', '30'))
+
+# Hedged barcode lookups (opt-in globally or per tenant with "hedge_lookups": true).
+# Only read-only endpoints may ever be hedged.
+HEDGE_LOOKUPS = os.getenv('ALCHEMY_HEDGE_LOOKUPS', 'false').lower() == 'true'
+HEDGEABLE_ENDPOINTS = ('find-records',)
+HEDGE_PERCENTILE = float(os.getenv('ALCHEMY_HEDGE_PERCENTILE', '95'))
+HEDGE_MIN_DELAY = float(os.getenv('ALCHEMY_HEDGE_MIN_DELAY', '0.05'))  # seconds
+HEDGE_DEFAULT_DELAY = float(os.getenv('ALCHEMY_HEDGE_DEFAULT_DELAY', '1.0'))  # until enough samples exist
+HEDGE_MIN_SAMPLES = 20
+HEDGE_BUDGET_RATIO = float(os.getenv('ALCHEMY_HEDGE_BUDGET_RATIO', '0.1'))  # max extra calls per lookup
+LATENCY_SAMPLE_SIZE = 500
+
+# Outbound work scheduler: operator updates first, location reads next, background refreshes last
+PRIORITY_UPDATE = 0
+PRIORITY_READ = 1
+PRIORITY_REFRESH = 2
+PRIORITY_NAMES = {PRIORITY_UPDATE: "update", PRIORITY_READ: "read", PRIORITY_REFRESH: "refresh"}
+SCHEDULER_MAX_CONCURRENT = int(os.getenv('OUTBOUND_MAX_CONCURRENT', '8'))
+SCHEDULER_QUEUE_LIMITS = {
+    PRIORITY_UPDATE: int(os.getenv('OUTBOUND_UPDATE_QUEUE_LIMIT', '32')),
+    PRIORITY_READ: int(os.getenv('OUTBOUND_READ_QUEUE_LIMIT', '16')),
+    PRIORITY_REFRESH: int(os.getenv('OUTBOUND_REFRESH_QUEUE_LIMIT', '4'))
+}
+SCHEDULER_BACKGROUND_MAX_WAIT = 300  # seconds a background job may wait for a slot
+SCHEDULER_RETRY_AFTER = int(os.getenv('OUTBOUND_RETRY_AFTER', '5'))  # seconds, sent with 503 responses
+
+# Metrics served on /metrics to admins or with "Authorization: Bearer <METRICS_TOKEN>".
+# Each worker publishes its counters to METRICS_DIR so any worker can report the totals.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+METRICS_DIR = os.path.join(RENDER_CONFIG_DIR, 'metrics')
+METRICS_PUBLISH_INTERVAL = float(os.getenv('METRICS_PUBLISH_INTERVAL', '10'))  # seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Requests slower than this (seconds) are logged with their phase breakdown (0 disables)
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', '5'))
+
+# Barcode -> record ID lookups can be remembered for a short while (0, the default, disables)
+
+# Per-tenant bulkheads (can be adjusted per tenant in the admin panel)
+TENANT_MAX_IN_FLIGHT = int(os.getenv('TENANT_MAX_IN_FLIGHT', '4'))
+TENANT_POOL_SIZE = int(os.getenv('TENANT_POOL_SIZE', '4'))
+
 # Logging Configuration
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO), format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Per-barcode and payload logs on the request path: "debug" logs them only when
+# LOG_LEVEL is DEBUG, "sampled" logs a fraction of them at INFO, "verbose" logs them all
+HOT_PATH_LOG_MODE = os.getenv('HOT_PATH_LOG_MODE', 'debug').lower()
+HOT_PATH_LOG_SAMPLE_RATE = float(os.getenv('HOT_PATH_LOG_SAMPLE_RATE', '0.01'))
+
+class LazyLogValue:
+    """Log argument that is only computed when the message is actually formatted"""
+    __slots__ = ("func", "args")
+    
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+    
+    def __str__(self):
+        return str(self.func(*self.args))
+
+def should_log_hot_path():
+    """Whether the next per-item or payload log line should be written"""
+    if HOT_PATH_LOG_MODE == "verbose":
+        return True
+    if HOT_PATH_LOG_MODE == "sampled":
+        return random.random() < HOT_PATH_LOG_SAMPLE_RATE
+    return logging.getLogger().isEnabledFor(logging.DEBUG)
+
+def log_hot_path(message, *args):
+    """Log a per-item or payload line according to HOT_PATH_LOG_MODE; args are %-formatted lazily"""
+    if HOT_PATH_LOG_MODE == "debug":
+        logging.debug(message, *args)
+    elif should_log_hot_path():
+        logging.info(message, *args)
 
 # Flask Application Setup
 app = Flask(__name__, static_folder='static', template_folder='templates')
@@ -124,6 +249,16 @@ def ensure_config_file():
             return False
     return True
 
+def format_config_for_log(config):
+    """Render a config for the log with stored refresh tokens masked"""
+    redacted = dict(config)
+    redacted["tenants"] = {
+        tenant_id: {key: ("***" if key == "stored_refresh_token" and value else value)
+                    for key, value in tenant.items()}
+        for tenant_id, tenant in config.get("tenants", {}).items()
+    }
+    return json.dumps(redacted, indent=2)
+
 def load_config():
     """
     Load configuration with extensive diagnostics
@@ -153,12 +288,11 @@ def load_config():
         if os.path.exists(RENDER_CONFIG_PATH) and os.path.isfile(RENDER_CONFIG_PATH):
             try:
                 with open(RENDER_CONFIG_PATH, 'r') as f:
-                    # Read and log file contents
                     file_contents = f.read()
-                    logging.info(f"Raw file contents: {file_contents}")
                 
                 # Parse the contents
                 config = json.loads(file_contents)
+                logging.debug("Loaded config contents: %s", LazyLogValue(format_config_for_log, config))
                 
                 # Validate config structure
                 if config and 'tenants' in config:
@@ -202,31 +336,84 @@ def save_config(config):
         except Exception as dir_stat_error:
             logging.error(f"Error getting directory stats: {dir_stat_error}")
         
-        # Explicitly create the file ONLY in Render path
+        # Compare-and-swap on the version: only write over the version this worker
+        # loaded. Bump the version so other workers pick the change up, then write the
+        # new file next to the old one and swap it in, so readers never see a partial file
+        lock_file = acquire_config_file_lock()
+        temp_path = f"{RENDER_CONFIG_PATH}.{os.getpid()}.tmp"
         try:
-            with open(RENDER_CONFIG_PATH, 'w') as f:
+            on_disk = read_config_file() if os.path.exists(RENDER_CONFIG_PATH) else None
+            disk_version = on_disk.get("config_version", 0) if on_disk else 0
+            if on_disk is not None and disk_version != config_state["version"]:
+                logging.error(f"Config on disk is at version {disk_version} but this worker edited version "
+                              f"{config_state['version']}; not overwriting another worker's change")
+                return False
+            config["config_version"] = disk_version + 1
+            with open(temp_path, 'w') as f:
                 json.dump(config, f, indent=2)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, RENDER_CONFIG_PATH)
+            record_config_state(config)
         except PermissionError:
             logging.error(f"Permission denied when writing to {RENDER_CONFIG_PATH}")
             return False
         except IOError as io_error:
             logging.error(f"IO Error when saving config: {io_error}")
             return False
-        
-        # Set appropriate file permissions
-        try:
-            os.chmod(RENDER_CONFIG_PATH, 0o644)
-        except Exception as chmod_error:
-            logging.error(f"Error setting file permissions: {chmod_error}")
+        finally:
+            lock_file.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
         
         logging.info(f"Configuration successfully saved to {RENDER_CONFIG_PATH}")
-        logging.info(f"Saved config contents: {json.dumps(config, indent=2)}")
+        logging.debug("Saved config contents: %s", LazyLogValue(format_config_for_log, config))
         return True
     except Exception as e:
         logging.error(f"Unexpected error saving configuration: {str(e)}")
         logging.error(f"Current directory structure: {os.listdir(os.path.dirname(RENDER_CONFIG_PATH))}")
         return False
 
+# Config version and file identity this worker last loaded or wrote
+CONFIG_POLL_INTERVAL = float(os.getenv('CONFIG_POLL_INTERVAL', 5))
+# Fast startup: skip config work at import, load it on first use and run the
+# filesystem diagnostics in the background afterwards
+FAST_STARTUP = os.getenv('FAST_STARTUP', 'false').lower() == 'true'
+
+config_state = {"version": 0, "file_id": None, "watcher_pid": None}
+config_state_lock = threading.Lock()
+
+def get_config_file_id():
+    """Identify the current config file; os.replace gives every write a new inode"""
+    try:
+        file_stat = os.stat(RENDER_CONFIG_PATH)
+    except OSError:
+        return None
+    return (file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
+
+def acquire_config_file_lock():
+    """Take the cross-worker lock for writing the config file; close the returned file to release it"""
+    lock_file = open(f"{RENDER_CONFIG_PATH}.lock", 'w')
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+def config_save_failed_response():
+    """
+    Error response for a handler whose save_config failed. When another worker's change
+    got in first, this worker switches to it (dropping its unsaved edit) and answers 409.
+    """
+    if reload_config_if_changed():
+        return jsonify({
+            "status": "error",
+            "message": "The configuration was changed by another request, please reload and try again"
+        }), 409
+    return jsonify({"status": "error", "message": "Failed to save configuration"}), 500
+
+def record_config_state(config):
+    """Remember which config version and file this worker is running with"""
+    config_state["version"] = config.get("config_version", 0)
+    config_state["file_id"] = get_config_file_id()
+
 def create_default_config():
     """Create a default configuration if the config file is not found"""
     return {
@@ -250,15 +437,1145 @@ def create_default_config():
         }
     }
 
-# Load configuration
-ensure_config_file()
-CONFIG = load_config()
-DEFAULT_URLS = CONFIG["default_urls"]
-DEFAULT_TENANT = CONFIG["default_tenant"]
+# Configuration, loaded by init_config()
+CONFIG = None
+DEFAULT_URLS = None
+DEFAULT_TENANT = None
+
+# Precompiled read-only tenant configs, rebuilt by rebuild_tenant_configs()
+tenant_configs = MappingProxyType({})
+
+def build_tenant_config(tenant_id, tenant):
+    """Resolve one tenant's settings, token and URLs into a read-only config"""
+    tenant_config = {
+        "tenant_id": tenant_id,
+        "tenant_name": tenant.get("tenant_name"),
+        "display_name": tenant.get("display_name", tenant.get("tenant_name")),
+        "description": tenant.get("description", ""),
+        "button_class": tenant.get("button_class", "primary"),
+    }
+    
+    # Check for a directly stored refresh token first
+    if "stored_refresh_token" in tenant and tenant["stored_refresh_token"]:
+        tenant_config["refresh_token"] = tenant["stored_refresh_token"]
+    else:
+        # Fall back to environment variable
+        tenant_config["refresh_token"] = os.getenv(tenant.get("env_token_var"))
+    
+    # Add URLs based on config
+    if tenant.get("use_custom_urls") and "custom_urls" in tenant:
+        tenant_config.update({
+            "refresh_url": tenant["custom_urls"].get("refresh_url"),
+            "api_url": tenant["custom_urls"].get("api_url"),
+            "filter_url": tenant["custom_urls"].get("filter_url"),
+            "find_records_url": tenant["custom_urls"].get("find_records_url"),
+            "base_url": tenant["custom_urls"].get("base_url")
+        })
+    else:
+        tenant_config.update({
+            "refresh_url": DEFAULT_URLS["refresh_url"],
+            "api_url": DEFAULT_URLS["api_url"],
+            "filter_url": DEFAULT_URLS["filter_url"],
+            "find_records_url": DEFAULT_URLS["find_records_url"],
+            "base_url": DEFAULT_URLS["base_url"]
+        })
+    
+    return MappingProxyType(tenant_config)
+
+def rebuild_tenant_configs():
+    """
+    Precompile every tenant's config from CONFIG. Must be called after any change
+    to CONFIG; the new mapping replaces the old one in a single assignment, so
+    concurrent requests see either the old or the new configs, never a mix.
+    """
+    global tenant_configs
+    tenant_configs = MappingProxyType({
+        tenant_id: build_tenant_config(tenant_id, tenant)
+        for tenant_id, tenant in CONFIG["tenants"].items()
+    })
+
+def get_tenant_config(tenant_id):
+    """Get the precompiled, read-only configuration for a tenant"""
+    configs = tenant_configs
+    tenant_config = configs.get(tenant_id)
+    if tenant_config is None:
+        logging.error(f"Tenant {tenant_id} not found in configuration")
+        tenant_config = configs[DEFAULT_TENANT]
+    return tenant_config
 
 # Global Token Cache
 token_cache = {}
 
+# Metrics registry: counters and histograms keyed by (metric name, label pairs)
+METRIC_HELP = {
+    "alchemy_requests_total": ("counter", "Outbound Alchemy API calls by tenant, endpoint and status"),
+    "alchemy_request_duration_seconds": ("histogram", "Outbound Alchemy API call latency by tenant and endpoint"),
+    "token_refreshes_total": ("counter", "Alchemy access token lookups by tenant and result"),
+    "location_cache_requests_total": ("counter", "/get-locations cache lookups by tenant and result"),
+    "update_batches_total": ("counter", "/update-location batches by tenant and status"),
+    "update_batch_duration_seconds": ("histogram", "/update-location batch duration by tenant"),
+    "update_barcodes_total": ("counter", "Barcodes processed by /update-location by tenant and outcome")
+}
+
+metric_counters = {}
+metric_histograms = {}
+metrics_lock = threading.Lock()
+metrics_publisher = {"pid": None}
+
+def increment_counter(name, value=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with metrics_lock:
+        metric_counters[key] = metric_counters.get(key, 0) + value
+
+def observe_histogram(name, value, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    bucket = bisect.bisect_left(LATENCY_BUCKETS, value)
+    with metrics_lock:
+        histogram = metric_histograms.get(key)
+        if histogram is None:
+            histogram = metric_histograms[key] = {"buckets": [0] * (len(LATENCY_BUCKETS) + 1), "sum": 0.0, "count": 0}
+        histogram["buckets"][bucket] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+def format_metric_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def copy_metrics():
+    """This worker's counters and histograms as plain (name, labels, value) lists"""
+    with metrics_lock:
+        counters = [[name, labels, value] for (name, labels), value in metric_counters.items()]
+        histograms = [[name, labels, {"buckets": list(h["buckets"]), "sum": h["sum"], "count": h["count"]}]
+                      for (name, labels), h in metric_histograms.items()]
+    return counters, histograms
+
+def publish_worker_metrics():
+    """Write this worker's metrics to METRICS_DIR/<pid>.json for the other workers' scrapes"""
+    counters, histograms = copy_metrics()
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    temp_path = f"{path}.tmp"
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        with open(temp_path, 'w') as f:
+            json.dump({"counters": counters, "histograms": histograms}, f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.error(f"Error publishing worker metrics: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def load_published_metrics():
+    """Metrics published by the other workers, including ones that have exited (counters never go back)"""
+    published = []
+    try:
+        filenames = os.listdir(METRICS_DIR)
+    except OSError:
+        return published
+    own_file = f"{os.getpid()}.json"
+    for filename in filenames:
+        if not filename.endswith(".json") or filename == own_file:
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, filename)) as f:
+                published.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading published metrics {filename}: {str(e)}")
+    return published
+
+def merge_metrics(documents):
+    """Sum counters and histograms from several workers' metrics, keyed like the registry"""
+    counters = {}
+    histograms = {}
+    for document in documents:
+        for name, labels, value in document["counters"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, histogram in document["histograms"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, {"buckets": [0] * (len(LATENCY_BUCKETS) + 1), "sum": 0.0, "count": 0})
+            merged["buckets"] = [a + b for a, b in zip(merged["buckets"], histogram["buckets"])]
+            merged["sum"] += histogram["sum"]
+            merged["count"] += histogram["count"]
+    return counters, histograms
+
+def publish_metrics_periodically():
+    while True:
+        time.sleep(METRICS_PUBLISH_INTERVAL)
+        publish_worker_metrics()
+
+@app.before_request
+def start_metrics_publisher():
+    """Start publishing this worker's metrics once per worker process (threads do not survive a fork)"""
+    if metrics_publisher["pid"] == os.getpid() or METRICS_PUBLISH_INTERVAL <= 0:
+        return None
+    with metrics_lock:
+        if metrics_publisher["pid"] != os.getpid():
+            metrics_publisher["pid"] = os.getpid()
+            threading.Thread(target=publish_metrics_periodically, name="metrics-publisher", daemon=True).start()
+    return None
+
+def render_metrics():
+    """Render every worker's metrics, summed, in the Prometheus text exposition format"""
+    counters, histograms = copy_metrics()
+    documents = [{"counters": counters, "histograms": histograms}]
+    if METRICS_PUBLISH_INTERVAL > 0:
+        documents.extend(load_published_metrics())
+    counters, histograms = merge_metrics(documents)
+    counters = sorted(counters.items())
+    histograms = sorted(histograms.items())
+    
+    lines = []
+    described = set()
+    
+    def describe(name):
+        if name not in described:
+            described.add(name)
+            metric_type, help_text = METRIC_HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+    
+    for (name, labels), value in counters:
+        describe(name)
+        lines.append(f"{name}{format_metric_labels(labels)} {value}")
+    for (name, labels), histogram in histograms:
+        describe(name)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram["buckets"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_metric_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{format_metric_labels(labels)} {histogram['sum']:.6f}")
+        lines.append(f"{name}_count{format_metric_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+# Phase timings for the Server-Timing header. Each thread collects into its own
+# dict: the request thread for the route's phases, pool threads per barcode.
+phase_timing = threading.local()
+
+def start_phase_timings():
+    """Start collecting phase timings on this thread, returning the dict they go into"""
+    phase_timing.phases = {}
+    return phase_timing.phases
+
+def stop_phase_timings():
+    phase_timing.phases = None
+
+@contextmanager
+def timed_phase(name):
+    """Add the time spent in the block to phase `name` if this thread is collecting timings"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = getattr(phase_timing, "phases", None)
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - started_at
+
+def start_request_timing():
+    """Collect phase timings for the current request; after_request turns them into headers and logs"""
+    g.request_timing_started = time.perf_counter()
+    g.phase_timings = start_phase_timings()
+    g.phase_descriptions = {}
+    return g.phase_timings
+
+def merge_barcode_timings(phases, descriptions, barcode_timings):
+    """Add the slowest barcode's time for each per-barcode phase to the request's phases"""
+    slowest = {}
+    for timings in barcode_timings:
+        for name, seconds in timings.items():
+            slowest[name] = max(slowest.get(name, 0.0), seconds)
+    for name, seconds in slowest.items():
+        phases[name] = seconds
+        descriptions[name] = f"slowest of {len(barcode_timings)} barcodes"
+
+def format_server_timing(phases, descriptions, total):
+    entries = []
+    for name, seconds in list(phases.items()) + [("total", total)]:
+        entry = name
+        if name in descriptions:
+            entry += f';desc="{descriptions[name]}"'
+        entries.append(f"{entry};dur={seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+# Global per-tenant rate limiter state
+rate_limit_state = {}
+rate_limit_lock = threading.Lock()
+
+class AlchemyRateLimitError(Exception):
+    """Raised when an outbound call would wait longer than RATE_LIMIT_MAX_WAIT"""
+
+def get_rate_limit_settings(tenant):
+    """Get the configured rate ceiling and burst size for a tenant"""
+    tenant_settings = CONFIG["tenants"].get(tenant, {})
+    ceiling = float(tenant_settings.get("rate_limit_per_second") or RATE_LIMIT_PER_SECOND)
+    burst = float(tenant_settings.get("rate_limit_burst") or RATE_LIMIT_BURST)
+    return ceiling, max(burst, 1.0)
+
+def get_rate_limit_entry(tenant):
+    """Get (or create) the token bucket for a tenant. Caller must hold rate_limit_lock."""
+    if tenant not in rate_limit_state:
+        ceiling, burst = get_rate_limit_settings(tenant)
+        rate_limit_state[tenant] = {
+            "rate": ceiling,
+            "ceiling": ceiling,
+            "burst": burst,
+            "tokens": burst,
+            "updated_at": time.monotonic(),
+            "blocked_until": 0,
+            "requests": 0,
+            "throttled_responses": 0,
+            "retries": 0,
+            "delayed_requests": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "last_throttled_at": None
+        }
+    return rate_limit_state[tenant]
+
+def acquire_rate_limit(tenant, deadline=None):
+    """Block until the tenant's token bucket allows another outbound call"""
+    waited = 0.0
+    while True:
+        with rate_limit_lock:
+            entry = get_rate_limit_entry(tenant)
+            now = time.monotonic()
+            
+            # Refill the bucket for the time elapsed since the last call
+            elapsed = now - entry["updated_at"]
+            entry["tokens"] = min(entry["burst"], entry["tokens"] + elapsed * entry["rate"])
+            entry["updated_at"] = now
+            
+            if now < entry["blocked_until"]:
+                # Alchemy told us to back off (Retry-After)
+                wait = entry["blocked_until"] - now
+            elif entry["tokens"] >= 1:
+                entry["tokens"] -= 1
+                entry["requests"] += 1
+                if waited > 0:
+                    entry["delayed_requests"] += 1
+                    entry["total_wait_seconds"] += waited
+                    entry["max_wait_seconds"] = max(entry["max_wait_seconds"], waited)
+                return waited
+            else:
+                wait = (1 - entry["tokens"]) / entry["rate"]
+        
+        if waited + wait > RATE_LIMIT_MAX_WAIT:
+            raise AlchemyRateLimitError(
+                f"Rate limit wait for tenant {tenant} would exceed {RATE_LIMIT_MAX_WAIT:.0f} seconds"
+            )
+        if deadline is not None and time.monotonic() + wait >= deadline:
+            raise DeadlineExceeded(f"Request deadline reached while waiting for the rate limit of tenant {tenant}")
+        time.sleep(wait)
+        waited += wait
+
+def parse_retry_after(response):
+    """Return the Retry-After delay of a response in seconds, or None"""
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except Exception:
+        return None
+
+def record_rate_limit_throttled(tenant, retry_after):
+    """Halve the tenant's rate and honor Retry-After after a 429 response"""
+    with rate_limit_lock:
+        entry = get_rate_limit_entry(tenant)
+        entry["rate"] = max(RATE_LIMIT_MIN_PER_SECOND, entry["rate"] / 2)
+        entry["tokens"] = 0
+        delay = retry_after if retry_after is not None else 1 / entry["rate"]
+        entry["blocked_until"] = max(entry["blocked_until"], time.monotonic() + delay)
+        entry["throttled_responses"] += 1
+        entry["last_throttled_at"] = time.time()
+        new_rate = entry["rate"]
+    logging.warning(f"Alchemy throttled tenant {tenant} (429), backing off for {delay:.1f}s; rate lowered to {new_rate:.2f} req/s")
+
+def record_rate_limit_success(tenant):
+    """Additively raise the tenant's rate back towards its configured ceiling"""
+    with rate_limit_lock:
+        entry = get_rate_limit_entry(tenant)
+        if entry["rate"] < entry["ceiling"]:
+            entry["rate"] = min(entry["ceiling"], entry["rate"] + entry["ceiling"] * 0.05)
+
+def reset_rate_limiter(tenant=None):
+    """Drop limiter state so that changed tenant settings take effect"""
+    with rate_limit_lock:
+        if tenant is None:
+            rate_limit_state.clear()
+        else:
+            rate_limit_state.pop(tenant, None)
+
+def get_rate_limit_metrics(tenant):
+    """Get throttle metrics for a tenant for the admin status page"""
+    with rate_limit_lock:
+        entry = get_rate_limit_entry(tenant)
+        blocked_for = max(0.0, entry["blocked_until"] - time.monotonic())
+        return {
+            "current_rate_per_second": round(entry["rate"], 3),
+            "ceiling_per_second": entry["ceiling"],
+            "burst": entry["burst"],
+            "available_tokens": round(entry["tokens"], 2),
+            "blocked_for_seconds": round(blocked_for, 2),
+            "requests": entry["requests"],
+            "throttled_responses": entry["throttled_responses"],
+            "retries": entry["retries"],
+            "delayed_requests": entry["delayed_requests"],
+            "total_wait_seconds": round(entry["total_wait_seconds"], 3),
+            "max_wait_seconds": round(entry["max_wait_seconds"], 3),
+            "last_throttled": datetime.fromtimestamp(entry["last_throttled_at"]).strftime("%Y-%m-%d %H:%M:%S")
+                              if entry["last_throttled_at"] else "Never"
+        }
+
+# Global circuit breaker state, keyed by (tenant, endpoint)
+circuit_breakers = {}
+circuit_lock = threading.Lock()
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an Alchemy endpoint whose circuit is open"""
+
+class DeadlineExceeded(Exception):
+    """Raised when the time budget of the current request has been used up"""
+
+class AlchemyUnavailableError(Exception):
+    """Raised when an Alchemy call failed in a way that may pass on retry (5xx, 429, timeout, connection error)"""
+
+def is_retryable_status(status_code):
+    return status_code == 429 or status_code >= 500
+
+def get_route_deadline(route_name):
+    """Get the monotonic deadline for a request to the given route"""
+    budgets = dict(ROUTE_TIME_BUDGETS)
+    budgets.update(CONFIG.get("route_time_budgets", {}))
+    return time.monotonic() + float(budgets.get(route_name, DEFAULT_OUTBOUND_TIMEOUT))
+
+def get_remaining_timeout(deadline):
+    """Get the timeout for the next outbound call, raising DeadlineExceeded if none is left"""
+    if deadline is None:
+        return DEFAULT_OUTBOUND_TIMEOUT
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline reached")
+    return min(remaining, DEFAULT_OUTBOUND_TIMEOUT)
+
+def get_circuit_entry(tenant, endpoint):
+    """Get (or create) the circuit breaker for an endpoint. Caller must hold circuit_lock."""
+    key = (tenant, endpoint)
+    if key not in circuit_breakers:
+        circuit_breakers[key] = {
+            "state": "closed",
+            "outcomes": deque(maxlen=CIRCUIT_WINDOW_SIZE),
+            "opened_at": 0,
+            "probes_in_flight": 0,
+            "times_opened": 0,
+            "rejected_calls": 0
+        }
+    return circuit_breakers[key]
+
+def is_circuit_open(tenant, endpoint):
+    """Check whether calls to an endpoint would currently be rejected"""
+    with circuit_lock:
+        entry = get_circuit_entry(tenant, endpoint)
+        if entry["state"] == "open":
+            return time.monotonic() - entry["opened_at"] < CIRCUIT_OPEN_SECONDS
+        if entry["state"] == "half_open":
+            return entry["probes_in_flight"] >= CIRCUIT_HALF_OPEN_PROBES
+        return False
+
+def before_circuit_call(tenant, endpoint):
+    """Reserve a call through the circuit breaker or raise CircuitOpenError"""
+    with circuit_lock:
+        entry = get_circuit_entry(tenant, endpoint)
+        
+        if entry["state"] == "open" and time.monotonic() - entry["opened_at"] >= CIRCUIT_OPEN_SECONDS:
+            entry["state"] = "half_open"
+            entry["probes_in_flight"] = 0
+            logging.info(f"Circuit for {endpoint} (tenant {tenant}) is half-open, probing")
+        
+        if entry["state"] == "closed":
+            return
+        if entry["state"] == "half_open" and entry["probes_in_flight"] < CIRCUIT_HALF_OPEN_PROBES:
+            entry["probes_in_flight"] += 1
+            return
+        
+        entry["rejected_calls"] += 1
+    raise CircuitOpenError(f"Alchemy {endpoint} endpoint is unavailable for tenant {tenant} (circuit open)")
+
+def record_circuit_result(tenant, endpoint, success):
+    """Record the outcome of a call and open or close the circuit accordingly"""
+    closed_now = False
+    with circuit_lock:
+        entry = get_circuit_entry(tenant, endpoint)
+        
+        if entry["state"] == "half_open":
+            entry["probes_in_flight"] = max(0, entry["probes_in_flight"] - 1)
+            if success:
+                entry["state"] = "closed"
+                entry["outcomes"].clear()
+                closed_now = True
+            else:
+                entry["state"] = "open"
+                entry["opened_at"] = time.monotonic()
+        elif entry["state"] == "closed":
+            entry["outcomes"].append(success)
+            failures = entry["outcomes"].count(False)
+            if (len(entry["outcomes"]) >= CIRCUIT_MIN_REQUESTS and
+                    failures / len(entry["outcomes"]) >= CIRCUIT_FAILURE_RATIO):
+                entry["state"] = "open"
+                entry["opened_at"] = time.monotonic()
+                entry["times_opened"] += 1
+                logging.error(f"Circuit for {endpoint} (tenant {tenant}) opened after {failures} failures in {len(entry['outcomes'])} calls")
+    
+    if closed_now:
+        logging.info(f"Circuit for {endpoint} (tenant {tenant}) closed after successful probe")
+        if endpoint == 'update-record' and count_pending_updates(tenant):
+            drain_thread = threading.Thread(target=drain_pending_updates, args=(tenant,))
+            drain_thread.daemon = True
+            drain_thread.start()
+
+def release_circuit_probe(tenant, endpoint):
+    """Give back a half-open probe slot for a call that never reached Alchemy"""
+    with circuit_lock:
+        entry = get_circuit_entry(tenant, endpoint)
+        if entry["state"] == "half_open":
+            entry["probes_in_flight"] = max(0, entry["probes_in_flight"] - 1)
+
+def get_circuit_metrics(tenant):
+    """Get circuit breaker state for all endpoints of a tenant for the admin status page"""
+    with circuit_lock:
+        metrics = {}
+        for (entry_tenant, endpoint), entry in circuit_breakers.items():
+            if entry_tenant != tenant:
+                continue
+            outcomes = entry["outcomes"]
+            metrics[endpoint] = {
+                "state": entry["state"],
+                "failure_ratio": round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+                "window_calls": len(outcomes),
+                "times_opened": entry["times_opened"],
+                "rejected_calls": entry["rejected_calls"]
+            }
+        return metrics
+
+# Recent latencies of successful outbound calls, keyed by (tenant, endpoint)
+latency_samples = {}
+latency_lock = threading.Lock()
+
+def record_latency(tenant, endpoint, seconds):
+    """Remember how long an outbound call took"""
+    with latency_lock:
+        key = (tenant, endpoint)
+        if key not in latency_samples:
+            latency_samples[key] = deque(maxlen=LATENCY_SAMPLE_SIZE)
+        latency_samples[key].append(seconds)
+
+def get_latency_percentile(tenant, endpoint, percentile):
+    """Get a latency percentile in seconds from recent calls, or None without enough samples"""
+    with latency_lock:
+        samples = list(latency_samples.get((tenant, endpoint), ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    samples.sort()
+    index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+    return samples[index]
+
+# Global hedging state
+hedge_state = {}
+hedge_lock = threading.Lock()
+
+def is_hedging_enabled(tenant):
+    """Check whether barcode lookups are hedged for a tenant"""
+    tenant_settings = CONFIG["tenants"].get(tenant, {})
+    return bool(tenant_settings.get("hedge_lookups", HEDGE_LOOKUPS))
+
+def get_hedge_entry(tenant):
+    """Get (or create) the hedge budget for a tenant. Caller must hold hedge_lock."""
+    if tenant not in hedge_state:
+        hedge_state[tenant] = {
+            "budget": 1.0,
+            "lookups": 0,
+            "hedges_sent": 0,
+            "hedges_won": 0,
+            "hedges_skipped": 0
+        }
+    return hedge_state[tenant]
+
+def try_spend_hedge_budget(tenant):
+    """Take one hedge from the tenant's budget, which refills by HEDGE_BUDGET_RATIO per lookup"""
+    with hedge_lock:
+        entry = get_hedge_entry(tenant)
+        if entry["budget"] >= 1:
+            entry["budget"] -= 1
+            entry["hedges_sent"] += 1
+            return True
+        entry["hedges_skipped"] += 1
+        return False
+
+def return_hedge_budget(tenant):
+    """Give back a hedge that was not sent because the tenant's pool had no idle thread"""
+    with hedge_lock:
+        entry = get_hedge_entry(tenant)
+        entry["budget"] += 1
+        entry["hedges_sent"] -= 1
+        entry["hedges_skipped"] += 1
+
+def is_counted_call(success):
+    """
+    Check whether the outcome of this thread's outbound call counts towards the circuit
+    breaker, the adaptive rate and the latency samples. A hedged copy that finishes after
+    the other copy succeeded does not; a successful copy claims the race for itself.
+    """
+    hedge_race = getattr(outbound_context, "hedge_race", None)
+    if hedge_race is None:
+        return True
+    race, copy = hedge_race
+    with hedge_lock:
+        if race["winner"] is not None:
+            return race["winner"] == copy
+        if success:
+            race["winner"] = copy
+    return True
+
+def get_hedge_metrics(tenant):
+    """Get hedging metrics for a tenant for the admin status page"""
+    delay = get_latency_percentile(tenant, 'find-records', HEDGE_PERCENTILE)
+    with hedge_lock:
+        entry = dict(get_hedge_entry(tenant))
+    entry["budget"] = round(entry["budget"], 2)
+    entry["enabled"] = is_hedging_enabled(tenant)
+    entry["hedge_delay_seconds"] = round(max(HEDGE_MIN_DELAY, delay), 3) if delay is not None else HEDGE_DEFAULT_DELAY
+    return entry
+
+def hedged_alchemy_request(tenant, endpoint, url, deadline=None, **kwargs):
+    """
+    Send a read-only request and, if it has not answered within the endpoint's
+    latency percentile, send an identical second request; the first answer wins.
+    """
+    if endpoint not in HEDGEABLE_ENDPOINTS:
+        raise ValueError(f"Refusing to hedge non read-only endpoint {endpoint}")
+    
+    with hedge_lock:
+        entry = get_hedge_entry(tenant)
+        entry["lookups"] += 1
+        entry["budget"] = min(10.0, entry["budget"] + HEDGE_BUDGET_RATIO)
+    
+    delay = get_latency_percentile(tenant, endpoint, HEDGE_PERCENTILE)
+    delay = max(HEDGE_MIN_DELAY, delay) if delay is not None else HEDGE_DEFAULT_DELAY
+    
+    # Both copies run on the tenant's own pool with the caller's priority, phase timings
+    # and profiler tag; a copy is only started if a pool thread is idle, so the caller
+    # (often a pool thread itself) never waits for queued work
+    priority = get_outbound_priority()
+    profile, label = get_profiled_thread()
+    race = {"winner": None}
+    timings = {}
+    
+    def send(copy):
+        set_outbound_priority(priority)
+        outbound_context.hedge_race = (race, copy)
+        timings[copy] = start_phase_timings()
+        if profile is not None:
+            add_profiled_thread(profile, label)
+        try:
+            return alchemy_request(tenant, endpoint, url, deadline, **kwargs)
+        finally:
+            outbound_context.hedge_race = None
+            stop_phase_timings()
+            if profile is not None:
+                remove_profiled_thread(profile)
+    
+    primary = submit_to_tenant_pool(tenant, send, "primary", only_if_idle=True)
+    if primary is None:
+        # No idle pool thread to race on, send the lookup unhedged from this thread
+        return alchemy_request(tenant, endpoint, url, deadline, **kwargs)
+    
+    copies = {"primary": primary}
+    done, _ = wait([primary], timeout=delay)
+    if done or (deadline is not None and time.monotonic() >= deadline) or not try_spend_hedge_budget(tenant):
+        return finish_hedged_call(copies, primary, timings)
+    
+    hedge = submit_to_tenant_pool(tenant, send, "hedge", only_if_idle=True)
+    if hedge is None:
+        return_hedge_budget(tenant)
+        return finish_hedged_call(copies, primary, timings)
+    
+    logging.info(f"Hedging slow {endpoint} call for tenant {tenant} after {delay:.3f}s")
+    copies["hedge"] = hedge
+    done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+    winner = copies.get(race["winner"])
+    if winner is None or not winner.done():
+        winner = done.pop()
+        # If the first call to finish failed, fall back to the other one
+        if winner.exception() is not None and pending:
+            winner = pending.pop()
+    
+    if winner is hedge:
+        with hedge_lock:
+            get_hedge_entry(tenant)["hedges_won"] += 1
+    return finish_hedged_call(copies, winner, timings)
+
+def finish_hedged_call(copies, winner, timings):
+    """Wait for the winning copy of a hedged call, add its phase timings to this thread's and return its result"""
+    try:
+        return winner.result()
+    finally:
+        phases = getattr(phase_timing, "phases", None)
+        copy = next(name for name, future in copies.items() if future is winner)
+        if phases is not None:
+            for name, seconds in timings.get(copy, {}).items():
+                phases[name] = phases.get(name, 0.0) + seconds
+
+# Global outbound scheduler state
+scheduler_condition = threading.Condition()
+scheduler_state = {
+    "running": 0,
+    "tenant_running": {},
+    "waiting": {priority: deque() for priority in PRIORITY_NAMES},
+    "admitted": {priority: 0 for priority in PRIORITY_NAMES},
+    "shed": {priority: 0 for priority in PRIORITY_NAMES}
+}
+
+class SchedulerOverloaded(Exception):
+    """Raised when outbound work is shed because the scheduler queues are full"""
+    def __init__(self, message, retry_after=SCHEDULER_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class SchedulerTicket:
+    """A call waiting for an outbound slot, with the slot limit of its tenant"""
+    __slots__ = ("tenant", "tenant_limit")
+    
+    def __init__(self, tenant, tenant_limit):
+        self.tenant = tenant
+        self.tenant_limit = tenant_limit
+
+def is_tenant_below_slot_limit(ticket):
+    """Check whether a ticket's tenant may take another slot. Caller must hold scheduler_condition."""
+    if ticket.tenant is None:
+        return True
+    return scheduler_state["tenant_running"].get(ticket.tenant, 0) < ticket.tenant_limit
+
+def is_next_in_schedule(ticket):
+    """
+    Check whether a waiting ticket is first in line. Tickets of tenants that hold all the
+    slots they may take are passed over. Caller must hold scheduler_condition.
+    """
+    for priority in sorted(PRIORITY_NAMES):
+        for other in scheduler_state["waiting"][priority]:
+            if other is ticket:
+                return True
+            if is_tenant_below_slot_limit(other):
+                return False
+    return False
+
+def acquire_outbound_slot(priority, deadline=None, tenant=None):
+    """
+    Wait for a free outbound slot, serving higher priority classes first.
+    A tenant holds at most its pool size in slots, so one slow tenant cannot take them all.
+    Raises SchedulerOverloaded when the priority's queue is full or the wait runs out.
+    """
+    ticket = SchedulerTicket(tenant, get_bulkhead_settings(tenant)[1] if tenant is not None else None)
+    with scheduler_condition:
+        waiting = scheduler_state["waiting"][priority]
+        
+        if len(waiting) >= SCHEDULER_QUEUE_LIMITS[priority]:
+            scheduler_state["shed"][priority] += 1
+            raise SchedulerOverloaded(f"Too much {PRIORITY_NAMES[priority]} work queued, try again later")
+        
+        if deadline is None:
+            deadline = time.monotonic() + SCHEDULER_BACKGROUND_MAX_WAIT
+        
+        waiting.append(ticket)
+        try:
+            while not (scheduler_state["running"] < SCHEDULER_MAX_CONCURRENT and
+                       is_tenant_below_slot_limit(ticket) and is_next_in_schedule(ticket)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    scheduler_state["shed"][priority] += 1
+                    raise SchedulerOverloaded(f"Timed out waiting for capacity for {PRIORITY_NAMES[priority]} work")
+                scheduler_condition.wait(remaining)
+        finally:
+            waiting.remove(ticket)
+            # Let the next ticket in line re-check its turn
+            scheduler_condition.notify_all()
+        
+        scheduler_state["running"] += 1
+        scheduler_state["admitted"][priority] += 1
+        if tenant is not None:
+            tenant_running = scheduler_state["tenant_running"]
+            tenant_running[tenant] = tenant_running.get(tenant, 0) + 1
+
+def release_outbound_slot(tenant=None):
+    """Hand an outbound slot taken for a tenant back to the scheduler"""
+    with scheduler_condition:
+        scheduler_state["running"] -= 1
+        if tenant is not None:
+            tenant_running = scheduler_state["tenant_running"]
+            tenant_running[tenant] -= 1
+            if not tenant_running[tenant]:
+                del tenant_running[tenant]
+        scheduler_condition.notify_all()
+
+# Every Alchemy call takes a slot for its own duration, at the priority of the work
+# it is part of. Each thread sets the priority of the work it runs (reads by default).
+outbound_context = threading.local()
+
+def set_outbound_priority(priority):
+    """Set the scheduler priority of this thread's Alchemy calls, returning the previous one"""
+    previous = getattr(outbound_context, "priority", None)
+    outbound_context.priority = priority
+    return previous
+
+def get_outbound_priority():
+    priority = getattr(outbound_context, "priority", None)
+    return PRIORITY_READ if priority is None else priority
+
+def is_scheduler_queue_full(priority):
+    """Check whether new work of a priority class would be shed right away"""
+    with scheduler_condition:
+        return len(scheduler_state["waiting"][priority]) >= SCHEDULER_QUEUE_LIMITS[priority]
+
+def get_scheduler_metrics():
+    """Get outbound scheduler metrics for the admin status page"""
+    with scheduler_condition:
+        return {
+            "running": scheduler_state["running"],
+            "max_concurrent": SCHEDULER_MAX_CONCURRENT,
+            "running_by_tenant": dict(scheduler_state["tenant_running"]),
+            "classes": {
+                name: {
+                    "waiting": len(scheduler_state["waiting"][priority]),
+                    "queue_limit": SCHEDULER_QUEUE_LIMITS[priority],
+                    "admitted": scheduler_state["admitted"][priority],
+                    "shed": scheduler_state["shed"][priority]
+                }
+                for priority, name in PRIORITY_NAMES.items()
+            }
+        }
+
+def overloaded_response(error):
+    """Build a 503 response telling the client when to retry"""
+    response = jsonify({"status": "error", "message": str(error)})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+# Global per-tenant bulkhead state
+bulkhead_state = {}
+bulkhead_lock = threading.Lock()
+
+def get_bulkhead_settings(tenant):
+    """Get the in-flight limit and pool size configured for a tenant"""
+    tenant_settings = CONFIG["tenants"].get(tenant, {})
+    max_in_flight = int(tenant_settings.get("max_in_flight") or TENANT_MAX_IN_FLIGHT)
+    pool_size = int(tenant_settings.get("pool_size") or TENANT_POOL_SIZE)
+    return max(1, max_in_flight), max(1, pool_size)
+
+def get_bulkhead_entry(tenant):
+    """Get (or create) the bulkhead of a tenant. Caller must hold bulkhead_lock."""
+    max_in_flight, pool_size = get_bulkhead_settings(tenant)
+    entry = bulkhead_state.get(tenant)
+    if entry is None:
+        entry = bulkhead_state[tenant] = {
+            "in_flight": 0,
+            "admitted": 0,
+            "rejected": 0,
+            "busy": 0,
+            "executor": None
+        }
+    entry["max_in_flight"] = max_in_flight
+    
+    # Replace the pool if its size was changed in the admin panel
+    if entry["executor"] is None or entry.get("pool_size") != pool_size:
+        if entry["executor"] is not None:
+            entry["executor"].shutdown(wait=False)
+        entry["executor"] = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix=f"tenant-{tenant}")
+        entry["pool_size"] = pool_size
+    return entry
+
+def enter_tenant_bulkhead(tenant):
+    """Admit a request into the tenant's bulkhead or raise SchedulerOverloaded"""
+    with bulkhead_lock:
+        entry = get_bulkhead_entry(tenant)
+        if entry["in_flight"] >= entry["max_in_flight"]:
+            entry["rejected"] += 1
+            raise SchedulerOverloaded(f"Too many requests in progress for tenant {tenant}, try again later")
+        entry["in_flight"] += 1
+        entry["admitted"] += 1
+
+def leave_tenant_bulkhead(tenant):
+    """Release a request's place in the tenant's bulkhead"""
+    with bulkhead_lock:
+        # The bulkhead is gone if the tenant was deleted or reset while the request ran
+        entry = bulkhead_state.get(tenant)
+        if entry is not None:
+            entry["in_flight"] -= 1
+
+def submit_to_tenant_pool(tenant, function, *args, only_if_idle=False):
+    """
+    Run a function on the tenant's pool. Submitting under bulkhead_lock always reaches the
+    current pool, even right after a resize. With only_if_idle, returns None instead of
+    queueing the work when every pool thread is busy.
+    """
+    with bulkhead_lock:
+        entry = get_bulkhead_entry(tenant)
+        if only_if_idle and entry["busy"] >= entry["pool_size"]:
+            return None
+        future = entry["executor"].submit(function, *args)
+        entry["busy"] += 1
+    future.add_done_callback(lambda _: release_tenant_pool_thread(entry))
+    return future
+
+def release_tenant_pool_thread(entry):
+    """Count a finished or cancelled pool task out of the bulkhead it was submitted to"""
+    with bulkhead_lock:
+        entry["busy"] -= 1
+
+def reset_tenant_bulkhead(tenant):
+    """Drop a deleted tenant's bulkhead and shut down its pool"""
+    with bulkhead_lock:
+        entry = bulkhead_state.pop(tenant, None)
+    if entry and entry["executor"] is not None:
+        entry["executor"].shutdown(wait=False)
+
+def get_bulkhead_metrics(tenant):
+    """Get bulkhead metrics for a tenant for the admin status page"""
+    with bulkhead_lock:
+        entry = get_bulkhead_entry(tenant)
+        return {
+            "in_flight": entry["in_flight"],
+            "max_in_flight": entry["max_in_flight"],
+            "pool_size": entry["pool_size"],
+            "pool_busy": entry["busy"],
+            "admitted": entry["admitted"],
+            "rejected": entry["rejected"]
+        }
+
+# Record-and-replay of outbound Alchemy calls. "record" appends every call,
+# sanitized, to a cassette file per tenant and worker and logs the inbound
+# requests that caused them; "replay" answers calls from those cassettes
+# instead of the network, after the recorded latency times the scale.
+CASSETTE_MODE = os.getenv('ALCHEMY_CASSETTE_MODE', 'off').lower()  # off, record or replay
+CASSETTE_DIR = os.getenv('ALCHEMY_CASSETTE_DIR', os.path.join(RENDER_CONFIG_DIR, 'cassettes'))
+CASSETTE_LATENCY_SCALE = float(os.getenv('ALCHEMY_REPLAY_LATENCY_SCALE', '1.0'))
+CASSETTE_SENSITIVE_KEYS = ("refreshToken", "accessToken", "password", "email")
+CASSETTE_RESPONSE_HEADERS = ("Content-Type", "Retry-After")
+CASSETTE_INBOUND_ENDPOINTS = ("update_location", "get_locations", "get_location_tree", "get_location_subtree",
+                              "get_location_ancestors", "search_locations", "get_locations_page")
+
+cassette_lock = threading.Lock()
+cassette_state = {"entries": None, "positions": {}, "config_saved": False}
+
+def sanitize_cassette_value(value):
+    """Mask tokens and credentials anywhere in a request or response body"""
+    if isinstance(value, dict):
+        return {key: ("***" if key in CASSETTE_SENSITIVE_KEYS and item else sanitize_cassette_value(item))
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [sanitize_cassette_value(item) for item in value]
+    return value
+
+def get_cassette_key(tenant, endpoint, body):
+    """Replay match key: tenant, endpoint and the sanitized request body (tokens differ between runs)"""
+    if endpoint == 'refresh-token':
+        body = None
+    return f"{tenant} {endpoint} {json.dumps(body, sort_keys=True)}"
+
+def write_cassette_line(filename, entry):
+    """Append one JSON line to a cassette file of this worker"""
+    os.makedirs(CASSETTE_DIR, exist_ok=True)
+    line = json.dumps(entry, separators=(",", ":")) + "\n"
+    # With FAST_STARTUP the first inbound request is logged before the config is loaded
+    init_config()
+    with cassette_lock:
+        if not cassette_state["config_saved"]:
+            # The tenants the recording was made with, so a replay can configure the same ones
+            with open(os.path.join(CASSETTE_DIR, 'config.json'), 'w') as f:
+                f.write(format_config_for_log(CONFIG))
+            cassette_state["config_saved"] = True
+        with open(os.path.join(CASSETTE_DIR, filename), 'a') as f:
+            f.write(line)
+
+def record_cassette_entry(tenant, endpoint, request_body, response, elapsed):
+    """Store one outbound call; reads the whole body, so streamed responses are buffered while recording"""
+    body = response.text
+    try:
+        body = json.dumps(sanitize_cassette_value(json.loads(body)))
+    except ValueError:
+        pass
+    write_cassette_line(f"{tenant}-{os.getpid()}.jsonl", {
+        "recorded_at": time.time(),
+        "tenant": tenant,
+        "endpoint": endpoint,
+        "request": sanitize_cassette_value(request_body),
+        "status": response.status_code,
+        "headers": {name: response.headers[name] for name in CASSETTE_RESPONSE_HEADERS if name in response.headers},
+        "body": body,
+        "elapsed": round(elapsed, 6)
+    })
+
+def load_cassettes():
+    """Index every recorded call by match key, and by tenant and endpoint for unmatched requests"""
+    entries = {}
+    count = 0
+    if os.path.isdir(CASSETTE_DIR):
+        for filename in sorted(os.listdir(CASSETTE_DIR)):
+            if not filename.endswith('.jsonl') or filename.startswith('inbound-'):
+                continue
+            with open(os.path.join(CASSETTE_DIR, filename)) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    key = get_cassette_key(entry["tenant"], entry["endpoint"], entry["request"])
+                    entries.setdefault(key, []).append(entry)
+                    entries.setdefault(f"{entry['tenant']} {entry['endpoint']}", []).append(entry)
+                    count += 1
+    logging.info(f"Loaded {count} cassette entries from {CASSETTE_DIR}")
+    return entries
+
+def next_cassette_entry(tenant, endpoint, request_body):
+    """Pick the recorded response for a call, cycling through repeats of the same request"""
+    with cassette_lock:
+        if cassette_state["entries"] is None:
+            cassette_state["entries"] = load_cassettes()
+        entries = cassette_state["entries"]
+        key = get_cassette_key(tenant, endpoint, sanitize_cassette_value(request_body))
+        if key not in entries:
+            key = f"{tenant} {endpoint}"
+            if key not in entries:
+                return None
+            log_hot_path("No recorded %s call matches this request for tenant %s, reusing another", endpoint, tenant)
+        position = cassette_state["positions"].get(key, 0)
+        cassette_state["positions"][key] = position + 1
+        return entries[key][position % len(entries[key])]
+
+def replay_alchemy_request(tenant, endpoint, url, timeout, request_body):
+    """Answer an outbound call from the cassettes, after the recorded latency (scaled)"""
+    entry = next_cassette_entry(tenant, endpoint, request_body)
+    if entry is None:
+        raise requests.ConnectionError(f"No recorded {endpoint} calls for tenant {tenant} in {CASSETTE_DIR}")
+    
+    delay = entry["elapsed"] * CASSETTE_LATENCY_SCALE
+    if timeout is not None and delay > timeout:
+        time.sleep(timeout)
+        raise requests.Timeout(f"Replayed {endpoint} call took longer than {timeout:.1f}s")
+    time.sleep(delay)
+    
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers.update(entry["headers"])
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = entry["body"].encode('utf-8')
+    response._content_consumed = True
+    return response
+
+def send_alchemy_request(tenant, endpoint, url, timeout, kwargs):
+    """Send one PUT to Alchemy, or replay it, recording it when cassette recording is on"""
+    if CASSETTE_MODE == 'replay':
+        return replay_alchemy_request(tenant, endpoint, url, timeout, kwargs.get('json'))
+    started_at = time.monotonic()
+    response = requests.put(url, timeout=timeout, **kwargs)
+    if CASSETTE_MODE == 'record':
+        record_cassette_entry(tenant, endpoint, kwargs.get('json'), response, time.monotonic() - started_at)
+    return response
+
+@app.before_request
+def record_inbound_request():
+    """While recording cassettes, log the requests that drive outbound calls so they can be replayed"""
+    if CASSETTE_MODE != 'record' or request.endpoint not in CASSETTE_INBOUND_ENDPOINTS:
+        return None
+    write_cassette_line(f"inbound-{os.getpid()}.jsonl", {
+        "recorded_at": time.time(),
+        "method": request.method,
+        "path": request.full_path.rstrip('?'),
+        "json": sanitize_cassette_value(request.get_json(silent=True))
+    })
+    return None
+
+def record_failed_call(tenant, endpoint):
+    """Count a failed outbound call against the circuit, unless it is a hedged copy that lost the race"""
+    if is_counted_call(False):
+        record_circuit_result(tenant, endpoint, False)
+    else:
+        release_circuit_probe(tenant, endpoint)
+
+def alchemy_request(tenant, endpoint, url, deadline=None, **kwargs):
+    """
+    Send a PUT request to the Alchemy API on behalf of a tenant.
+    Every outbound call goes through the endpoint's circuit breaker, the
+    tenant's token bucket and an outbound scheduler slot, held until the
+    response headers arrive; 429 responses lower the tenant's rate and are
+    retried after Retry-After. The call never outlives the given deadline.
+    """
+    attempt = 0
+    while True:
+        before_circuit_call(tenant, endpoint)
+        slot_acquired = False
+        try:
+            acquire_rate_limit(tenant, deadline)
+            acquire_outbound_slot(get_outbound_priority(), deadline, tenant)
+            slot_acquired = True
+            timeout = get_remaining_timeout(deadline)
+        except Exception:
+            if slot_acquired:
+                release_outbound_slot(tenant)
+            release_circuit_probe(tenant, endpoint)
+            raise
+        
+        try:
+            started_at = time.monotonic()
+            response = send_alchemy_request(tenant, endpoint, url, timeout, kwargs)
+            elapsed = time.monotonic() - started_at
+            counted = is_counted_call(response.status_code < 500 and response.status_code != 429)
+            if counted:
+                record_latency(tenant, endpoint, elapsed)
+            observe_histogram("alchemy_request_duration_seconds", elapsed, tenant=tenant, endpoint=endpoint)
+            increment_counter("alchemy_requests_total", tenant=tenant, endpoint=endpoint, status=str(response.status_code))
+        except requests.Timeout:
+            increment_counter("alchemy_requests_total", tenant=tenant, endpoint=endpoint, status="timeout")
+            record_failed_call(tenant, endpoint)
+            if timeout < DEFAULT_OUTBOUND_TIMEOUT:
+                raise DeadlineExceeded(f"Request deadline reached during {endpoint} call for tenant {tenant}")
+            raise
+        except Exception:
+            increment_counter("alchemy_requests_total", tenant=tenant, endpoint=endpoint, status="error")
+            record_failed_call(tenant, endpoint)
+            raise
+        finally:
+            release_outbound_slot(tenant)
+        
+        if not counted:
+            # A hedged copy that lost the race leaves the circuit and the rate alone
+            release_circuit_probe(tenant, endpoint)
+            return response
+        
+        if response.status_code != 429:
+            record_circuit_result(tenant, endpoint, response.status_code < 500)
+            record_rate_limit_success(tenant)
+            return response
+        
+        # A 429 means Alchemy is healthy but busy, so it does not count against the circuit
+        release_circuit_probe(tenant, endpoint)
+        record_rate_limit_throttled(tenant, parse_retry_after(response))
+        if attempt >= RATE_LIMIT_MAX_RETRIES:
+            return response
+        
+        response.close()
+        attempt += 1
+        with rate_limit_lock:
+            get_rate_limit_entry(tenant)["retries"] += 1
+        logging.info(f"Retrying {endpoint} call for tenant {tenant} after 429 (attempt {attempt} of {RATE_LIMIT_MAX_RETRIES})")
+
 def ensure_location_cache_directory():
     """Ensure the location cache directory exists"""
     try:
@@ -320,6 +1637,15 @@ def save_locations_to_cache(tenant, locations):
         with open(cache_file, 'w') as f:
             json.dump(locations, f, indent=2)
         
+        # Write the shared read-only snapshot that workers map for /get-locations.
+        # A snapshot that could not be replaced is removed so it is never served stale.
+        if LOCATION_SNAPSHOT_ENABLED and not write_location_snapshot(tenant, locations):
+            remove_location_snapshot(tenant)
+        
+        # The index is rebuilt on its next use, from the new snapshot
+        with location_index_lock:
+            location_indexes.pop(tenant, None)
+        
         # Update metadata
         metadata = load_cache_metadata()
         metadata["last_refreshed"][tenant] = time.time()
@@ -363,8 +1689,646 @@ def load_locations_from_cache(tenant):
         logging.error(f"Error loading locations from cache for tenant {tenant}: {str(e)}")
         return None
 
+# Compact in-memory location model. Workers hold these instead of nested dicts;
+# IDs and names are interned so repeated values share one string, and records
+# only become dicts at the response edge.
+class SublocationRecord:
+    __slots__ = ("id", "name")
+    
+    def __init__(self, id, name):
+        self.id = sys.intern(str(id))
+        self.name = sys.intern(str(name))
+    
+    def to_dict(self):
+        return {"id": self.id, "name": self.name}
+
+class LocationRecord:
+    __slots__ = ("id", "name", "sublocations", "parent_id")
+    
+    def __init__(self, id, name, sublocations=(), parent_id=None):
+        self.id = sys.intern(str(id))
+        self.name = sys.intern(str(name))
+        self.sublocations = tuple(sublocations)
+        self.parent_id = None if parent_id is None else sys.intern(str(parent_id))
+    
+    @classmethod
+    def from_dict(cls, location):
+        return cls(
+            location["id"],
+            location["name"],
+            (SublocationRecord(sub["id"], sub["name"]) for sub in location.get("sublocations", [])),
+            location.get("parentId")
+        )
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "sublocations": [sublocation.to_dict() for sublocation in self.sublocations],
+            "parentId": self.parent_id
+        }
+
+def load_location_records(locations):
+    """Convert cached location dicts into LocationRecords"""
+    return [LocationRecord.from_dict(location) for location in locations]
+
+# Memory-mapped location snapshots shared by all workers through the page cache.
+# Layout: header, string offsets, UTF-8 string data, location records
+# (id, name, parent, first sublocation, end sublocation), sublocation records
+# (id, name), then the pre-rendered /get-locations JSON. All integers are uint32
+# string table or record indexes.
+LOCATION_SNAPSHOT_ENABLED = os.getenv('LOCATION_SNAPSHOT_ENABLED', 'true').lower() == 'true'
+SNAPSHOT_MAGIC = b"ALCHLOC1"
+SNAPSHOT_HEADER = struct.Struct("<8s9I")
+SNAPSHOT_NO_STRING = 0xFFFFFFFF
+
+location_snapshots = {}
+location_snapshot_lock = threading.Lock()
+
+def get_location_snapshot_file_path(tenant):
+    """Get the path to the memory-mapped location snapshot for a specific tenant"""
+    return os.path.join(LOCATION_CACHE_DIR, f"{tenant}_locations.snap")
+
+def encode_location_snapshot(locations):
+    """Encode locations into the snapshot layout, interning repeated IDs and names"""
+    strings = {}
+    
+    def intern_string(value):
+        if value is None:
+            return SNAPSHOT_NO_STRING
+        return strings.setdefault(str(value), len(strings))
+    
+    location_records = array("I")
+    sublocation_records = array("I")
+    for location in locations:
+        first_sublocation = len(sublocation_records) // 2
+        for sublocation in location.get("sublocations", []):
+            sublocation_records.append(intern_string(sublocation["id"]))
+            sublocation_records.append(intern_string(sublocation["name"]))
+        location_records.extend((
+            intern_string(location["id"]),
+            intern_string(location["name"]),
+            intern_string(location.get("parentId")),
+            first_sublocation,
+            len(sublocation_records) // 2
+        ))
+    
+    string_offsets = array("I", [0])
+    string_data = bytearray()
+    for value in strings:
+        string_data += value.encode("utf-8")
+        string_offsets.append(len(string_data))
+    string_data += b"\0" * (-len(string_data) % 4)
+    
+    # Rendered the way jsonify renders it so the bytes can be served as-is
+    rendered = (json.dumps(locations, separators=(",", ":"), sort_keys=True) + "\n").encode("utf-8")
+    
+    string_offsets_pos = SNAPSHOT_HEADER.size
+    string_data_pos = string_offsets_pos + len(string_offsets) * 4
+    locations_pos = string_data_pos + len(string_data)
+    sublocations_pos = locations_pos + len(location_records) * 4
+    json_pos = sublocations_pos + len(sublocation_records) * 4
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC, len(strings), len(locations), len(sublocation_records) // 2,
+        string_offsets_pos, string_data_pos, locations_pos, sublocations_pos, json_pos, len(rendered)
+    )
+    return b"".join((header, string_offsets.tobytes(), bytes(string_data),
+                     location_records.tobytes(), sublocation_records.tobytes(), rendered))
+
+def write_location_snapshot(tenant, locations):
+    """Atomically replace a tenant's snapshot; workers still mapping the old file keep it until they reopen"""
+    snapshot_file = get_location_snapshot_file_path(tenant)
+    temp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, 'wb') as f:
+            f.write(encode_location_snapshot(locations))
+        os.replace(temp_file, snapshot_file)
+        return True
+    except Exception as e:
+        logging.error(f"Error writing location snapshot for tenant {tenant}: {str(e)}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return False
+
+def remove_location_snapshot(tenant):
+    """Delete a tenant's snapshot file and forget this worker's mapping of it"""
+    snapshot_file = get_location_snapshot_file_path(tenant)
+    try:
+        os.remove(snapshot_file)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.error(f"Error removing location snapshot for tenant {tenant}: {str(e)}")
+    with location_snapshot_lock:
+        location_snapshots.pop(tenant, None)
+
+class LocationSnapshot:
+    """Read-only view over a memory-mapped location snapshot file"""
+    
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.string_count, self.location_count, self.sublocation_count,
+         string_offsets_pos, self.string_data_pos, locations_pos, sublocations_pos,
+         self.json_pos, self.json_length) = SNAPSHOT_HEADER.unpack_from(self.map, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self.map.close()
+            raise ValueError(f"Not a location snapshot: {path}")
+        view = memoryview(self.map)
+        self.string_offsets = view[string_offsets_pos:string_offsets_pos + (self.string_count + 1) * 4].cast("I")
+        self.location_records = view[locations_pos:locations_pos + self.location_count * 20].cast("I")
+        self.sublocation_records = view[sublocations_pos:sublocations_pos + self.sublocation_count * 8].cast("I")
+    
+    def __len__(self):
+        return self.location_count
+    
+    def is_current(self, path):
+        """Check whether the file at path is still the one this snapshot maps"""
+        try:
+            current = os.stat(path)
+        except OSError:
+            return False
+        return (current.st_ino, current.st_mtime_ns) == (self.stat.st_ino, self.stat.st_mtime_ns)
+    
+    def is_older_than(self, path):
+        """Check whether the file at path (the JSON cache) was written after this snapshot"""
+        try:
+            return os.stat(path).st_mtime_ns > self.stat.st_mtime_ns
+        except OSError:
+            return False
+    
+    def get_string(self, string_id):
+        if string_id == SNAPSHOT_NO_STRING:
+            return None
+        start = self.string_data_pos + self.string_offsets[string_id]
+        end = self.string_data_pos + self.string_offsets[string_id + 1]
+        return self.map[start:end].decode("utf-8")
+    
+    def get_location(self, position):
+        """Decode one location with its sublocations into the cached dict shape"""
+        base = position * 5
+        id_string, name_string, parent_string, first, end = self.location_records[base:base + 5]
+        return {
+            "id": self.get_string(id_string),
+            "name": self.get_string(name_string),
+            "sublocations": [
+                {"id": self.get_string(self.sublocation_records[i * 2]),
+                 "name": self.get_string(self.sublocation_records[i * 2 + 1])}
+                for i in range(first, end)
+            ],
+            "parentId": self.get_string(parent_string)
+        }
+    
+    def iter_locations(self):
+        for position in range(self.location_count):
+            yield self.get_location(position)
+    
+    def iter_records(self):
+        """Decode the snapshot into LocationRecords, sharing one string per table entry"""
+        strings = [self.get_string(string_id) for string_id in range(self.string_count)]
+        records = self.location_records
+        sublocations = self.sublocation_records
+        for base in range(0, self.location_count * 5, 5):
+            first, end = records[base + 3], records[base + 4]
+            yield LocationRecord(
+                strings[records[base]],
+                strings[records[base + 1]],
+                [SublocationRecord(strings[sublocations[i * 2]], strings[sublocations[i * 2 + 1]])
+                 for i in range(first, end)],
+                strings[records[base + 2]] if records[base + 2] != SNAPSHOT_NO_STRING else None
+            )
+    
+    def iter_json_chunks(self, chunk_size=64 * 1024):
+        """Yield the pre-rendered /get-locations JSON straight from the mapping"""
+        end = self.json_pos + self.json_length
+        for start in range(self.json_pos, end, chunk_size):
+            yield self.map[start:min(start + chunk_size, end)]
+
+def get_location_snapshot(tenant):
+    """
+    Get the mapped snapshot for a tenant, remapping it when the refresh job replaced the file.
+    Returns None when the JSON cache is newer, e.g. a refresh died between the two writes.
+    """
+    if not LOCATION_SNAPSHOT_ENABLED:
+        return None
+    snapshot_file = get_location_snapshot_file_path(tenant)
+    cache_file = get_location_cache_file_path(tenant)
+    
+    with location_snapshot_lock:
+        snapshot = location_snapshots.get(tenant)
+        if snapshot and snapshot.is_current(snapshot_file):
+            return None if snapshot.is_older_than(cache_file) else snapshot
+        
+        # Old mappings are left for the garbage collector, since a response
+        # may still be streaming from them
+        location_snapshots.pop(tenant, None)
+        if not os.path.exists(snapshot_file):
+            return None
+        try:
+            snapshot = LocationSnapshot(snapshot_file)
+        except (OSError, ValueError, struct.error) as e:
+            logging.error(f"Error mapping location snapshot for tenant {tenant}: {str(e)}")
+            return None
+        location_snapshots[tenant] = snapshot
+        logging.info(f"Mapped location snapshot for tenant {tenant} ({len(snapshot)} locations)")
+        return None if snapshot.is_older_than(cache_file) else snapshot
+
+def cached_locations_response(tenant):
+    """
+    Build a /get-locations response from the tenant's cache, or None if there is none.
+    Serves the shared snapshot when present, falling back to parsing the JSON cache.
+    """
+    snapshot = get_location_snapshot(tenant)
+    if snapshot is not None and len(snapshot):
+        logging.info(f"Using cached location snapshot for tenant {tenant} (count: {len(snapshot)})")
+        return Response(snapshot.iter_json_chunks(), mimetype='application/json',
+                        headers={"Content-Length": str(snapshot.json_length)})
+    
+    cached_locations = load_locations_from_cache(tenant)
+    if cached_locations:
+        logging.info(f"Using cached locations for tenant {tenant} (count: {len(cached_locations)})")
+        return jsonify(cached_locations)
+    return None
+
+# Location hierarchy index, rebuilt whenever a tenant's cache file changes
+VALIDATE_LOCATION_IDS = os.getenv('VALIDATE_LOCATION_IDS', 'false').lower() == 'true'
+
+location_indexes = {}
+location_index_lock = threading.Lock()
+
+class LocationNode:
+    """A location or sublocation in the hierarchy index"""
+    __slots__ = ("id", "name", "type", "parent_id", "children", "sublocation_ids", "path")
+    
+    def __init__(self, id, name, type, parent_id, sublocation_ids=()):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.parent_id = parent_id
+        self.children = []
+        self.sublocation_ids = sublocation_ids
+        self.path = None
+
+def build_location_index(records):
+    """
+    Build a hierarchy index from cached LocationRecords.
+    Locations are linked to their LocatedAt parent and sublocations to the location
+    listing them. Every node gets its child list and its path of ancestor IDs from
+    the root, so subtrees and ancestors can be looked up without walking the tree.
+    """
+    nodes = {}
+    
+    for record in records:
+        nodes[record.id] = LocationNode(
+            record.id, record.name, "location", record.parent_id,
+            frozenset(sub.id for sub in record.sublocations)
+        )
+    
+    for record in records:
+        for sublocation in record.sublocations:
+            node = nodes.get(sublocation.id)
+            if node is None:
+                nodes[sublocation.id] = LocationNode(sublocation.id, sublocation.name, "sublocation", record.id)
+            elif node.parent_id is None and node.id != record.id:
+                # A location listed as an Item of another location without its own LocatedAt
+                node.parent_id = record.id
+    
+    # Parents that are not part of the cached data make their children roots
+    roots = []
+    for node in nodes.values():
+        if node.parent_id not in nodes or node.parent_id == node.id:
+            node.parent_id = None
+            roots.append(node.id)
+        else:
+            nodes[node.parent_id].children.append(node.id)
+    
+    # Precompute paths top-down; siblings share one path tuple.
+    # Nodes caught in a LocatedAt cycle are attached as roots
+    for root_id in roots:
+        nodes[root_id].path = ()
+    stack = list(roots)
+    while stack:
+        node = nodes[stack.pop()]
+        child_path = node.path + (node.id,)
+        for child_id in node.children:
+            nodes[child_id].path = child_path
+            stack.append(child_id)
+    for node in nodes.values():
+        if node.path is None:
+            logging.warning(f"Location {node.id} is part of a LocatedAt cycle, treating it as a root")
+            if node.parent_id in nodes:
+                nodes[node.parent_id].children.remove(node.id)
+            node.parent_id = None
+            node.path = ()
+            roots.append(node.id)
+            stack = [node.id]
+            while stack:
+                current = nodes[stack.pop()]
+                for child_id in current.children:
+                    if nodes[child_id].path is None:
+                        nodes[child_id].path = current.path + (current.id,)
+                        stack.append(child_id)
+    
+    return {"nodes": nodes, "roots": roots}
+
+# Location search (prefix + trigram index over location and sublocation names)
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+SEARCH_POSTINGS_BUDGET = 20000  # trigram postings scanned per query, rarest trigrams first
+SEARCH_CANDIDATES = 200  # candidates re-scored with their full trigram similarity
+SEARCH_MIN_SIMILARITY = 0.5  # share of the query's trigrams a name must contain
+SEARCH_WORD_PATTERN = re.compile(r"\w+")
+
+def normalize_search_text(text):
+    """Lowercase and collapse whitespace for indexing and querying"""
+    return " ".join(str(text).casefold().split())
+
+def get_trigrams(text):
+    """Get the set of padded trigrams of a normalized string"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_search_index(nodes):
+    """Build the prefix and trigram search structures for the nodes of a hierarchy index"""
+    prefix_keys = []
+    postings = {}
+    normalized_names = {}
+    
+    for node_id, node in nodes.items():
+        normalized = normalize_search_text(node.name)
+        normalized_names[node_id] = normalized
+        
+        # Prefix keys for the full name and every word in it (and the ID itself)
+        prefix_keys.append((normalized, node_id))
+        for match in SEARCH_WORD_PATTERN.finditer(normalized):
+            if match.start() > 0:
+                prefix_keys.append((normalized[match.start():], node_id))
+        prefix_keys.append((node_id.casefold(), node_id))
+        
+        for trigram in get_trigrams(normalized):
+            postings.setdefault(trigram, []).append(node_id)
+    
+    prefix_keys.sort()
+    return {
+        "prefix_keys": [key for key, _ in prefix_keys],
+        "prefix_ids": [node_id for _, node_id in prefix_keys],
+        "postings": postings,
+        "normalized_names": normalized_names
+    }
+
+def search_location_index(index, query, limit=SEARCH_DEFAULT_LIMIT):
+    """
+    Find the best matching locations for a query.
+    Names starting with the query (or with a word starting with it) rank first,
+    then names sharing the most trigrams with it, which tolerates typos.
+    """
+    query = normalize_search_text(query)
+    if not query:
+        return []
+    
+    search = get_search_index(index)
+    nodes = index["nodes"]
+    normalized_names = search["normalized_names"]
+    scores = {}
+    
+    # Prefix matches on names, words and IDs
+    keys = search["prefix_keys"]
+    position = bisect.bisect_left(keys, query)
+    while position < len(keys) and keys[position].startswith(query) and len(scores) < limit * 20:
+        node_id = search["prefix_ids"][position]
+        bonus = 2.0 if keys[position] == normalized_names[node_id] else 1.0
+        scores[node_id] = max(scores.get(node_id, 0), bonus)
+        position += 1
+    
+    # Trigram similarity for typo tolerance; too short queries only use prefixes
+    if len(query) >= 3:
+        query_trigrams = get_trigrams(query)
+        
+        # Count shared trigrams over the rarest trigrams' postings within the scan budget
+        hits = Counter()
+        scanned = 0
+        for posting in sorted((search["postings"][t] for t in query_trigrams if t in search["postings"]), key=len):
+            if scanned and scanned + len(posting) > SEARCH_POSTINGS_BUDGET:
+                break
+            hits.update(posting)
+            scanned += len(posting)
+        
+        # Re-score the best candidates by how much of the query they contain,
+        # with their overall (Jaccard) similarity to prefer closer names
+        for node_id, _ in hits.most_common(SEARCH_CANDIDATES):
+            node_trigrams = get_trigrams(normalized_names[node_id])
+            shared = len(query_trigrams & node_trigrams)
+            containment = shared / len(query_trigrams)
+            if containment >= SEARCH_MIN_SIMILARITY or node_id in scores:
+                jaccard = shared / (len(query_trigrams) + len(node_trigrams) - shared)
+                scores[node_id] = scores.get(node_id, 0) + containment + 0.5 * jaccard
+    
+    best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -len(nodes[item[0]].name)))
+    results = []
+    for node_id, score in best:
+        node = nodes[node_id]
+        results.append({
+            "id": node_id,
+            "name": node.name,
+            "type": node.type,
+            "parent_id": node.parent_id,
+            "path": [nodes[ancestor_id].name for ancestor_id in node.path],
+            "score": round(score, 3)
+        })
+    return results
+
+# Paginated location listing (flattened rows as shown by the location tracking grid)
+PAGE_DEFAULT_LIMIT = 100
+PAGE_MAX_LIMIT = 1000
+PAGE_SORT_FIELDS = ("hierarchy", "name", "id")
+PAGE_FILTER_CACHE_SIZE = 32
+page_filter_lock = threading.Lock()
+
+class LocationRow:
+    """A grid row pointing at a location record, or a sublocation record and its location"""
+    __slots__ = ("record", "parent")
+    
+    def __init__(self, record, parent=None):
+        self.record = record
+        self.parent = parent
+    
+    @property
+    def level(self):
+        return 0 if self.parent is None else 1
+    
+    def to_dict(self):
+        if self.parent is None:
+            return {
+                "id": self.record.id,
+                "name": self.record.name,
+                "level": 0,
+                "isParent": bool(self.record.sublocations),
+                "parentId": self.record.parent_id,
+                "parentName": None
+            }
+        return {
+            "id": self.record.id,
+            "name": self.record.name,
+            "level": 1,
+            "isParent": False,
+            "parentId": self.parent.id,
+            "parentName": self.parent.name
+        }
+
+def build_location_rows(records):
+    """
+    Flatten cached LocationRecords into grid rows with precomputed sort orders.
+    The "hierarchy" order lists each location followed by its sublocations,
+    both sorted by name, the way the location tracking grid shows them.
+    """
+    rows = []
+    for record in sorted(records, key=lambda rec: rec.name.casefold()):
+        rows.append(LocationRow(record))
+        for sublocation in sorted(record.sublocations, key=lambda sub: sub.name.casefold()):
+            rows.append(LocationRow(sublocation, record))
+    
+    search_names = [row.record.name.casefold() for row in rows]
+    row_numbers = range(len(rows))
+    return {
+        "rows": rows,
+        "search_names": search_names,
+        "orders": {
+            "hierarchy": array("I", row_numbers),
+            "name": array("I", sorted(row_numbers, key=lambda i: (search_names[i], rows[i].record.id))),
+            "id": array("I", sorted(row_numbers, key=lambda i: (len(rows[i].record.id), rows[i].record.id)))
+        },
+        "filtered": {}
+    }
+
+def get_filtered_row_order(listing, sort, descending, query, level):
+    """Get the row numbers matching a filter in the requested order, memoized per filter"""
+    key = (sort, descending, query, level)
+    order = listing["filtered"].get(key)
+    if order is None:
+        order = listing["orders"][sort]
+        if descending:
+            order = order[::-1]
+        if query or level is not None:
+            search_names = listing["search_names"]
+            rows = listing["rows"]
+            order = array("I", (i for i in order
+                                if (not query or query in search_names[i]) and
+                                   (level is None or rows[i].level == level)))
+        with page_filter_lock:
+            if len(listing["filtered"]) >= PAGE_FILTER_CACHE_SIZE:
+                listing["filtered"].pop(next(iter(listing["filtered"])))
+            listing["filtered"][key] = order
+    return order
+
+def encode_page_cursor(cursor):
+    """Encode a page cursor as an opaque URL-safe token"""
+    return base64.urlsafe_b64encode(json.dumps(cursor, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_page_cursor(token):
+    """Decode a page cursor token, raising ValueError if it is malformed"""
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+
+def set_location_index(tenant, records, mtime):
+    """
+    Build and store the hierarchy index for a tenant's cached LocationRecords.
+    The search and listing parts are built on first use, see get_search_index and get_location_listing.
+    """
+    index = build_location_index(records)
+    index["records"] = records
+    index["version"] = mtime
+    with location_index_lock:
+        location_indexes[tenant] = {"mtime": mtime, "index": index}
+    return index
+
+def get_search_index(index):
+    """Get the prefix and trigram search index of a location index, building it on first use"""
+    search = index.get("search")
+    if search is None:
+        search = build_search_index(index["nodes"])
+        with location_index_lock:
+            search = index.setdefault("search", search)
+    return search
+
+def get_location_listing(index):
+    """Get the grid rows of a location index, building them on first use"""
+    listing = index.get("listing")
+    if listing is None:
+        listing = build_location_rows(index["records"])
+        with location_index_lock:
+            listing = index.setdefault("listing", listing)
+    return listing
+
+def drop_location_index(tenant):
+    """Forget this worker's index and snapshot mapping for a tenant"""
+    with location_index_lock:
+        location_indexes.pop(tenant, None)
+    with location_snapshot_lock:
+        location_snapshots.pop(tenant, None)
+
+def get_location_index(tenant):
+    """Get the hierarchy index for a tenant, rebuilding it if the cache file changed"""
+    cache_file = get_location_cache_file_path(tenant)
+    try:
+        mtime = os.path.getmtime(cache_file)
+    except OSError:
+        return None
+    
+    with location_index_lock:
+        entry = location_indexes.get(tenant)
+        if entry and entry["mtime"] == mtime:
+            return entry["index"]
+    
+    # Decode from the shared snapshot when there is one, it is cheaper than parsing the JSON cache
+    snapshot = get_location_snapshot(tenant)
+    if snapshot is not None:
+        records = list(snapshot.iter_records())
+    else:
+        records = load_location_records(load_locations_from_cache(tenant) or [])
+    if not records:
+        return None
+    return set_location_index(tenant, records, mtime)
+
+def build_location_subtree(index, node_id, max_depth=None):
+    """Build a nested {id, name, type, children} tree below a node of the index"""
+    node = index["nodes"][node_id]
+    subtree = {"id": node.id, "name": node.name, "type": node.type, "children": []}
+    if max_depth is not None and max_depth <= 0:
+        subtree["has_children"] = bool(node.children)
+        return subtree
+    next_depth = None if max_depth is None else max_depth - 1
+    for child_id in node.children:
+        subtree["children"].append(build_location_subtree(index, child_id, next_depth))
+    return subtree
+
+def validate_location_ids(tenant, location_id, sublocation_id):
+    """
+    Check a location/sublocation pair against the hierarchy index, returning an error message or None.
+    IDs missing from the index may have been created since the last refresh, so only a
+    sublocation that is known to belong to another location is rejected.
+    """
+    if not VALIDATE_LOCATION_IDS or not sublocation_id:
+        return None
+    index = get_location_index(tenant)
+    if index is None:
+        # Nothing cached yet, let Alchemy decide
+        return None
+    
+    nodes = index["nodes"]
+    location = nodes.get(str(location_id))
+    sublocation = nodes.get(str(sublocation_id))
+    if location is None or sublocation is None:
+        # Not in the index (yet), let Alchemy decide
+        return None
+    if (str(location_id) not in sublocation.path and
+            str(sublocation_id) not in location.sublocation_ids):
+        return f"Sublocation {sublocation_id} is not part of location {location_id}"
+    return None
+
 def refresh_location_cache(tenant):
     """Refresh the location cache for a specific tenant by calling the Alchemy API"""
+    previous_priority = set_outbound_priority(PRIORITY_REFRESH)
     try:
         # Update metadata to show refresh in progress
         metadata = load_cache_metadata()
@@ -376,8 +2340,10 @@ def refresh_location_cache(tenant):
         }
         save_cache_metadata(metadata)
         
+        deadline = get_route_deadline("refresh_location_cache")
+        
         # Get access token
-        access_token = refresh_alchemy_token(tenant)
+        access_token = refresh_alchemy_token(tenant, deadline)
         
         if not access_token:
             # Update metadata with error
@@ -413,7 +2379,8 @@ def refresh_location_cache(tenant):
         
         filter_url = tenant_config.get('filter_url')
         logging.info(f"Refreshing location cache: Fetching locations from Alchemy API for tenant {tenant}")
-        response = requests.put(filter_url, headers=headers, json=filter_payload)
+        response = alchemy_request(tenant, 'filter-records', filter_url, deadline, headers=headers, json=filter_payload,
+                                   stream=STREAM_LOCATION_RESPONSES)
         
         if not response.ok:
             # Update metadata with error
@@ -429,35 +2396,8 @@ def refresh_location_cache(tenant):
             logging.error(f"Failed to refresh location cache: API error for tenant {tenant}: {response.text}")
             return False
         
-        # Process the response
-        locations_data = response.json()
-        logging.info(f"Received {len(locations_data)} locations from API for tenant {tenant}")
-        
-        # Transform the data into the format needed by the frontend
-        formatted_locations = []
-        
-        for location in locations_data:
-            try:
-                # Extract location ID - use recordId if it exists, otherwise fall back to id
-                location_id = str(location.get("recordId") or location.get("id", "unknown"))
-                
-                # Extract location name using improved method
-                location_name = extract_location_name_improved(location)
-                
-                # Extract sublocations - improved version
-                sublocations = extract_sublocations_improved(location)
-                
-                # Create location info object
-                location_info = {
-                    "id": location_id,
-                    "name": location_name,
-                    "sublocations": sublocations
-                }
-                
-                formatted_locations.append(location_info)
-                
-            except Exception as e:
-                logging.error(f"Error processing location {location.get('recordId', location.get('id', 'unknown'))} for tenant {tenant}: {str(e)}")
+        # Transform each record into the format needed by the frontend as it is parsed
+        formatted_locations = transform_locations(iter_response_records(response, deadline), tenant)
         
         # Save to cache
         if formatted_locations:
@@ -490,16 +2430,26 @@ def refresh_location_cache(tenant):
         
         logging.error(f"Error refreshing location cache for tenant {tenant}: {str(e)}")
         return False
+    finally:
+        # Background refreshes yield to operator updates and location reads
+        set_outbound_priority(previous_priority)
 
 def refresh_all_location_caches():
     """Refresh location caches for all tenants"""
-    global CONFIG
+    init_config()
     
     for tenant_id in CONFIG["tenants"].keys():
+        # Every worker runs this schedule; only one of them refreshes each tenant
+        lock_file = acquire_refresh_file_lock(tenant_id, blocking=False)
+        if lock_file is None:
+            logging.info(f"Another worker is refreshing the location cache for tenant {tenant_id}, skipping")
+            continue
         try:
             refresh_location_cache(tenant_id)
         except Exception as e:
             logging.error(f"Error refreshing cache for tenant {tenant_id}: {str(e)}")
+        finally:
+            lock_file.close()
 
 # Initialize the location cache system
 def init_location_cache():
@@ -510,12 +2460,102 @@ def init_location_cache():
     def schedule_refresh():
         refresh_all_location_caches()
         # Schedule next run in 7 days
-        Timer(CACHE_REFRESH_INTERVAL, schedule_refresh).start()
+        start_daemon_timer(CACHE_REFRESH_INTERVAL, schedule_refresh)
     
     # Start the first scheduled refresh after 1 hour (gives time for app to stabilize after restart)
-    Timer(3600, schedule_refresh).start()
+    start_daemon_timer(3600, schedule_refresh)
     logging.info("Location cache system initialized with weekly refresh schedule")
 
+def start_daemon_timer(interval, function):
+    """Start a Timer that does not keep a stopping worker process alive"""
+    timer = Timer(interval, function)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+def acquire_refresh_file_lock(tenant, blocking=True):
+    """
+    Take the cross-worker lock for refreshing a tenant's location cache.
+    Returns the open lock file (close it to release) or None if another worker holds it.
+    """
+    ensure_location_cache_directory()
+    lock_file = open(os.path.join(LOCATION_CACHE_DIR, f"{tenant}.refresh.lock"), 'w')
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+# Worker warm-up: prefetch tokens and location caches so the first scanner request
+# is served warm. /ready reports 503 until it is done (or WARMUP_TIMEOUT has passed).
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', '60'))  # seconds
+
+warmup_state = {"status": "pending", "started_at": None, "finished_at": None, "tenants": {}}
+warmup_lock = threading.Lock()
+
+def warm_up_tenant(tenant):
+    """Fetch a tenant's token and load (or, when missing or expired, fetch) its location cache"""
+    result = {"token": False, "locations": 0}
+    warmup_state["tenants"][tenant] = result
+    try:
+        result["token"] = bool(refresh_alchemy_token(tenant))
+        
+        # Wait for a worker that is already fetching this tenant's locations, then reuse its cache
+        lock_file = acquire_refresh_file_lock(tenant)
+        try:
+            if is_cache_expired(tenant) or not os.path.exists(get_location_cache_file_path(tenant)):
+                refresh_location_cache(tenant)
+        finally:
+            lock_file.close()
+        
+        # Map the snapshot; the hierarchy index is built when a route first needs it
+        snapshot = get_location_snapshot(tenant)
+        if snapshot is not None:
+            result["locations"] = len(snapshot)
+        else:
+            result["locations"] = len(load_locations_from_cache(tenant) or [])
+    except Exception as e:
+        result["error"] = str(e)
+        logging.error(f"Error warming up tenant {tenant}: {str(e)}")
+    return result
+
+def run_warmup():
+    """Warm up every configured tenant in parallel, then mark the worker ready"""
+    init_config()
+    init_location_cache()
+    
+    tenants = list(CONFIG["tenants"].keys())
+    executor = ThreadPoolExecutor(max_workers=max(1, min(len(tenants), 4)), thread_name_prefix="warmup")
+    futures = [executor.submit(warm_up_tenant, tenant) for tenant in tenants]
+    wait(futures, timeout=WARMUP_TIMEOUT)
+    executor.shutdown(wait=False)
+    
+    with warmup_lock:
+        warmup_state["status"] = "ready"
+        warmup_state["finished_at"] = time.time()
+    logging.info(f"Worker {os.getpid()} warm-up finished in {warmup_state['finished_at'] - warmup_state['started_at']:.1f}s")
+
+def start_warmup():
+    """Start the warm-up once per worker process (called from gunicorn's post_worker_init)"""
+    with warmup_lock:
+        if warmup_state["status"] != "pending":
+            return
+        warmup_state["status"] = "warming"
+        warmup_state["started_at"] = time.time()
+    threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
+    
+    # A hung tenant must not keep the worker out of the load balancer forever
+    def finish_warmup():
+        with warmup_lock:
+            if warmup_state["status"] == "warming":
+                logging.warning(f"Worker warm-up did not finish within {WARMUP_TIMEOUT}s, reporting ready anyway")
+                warmup_state["status"] = "ready"
+                warmup_state["finished_at"] = time.time()
+    start_daemon_timer(WARMUP_TIMEOUT, finish_warmup)
+
 # Authentication for admin routes
 def authenticate(username, password):
     """Validate admin credentials"""
@@ -523,6 +2563,105 @@ def authenticate(username, password):
     admin_password = os.getenv('ADMIN_PASSWORD', 'admin123')
     return username == admin_username and password == admin_password
 
+def apply_config(config):
+    """
+    Switch this worker to a newly loaded config. Token caches, rate limiters and
+    bulkheads are reset only for tenants whose settings changed or were removed.
+    """
+    global CONFIG, DEFAULT_URLS, DEFAULT_TENANT
+    previous_tenants = CONFIG["tenants"] if CONFIG else {}
+    
+    CONFIG = config
+    DEFAULT_URLS = config["default_urls"]
+    DEFAULT_TENANT = config["default_tenant"]
+    rebuild_tenant_configs()
+    record_config_state(config)
+    
+    for tenant_id, settings in previous_tenants.items():
+        if config["tenants"].get(tenant_id) == settings:
+            continue
+        token_cache.pop(tenant_id, None)
+        reset_rate_limiter(tenant_id)
+        if tenant_id not in config["tenants"]:
+            reset_tenant_bulkhead(tenant_id)
+            drop_location_index(tenant_id)
+
+def run_startup_diagnostics():
+    """Log the config directory and file diagnostics that fast startup skips at boot"""
+    try:
+        ensure_config_directory()
+        logging.info(f"Config path exists: {os.path.exists(RENDER_CONFIG_PATH)}")
+    except Exception as e:
+        logging.error(f"Error running startup diagnostics: {str(e)}")
+
+def init_config():
+    """Load the configuration once per process; later calls return the cached config"""
+    if CONFIG is not None:
+        return CONFIG
+    with config_state_lock:
+        if CONFIG is None:
+            config = read_config_file() if FAST_STARTUP else None
+            if config is None:
+                ensure_config_file()
+                config = load_config()
+            apply_config(config)
+            if FAST_STARTUP:
+                threading.Thread(target=run_startup_diagnostics, name="startup-diagnostics", daemon=True).start()
+    return CONFIG
+
+def read_config_file():
+    """Read the config file without the startup diagnostics, or None if it is unusable"""
+    try:
+        with open(RENDER_CONFIG_PATH, 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"Error reading config file: {str(e)}")
+        return None
+    if not config or not config.get("tenants"):
+        return None
+    return config
+
+def reload_config_if_changed():
+    """Reload the config when another worker has written a new version, returning True if it did"""
+    with config_state_lock:
+        if get_config_file_id() == config_state["file_id"]:
+            return False
+        config = read_config_file()
+        if config is None:
+            return False
+        if config.get("config_version", 0) == config_state["version"] and config == CONFIG:
+            record_config_state(config)
+            return False
+        logging.info(f"Config changed on disk (version {config_state['version']} -> {config.get('config_version', 0)}), reloading")
+        apply_config(config)
+        return True
+
+def watch_config():
+    """Background loop that polls the config file's identity every CONFIG_POLL_INTERVAL seconds"""
+    while True:
+        time.sleep(CONFIG_POLL_INTERVAL)
+        try:
+            reload_config_if_changed()
+        except Exception as e:
+            logging.error(f"Error checking for config changes: {str(e)}")
+
+@app.before_request
+def load_config_on_first_request():
+    """Make sure the configuration is loaded before any route uses it (fast startup loads it here)"""
+    init_config()
+    return None
+
+@app.before_request
+def start_config_watcher():
+    """Start the config watcher once per worker process (threads do not survive a fork)"""
+    if config_state["watcher_pid"] == os.getpid() or CONFIG_POLL_INTERVAL <= 0:
+        return None
+    with config_state_lock:
+        if config_state["watcher_pid"] != os.getpid():
+            config_state["watcher_pid"] = os.getpid()
+            threading.Thread(target=watch_config, name="config-watcher", daemon=True).start()
+    return None
+
 @app.before_request
 def require_auth():
     """
@@ -552,51 +2691,39 @@ def require_auth():
             # Not authenticated, redirect to login page
             return redirect(url_for('admin_login'))
 
-def get_tenant_config(tenant_id):
-    """Get tenant configuration from config file"""
-    if tenant_id not in CONFIG["tenants"]:
-        logging.error(f"Tenant {tenant_id} not found in configuration")
-        tenant_id = DEFAULT_TENANT
-    
-    tenant = CONFIG["tenants"][tenant_id]
-    
-    # Build the complete tenant configuration
-    tenant_config = {
-        "tenant_id": tenant_id,
-        "tenant_name": tenant.get("tenant_name"),
-        "display_name": tenant.get("display_name", tenant.get("tenant_name")),
-        "description": tenant.get("description", ""),
-        "button_class": tenant.get("button_class", "primary"),
-    }
-    
-    # Check for a directly stored refresh token first
-    if "stored_refresh_token" in tenant and tenant["stored_refresh_token"]:
-        tenant_config["refresh_token"] = tenant["stored_refresh_token"]
-    else:
-        # Fall back to environment variable
-        tenant_config["refresh_token"] = os.getenv(tenant.get("env_token_var"))
-    
-    # Add URLs based on config
-    if tenant.get("use_custom_urls") and "custom_urls" in tenant:
-        tenant_config.update({
-            "refresh_url": tenant["custom_urls"].get("refresh_url"),
-            "api_url": tenant["custom_urls"].get("api_url"),
-            "filter_url": tenant["custom_urls"].get("filter_url"),
-            "find_records_url": tenant["custom_urls"].get("find_records_url"),
-            "base_url": tenant["custom_urls"].get("base_url")
-        })
-    else:
-        tenant_config.update({
-            "refresh_url": DEFAULT_URLS["refresh_url"],
-            "api_url": DEFAULT_URLS["api_url"],
-            "filter_url": DEFAULT_URLS["filter_url"],
-            "find_records_url": DEFAULT_URLS["find_records_url"],
-            "base_url": DEFAULT_URLS["base_url"]
-        })
+# Routes outside /admin/ that write the config file
+CONFIG_WRITE_ENDPOINTS = {"update_tenant_token"}
+
+@app.before_request
+def sync_config_before_admin_change():
+    """Config changes edit the latest config, not this worker's possibly older copy"""
+    if request.method == 'POST' and (request.endpoint in CONFIG_WRITE_ENDPOINTS or
+                                     (request.path.startswith('/admin/') and request.path != '/admin/login')):
+        reload_config_if_changed()
+    return None
+
+@app.after_request
+def add_server_timing(response):
+    """Send collected phase timings as Server-Timing and log slow requests with their breakdown"""
+    phases = g.pop("phase_timings", None)
+    if phases is None:
+        return response
+    stop_phase_timings()
+    total = time.perf_counter() - g.request_timing_started
+    response.headers["Server-Timing"] = format_server_timing(phases, g.phase_descriptions, total)
     
-    return tenant_config
+    if SLOW_REQUEST_THRESHOLD > 0 and total >= SLOW_REQUEST_THRESHOLD:
+        logging.warning("Slow request: " + json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "tenant": (request.view_args or {}).get("tenant"),
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in phases.items()}
+        }))
+    return response
 
-def refresh_alchemy_token(tenant):
+def refresh_alchemy_token(tenant, deadline=None):
     """Refresh the Alchemy API token for a specific tenant"""
     global token_cache
     
@@ -616,23 +2743,29 @@ def refresh_alchemy_token(tenant):
     current_time = time.time()
     if (token_cache[tenant]["access_token"] and 
         token_cache[tenant]["expires_at"] > current_time + 300):
-        logging.info(f"Using cached Alchemy token for tenant: {tenant}")
+        log_hot_path("Using cached Alchemy token for tenant: %s", tenant)
+        increment_counter("token_refreshes_total", tenant=tenant, result="cached")
         return token_cache[tenant]["access_token"]
     
     if not refresh_token:
         logging.error(f"Missing refresh token for tenant: {tenant}")
+        increment_counter("token_refreshes_total", tenant=tenant, result="missing_token")
         return None
     
     try:
         logging.info(f"Refreshing Alchemy API token for tenant: {tenant}")
-        response = requests.put(
+        response = alchemy_request(
+            tenant,
+            'refresh-token',
             refresh_url, 
+            deadline,
             json={"refreshToken": refresh_token},
             headers={"Content-Type": "application/json"}
         )
         
         if not response.ok:
             logging.error(f"Failed to refresh token for tenant {tenant}. Status: {response.status_code}, Response: {response.text}")
+            increment_counter("token_refreshes_total", tenant=tenant, result="error")
             return None
         
         data = response.json()
@@ -643,6 +2776,7 @@ def refresh_alchemy_token(tenant):
         
         if not tenant_token:
             logging.error(f"Tenant '{tenant_name}' not found in refresh response")
+            increment_counter("token_refreshes_total", tenant=tenant, result="error")
             return None
         
         # Cache the token
@@ -655,10 +2789,12 @@ def refresh_alchemy_token(tenant):
         }
         
         logging.info(f"Successfully refreshed Alchemy token for tenant {tenant}, expires in {expires_in} seconds")
+        increment_counter("token_refreshes_total", tenant=tenant, result="refreshed")
         return access_token
         
     except Exception as e:
         logging.error(f"Error refreshing Alchemy token for tenant {tenant}: {str(e)}")
+        increment_counter("token_refreshes_total", tenant=tenant, result="error")
         return None
 
 # Helper function to debug API response structure
@@ -735,78 +2871,219 @@ def get_fallback_locations():
         }
     ]
 
+# Location transformation engine
+LOCATION_NAME_FIELDS = frozenset(["LocationName", "RecordName", "Name"])
+
+def get_first_row_value(row):
+    """Get the first value of a field row, or None"""
+    values = row.get("values")
+    if values:
+        return values[0].get("value")
+    return None
+
+def transform_location(location):
+    """
+    Transform one Alchemy location record into the frontend format.
+    Walks the record's fields once, collecting the name, the direct
+    sublocations (deduplicated by ID) and the LocatedAt parent.
+    """
+    record_id = location.get("recordId") or location.get("id", "unknown")
+    
+    # The top-level name field is the most reliable source of the name
+    name = location.get("name") or None
+    name_from_fields = None
+    sublocations = []
+    seen_sublocation_ids = set()
+    parent = None
+    
+    for field in location.get("fields") or ():
+        identifier = field.get("identifier")
+        
+        if identifier == "Item":
+            # Sublocations are the direct children listed in the "Item" field
+            for row in field.get("rows") or ():
+                value = get_first_row_value(row)
+                if isinstance(value, dict) and "recordId" in value and "name" in value:
+                    sublocation_id = str(value["recordId"])
+                    if sublocation_id not in seen_sublocation_ids:
+                        seen_sublocation_ids.add(sublocation_id)
+                        sublocations.append({"id": sublocation_id, "name": value["name"]})
+        
+        elif identifier == "LocatedAt":
+            # This location is located at another location (its parent in the hierarchy)
+            if parent is None:
+                for row in field.get("rows") or ():
+                    value = get_first_row_value(row)
+                    if isinstance(value, dict) and "recordId" in value and "name" in value:
+                        parent = {"id": str(value["recordId"]), "name": value["name"]}
+                        break
+        
+        elif name is None and name_from_fields is None and identifier in LOCATION_NAME_FIELDS:
+            rows = field.get("rows")
+            if rows:
+                value = get_first_row_value(rows[0])
+                if value and isinstance(value, str) and value.strip():
+                    name_from_fields = value
+    
+    return {
+        "id": str(record_id),
+        "name": name or name_from_fields or f"Location {record_id}",
+        "sublocations": sublocations,
+        "parentId": parent["id"] if parent else None
+    }
+
+def transform_locations(locations_data, tenant):
+    """Transform a filter-records response into the list of locations needed by the frontend"""
+    formatted_locations = []
+    sublocation_count = 0
+    
+    for location in locations_data:
+        try:
+            location_info = transform_location(location)
+            formatted_locations.append(location_info)
+            sublocation_count += len(location_info["sublocations"])
+        except Exception as e:
+            logging.error(f"Error processing location {location.get('recordId', location.get('id', 'unknown'))} for tenant {tenant}: {str(e)}")
+    
+    logging.info(f"Transformed {len(formatted_locations)} locations with {sublocation_count} sublocations for tenant {tenant}")
+    return formatted_locations
+
+# Streaming filter-records parsing: records are decoded one at a time from the
+# response body, so a refresh never holds the raw body and every parsed record at once
+STREAM_LOCATION_RESPONSES = os.getenv('STREAM_LOCATION_RESPONSES', 'true').lower() == 'true'
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 64 * 1024))
+
+json_decoder = json.JSONDecoder()
+JSON_STRUCTURE_CHARS = re.compile(r'["{}\[\]]')
+JSON_STRING_SPECIAL_CHARS = re.compile(r'["\\]')
+
+def scan_json_value(buffer, state):
+    """
+    Continue scanning the object, array or string that starts at state["start"] for its end.
+    Returns the offset just past the value, or None when it continues beyond the buffer;
+    state keeps the scan offset, nesting depth and string flag for the next call.
+    """
+    position = state["scan"]
+    while True:
+        if state["in_string"]:
+            match = JSON_STRING_SPECIAL_CHARS.search(buffer, position)
+            if match is None:
+                state["scan"] = len(buffer)
+                return None
+            if match.group() == "\\":
+                if match.end() >= len(buffer):
+                    # The escaped character is in the next chunk
+                    state["scan"] = match.start()
+                    return None
+                position = match.end() + 1
+                continue
+            state["in_string"] = False
+            position = match.end()
+            if state["depth"] == 0:
+                return position
+            continue
+        
+        match = JSON_STRUCTURE_CHARS.search(buffer, position)
+        if match is None:
+            state["scan"] = len(buffer)
+            return None
+        char = match.group()
+        position = match.end()
+        if char == '"':
+            state["in_string"] = True
+        elif char in "{[":
+            state["depth"] += 1
+        else:
+            state["depth"] -= 1
+            if state["depth"] == 0:
+                return position
+
+def iter_json_array(chunks, deadline=None):
+    """
+    Yield the items of a top-level JSON array from an iterable of byte chunks.
+    Only the undecoded tail of the body and the current item are held in memory.
+    An item split across chunks is scanned incrementally for its end and decoded
+    once, so large items cost linear time. Raises DeadlineExceeded between chunks
+    once the deadline has passed.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    position = 0
+    started = False
+    exhausted = False
+    pending = None  # scan state of an item that continues in the next chunk
+    
+    while True:
+        # Skip whitespace and separators between items
+        while pending is None and position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array in filter-records response")
+                started = True
+                position += 1
+                continue
+            if pending is None and buffer[position] == "]":
+                return
+            
+            complete = True
+            if pending is not None:
+                complete = exhausted or scan_json_value(buffer, pending) is not None
+            if complete:
+                try:
+                    item, end = json_decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if exhausted or pending is not None:
+                        raise
+                    # The item continues in the next chunk; from now on only scan the new data for its end
+                    if buffer[position] in '{["':
+                        pending = {"scan": position, "depth": 0, "in_string": False}
+                else:
+                    # A number is only complete once a delimiter follows it, it may go on in the next chunk
+                    if exhausted or buffer[position] in '{["' or buffer[end:end + 1] in (",", "]", " ", "\t", "\r", "\n"):
+                        yield item
+                        position = end
+                        pending = None
+                        continue
+        elif exhausted:
+            raise ValueError("Truncated filter-records response")
+        
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded("Request deadline reached while reading the filter-records response")
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer = buffer[position:] + decoder.decode(b"", final=True)
+        else:
+            buffer = buffer[position:] + decoder.decode(chunk)
+        if pending is not None:
+            pending["scan"] -= position
+        position = 0
+
+def iter_response_records(response, deadline=None):
+    """Yield filter-records items from a streamed response, or from its parsed body when not streaming"""
+    if not STREAM_LOCATION_RESPONSES:
+        yield from response.json()
+        return
+    try:
+        yield from iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), deadline)
+    finally:
+        response.close()
+
 # Location name extraction helper
 def extract_location_name_improved(location):
     """Improved function to extract location name from Alchemy API response"""
-    # First, try to use the top-level name field which is most reliable
-    if "name" in location and location["name"]:
-        return location["name"]
-    
-    # Fallback to a default name if top-level name isn't available
-    default_name = f"Location {location.get('recordId') or location.get('id', 'unknown')}"
-    
-    # Check for name in fields array if top-level name isn't available
-    if "fields" in location:
-        # Look for fields with identifiers that might contain location name
-        name_field_identifiers = ["LocationName", "RecordName", "Name"]
-        for field in location["fields"]:
-            identifier = field.get("identifier", "")
-            if identifier in name_field_identifiers:
-                if field.get("rows") and len(field["rows"]) > 0:
-                    row = field["rows"][0]
-                    if row.get("values") and len(row["values"]) > 0:
-                        value = row["values"][0].get("value")
-                        if value and isinstance(value, str) and value.strip():
-                            return value
-    
-    # If no suitable name found, return the default
-    return default_name
+    return transform_location(location)["name"]
 
 def extract_sublocations_improved(location):
     """Improved function to extract sublocations from Alchemy API response"""
-    sublocations = []
-    location_id = location.get("recordId") or location.get("id", "unknown")
-    
-    # The primary issue is likely here - we need to be more selective about which sublocations we extract
-    # For a given location, we only want its direct children, not all related locations
-    
-    # In your first document's data structure, sublocations are typically found in the "Item" field
-    if "fields" in location:
-        for field in location["fields"]:
-            if field.get("identifier") == "Item":
-                for row in field.get("rows", []):
-                    if row.get("values") and len(row["values"]) > 0:
-                        value = row["values"][0].get("value")
-                        if isinstance(value, dict) and "recordId" in value and "name" in value:
-                            sublocation = {
-                                "id": str(value.get("recordId")),
-                                "name": value.get("name")
-                            }
-                            # Check if this sublocation is not already in the list
-                            if not any(sub["id"] == sublocation["id"] for sub in sublocations):
-                                sublocations.append(sublocation)
-    
-    # Check if there are any LocatedAt references - these might be parent-child relationships
-    if "fields" in location:
-        for field in location["fields"]:
-            if field.get("identifier") == "LocatedAt":
-                for row in field.get("rows", []):
-                    if row.get("values") and len(row["values"]) > 0:
-                        value = row["values"][0].get("value")
-                        if isinstance(value, dict) and "recordId" in value and "name" in value:
-                            parent_id = str(value.get("recordId"))
-                            # This location is located at another location - might be useful for hierarchy
-                            logging.info(f"Location {location.get('name')} is located at {value.get('name')}")
-    
-    # Debug log to track what we're extracting
-    logging.info(f"Found {len(sublocations)} sublocations for location {location.get('name', 'unknown')} (ID: {location_id})")
-    if sublocations:
-        logging.info(f"Sublocations for {location.get('name')}: {[sub['name'] for sub in sublocations]}")
-    
-    return sublocations
+    return transform_location(location)["sublocations"]
 
 # Function to find record ID by scanned barcode
-def find_record_id_by_barcode(barcode, access_token, tenant):
+def find_record_id_by_barcode(barcode, access_token, tenant, deadline=None):
     """Find Alchemy record ID using barcode as the Result.Code"""
     try:
         tenant_config = get_tenant_config(tenant)
@@ -826,14 +3103,19 @@ def find_record_id_by_barcode(barcode, access_token, tenant):
             "Content-Type": "application/json"
         }
         
-        logging.info(f"Finding record for barcode '{barcode}' in tenant {tenant}: {json.dumps(find_payload)}")
-        response = requests.put(find_records_url, headers=headers, json=find_payload)
+        log_hot_path("Finding record for barcode '%s' in tenant %s: %s", barcode, tenant, LazyLogValue(json.dumps, find_payload))
+        if is_hedging_enabled(tenant):
+            response = hedged_alchemy_request(tenant, 'find-records', find_records_url, deadline, headers=headers, json=find_payload)
+        else:
+            response = alchemy_request(tenant, 'find-records', find_records_url, deadline, headers=headers, json=find_payload)
         
         # Log response for debugging
-        logging.info(f"Find records API response status code for tenant {tenant}: {response.status_code}")
+        log_hot_path("Find records API response status code for tenant %s: %s", tenant, response.status_code)
         
         if not response.ok:
             logging.error(f"Error finding record for barcode {barcode} in tenant {tenant}: {response.text}")
+            if is_retryable_status(response.status_code):
+                raise AlchemyUnavailableError(f"find-records returned status code {response.status_code}")
             return None
         
         # Process response
@@ -850,13 +3132,319 @@ def find_record_id_by_barcode(barcode, access_token, tenant):
             logging.error(f"Found record for barcode {barcode} in tenant {tenant} but could not extract recordId")
             return None
             
-        logging.info(f"Found record ID {record_id} for barcode {barcode} in tenant {tenant}")
+        log_hot_path("Found record ID %s for barcode %s in tenant %s", record_id, barcode, tenant)
         return record_id
         
+    except (CircuitOpenError, DeadlineExceeded, AlchemyUnavailableError, AlchemyRateLimitError):
+        raise
+    except requests.RequestException as e:
+        raise AlchemyUnavailableError(f"find-records call failed: {str(e)}")
     except Exception as e:
         logging.error(f"Error finding record for barcode {barcode} in tenant {tenant}: {str(e)}")
         return None
 
+def build_location_update_payload(record_id, location_id, sublocation_id):
+    """Build the update-record payload that sets a record's location fields"""
+    alchemy_payload = {
+        "recordId": int(record_id),
+        "fields": [
+            {
+                "identifier": "Location",
+                "rows": [
+                    {
+                        "row": 0,
+                        "values": [
+                            {
+                                "value": location_id,
+                                "valuePreview": ""
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+    }
+    
+    # Add sublocation if provided
+    if sublocation_id:
+        alchemy_payload["fields"].append({
+            "identifier": "Sublocation",
+            "rows": [
+                {
+                    "row": 0,
+                    "values": [
+                        {
+                            "value": sublocation_id,
+                            "valuePreview": ""
+                        }
+                    ]
+                }
+            ]
+        })
+    
+    return alchemy_payload
+
+def update_record_location(barcode, access_token, tenant, location_id, sublocation_id, deadline=None):
+    """
+    Look up the record for a barcode and set its location in Alchemy.
+    Returns None on success or an error message on failure.
+    """
+    tenant_config = get_tenant_config(tenant)
+    
+    # First, find the record ID from the barcode
+    with timed_phase("find"):
+        record_id = find_record_id_by_barcode(barcode, access_token, tenant, deadline)
+    
+    if not record_id:
+        return f"Record not found for this barcode in tenant {tenant_config['display_name']}"
+    
+    # Format data for Alchemy API update
+    alchemy_payload = build_location_update_payload(record_id, location_id, sublocation_id)
+    
+    # Send update to Alchemy API
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json"
+    }
+    
+    api_url = tenant_config.get('api_url')
+    log_hot_path("Sending update for record %s (barcode: %s) to Alchemy for tenant %s: %s",
+                 record_id, barcode, tenant, LazyLogValue(json.dumps, alchemy_payload))
+    with timed_phase("update"):
+        response = alchemy_request(tenant, 'update-record', api_url, deadline, headers=headers, json=alchemy_payload)
+    
+    # Log response for debugging
+    log_hot_path("Alchemy API response status code for tenant %s: %s", tenant, response.status_code)
+    if response.content:
+        log_hot_path("Alchemy API response for tenant %s: %s", tenant, LazyLogValue(getattr, response, "text"))
+    
+    # Check if the request was successful
+    if response.ok:
+        return None
+    
+    logging.error(f"Error updating record {record_id} (barcode: {barcode}) for tenant {tenant}: {response.text}")
+    if is_retryable_status(response.status_code):
+        raise AlchemyUnavailableError(f"API returned status code {response.status_code}")
+    return f"API returned status code {response.status_code}"
+
+# Durable queue of location updates that could not be sent while a circuit was open.
+# The queue file is shared by every worker, so changes to it happen under a per-tenant
+# file lock, and only one worker at a time drains a tenant's queue.
+pending_updates_lock = threading.Lock()
+
+def get_pending_updates_file_path(tenant):
+    """Get the path to the pending update queue file for a specific tenant"""
+    return os.path.join(PENDING_UPDATES_DIR, f"{tenant}_pending.jsonl")
+
+def acquire_pending_updates_file_lock(tenant, name, blocking=True):
+    """
+    Take a cross-worker lock ("queue" or "drain") for a tenant's pending update queue.
+    Returns the open lock file (close it to release) or None if another worker holds it.
+    """
+    os.makedirs(PENDING_UPDATES_DIR, exist_ok=True)
+    lock_file = open(os.path.join(PENDING_UPDATES_DIR, f"{tenant}.{name}.lock"), 'w')
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+@contextmanager
+def pending_queue_locked(tenant):
+    """Hold both this worker's and the cross-worker lock on a tenant's queue file"""
+    with pending_updates_lock:
+        lock_file = acquire_pending_updates_file_lock(tenant, "queue")
+        try:
+            yield
+        finally:
+            lock_file.close()
+
+def read_pending_updates_file(path, tenant):
+    """Read the entries of a queue file, skipping corrupt lines"""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logging.error(f"Skipping corrupt pending update entry for tenant {tenant}: {line}")
+    return entries
+
+def write_pending_updates_file(path, entries):
+    """Replace a queue file with the given entries"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def queue_pending_update(tenant, barcode, location_id, sublocation_id):
+    """Append a location update to the tenant's durable queue"""
+    entry = {
+        "barcode": barcode,
+        "locationId": location_id,
+        "sublocationId": sublocation_id,
+        "queued_at": time.time()
+    }
+    with pending_queue_locked(tenant):
+        with open(get_pending_updates_file_path(tenant), 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    logging.warning(f"Queued location update for barcode {barcode} in tenant {tenant} until Alchemy recovers")
+
+def load_pending_updates(tenant):
+    """Load the queued location updates for a tenant, including any batch being drained"""
+    queue_file = get_pending_updates_file_path(tenant)
+    return (read_pending_updates_file(queue_file + ".draining", tenant) +
+            read_pending_updates_file(queue_file, tenant))
+
+def count_pending_updates(tenant):
+    """Count the queued location updates for a tenant"""
+    try:
+        with pending_queue_locked(tenant):
+            return len(load_pending_updates(tenant))
+    except Exception as e:
+        logging.error(f"Error reading pending updates for tenant {tenant}: {str(e)}")
+        return 0
+
+def get_pending_update_retry_delay(attempts):
+    """Backoff before the next attempt of a queued update that has failed `attempts` times"""
+    return min(PENDING_UPDATE_RETRY_DELAY * 2 ** (attempts - 1), PENDING_UPDATE_MAX_RETRY_DELAY)
+
+def postpone_pending_updates(entries, reason, min_delay=0):
+    """
+    Back off queued updates that were not sent because Alchemy is unavailable or busy,
+    so that a timed drain retries them. Unlike a failed attempt this does not hold the
+    entry back from a drain that starts earlier, e.g. once the circuit closes.
+    Entries that are not due yet keep their time.
+    """
+    now = time.time()
+    for entry in entries:
+        if entry.get("next_attempt_at", 0) > now:
+            continue
+        entry.pop("next_attempt_at", None)
+        entry["postponements"] = entry.get("postponements", 0) + 1
+        delay = max(min_delay, get_pending_update_retry_delay(entry["postponements"]))
+        entry["postponed_until"] = now + delay
+        entry["last_error"] = reason
+    return entries
+
+def replay_pending_updates(tenant, entries):
+    """
+    Send queued location updates to Alchemy, returning (applied count, entries still pending).
+    Only the latest update per barcode is sent. Updates that fail in a retryable way, or are
+    not sent because Alchemy is unavailable, stay queued with a backoff; only definite
+    rejections (4xx, unknown barcode) are dropped.
+    """
+    latest = {entry["barcode"]: index for index, entry in enumerate(entries)}
+    entries = [entry for index, entry in enumerate(entries) if latest[entry["barcode"]] == index]
+    
+    access_token = refresh_alchemy_token(tenant)
+    if not access_token:
+        logging.error(f"Cannot drain pending updates for tenant {tenant}: unable to get access token")
+        return 0, postpone_pending_updates(entries, "Unable to get access token")
+    
+    applied = 0
+    remaining = []
+    for index, entry in enumerate(entries):
+        if entry.get("next_attempt_at", 0) > time.time():
+            remaining.append(entry)
+            continue
+        try:
+            error = update_record_location(entry["barcode"], access_token, tenant,
+                                           entry["locationId"], entry.get("sublocationId"))
+        except (CircuitOpenError, DeadlineExceeded, SchedulerOverloaded) as e:
+            # Alchemy went down again or is busy, keep the rest for the next attempt
+            logging.warning(f"Postponing pending updates for tenant {tenant}: {str(e)}")
+            min_delay = CIRCUIT_OPEN_SECONDS if isinstance(e, CircuitOpenError) else getattr(e, "retry_after", 0)
+            return applied, remaining + postpone_pending_updates(entries[index:], str(e), min_delay)
+        except Exception as e:
+            # 5xx, 429, timeouts, connection errors and anything unexpected may pass later
+            entry.pop("postponed_until", None)
+            entry["attempts"] = entry.get("attempts", 0) + 1
+            entry["next_attempt_at"] = time.time() + get_pending_update_retry_delay(entry["attempts"])
+            entry["last_error"] = str(e)
+            logging.warning(f"Queued update for barcode {entry['barcode']} in tenant {tenant} failed "
+                            f"(attempt {entry['attempts']}), retrying later: {str(e)}")
+            remaining.append(entry)
+            continue
+        
+        if error is None:
+            applied += 1
+        else:
+            logging.error(f"Dropping queued update for barcode {entry['barcode']} in tenant {tenant}: {error}")
+    
+    return applied, remaining
+
+def schedule_pending_updates_retry(tenant, entries):
+    """Drain again once the earliest backed-off or postponed entry is due"""
+    due_times = [entry[key] for entry in entries for key in ("next_attempt_at", "postponed_until") if key in entry]
+    if due_times:
+        start_daemon_timer(max(1, min(due_times) - time.time()), lambda: drain_pending_updates(tenant))
+
+def merge_pending_updates(remaining, newer):
+    """
+    Put entries that are still pending back ahead of the ones queued while they were
+    replayed, dropping any that a newer entry for the same barcode supersedes
+    """
+    newer_barcodes = {entry["barcode"] for entry in newer}
+    return [entry for entry in remaining if entry["barcode"] not in newer_barcodes] + newer
+
+def drain_pending_updates(tenant):
+    """Replay queued location updates for a tenant, keeping the ones that still fail"""
+    drain_lock_file = acquire_pending_updates_file_lock(tenant, "drain", blocking=False)
+    if drain_lock_file is None:
+        logging.info(f"Pending updates for tenant {tenant} are already being replayed by another worker")
+        return 0
+    try:
+        # Take the current queue aside so new updates can keep being queued meanwhile.
+        # A .draining file left behind by a drain that crashed is replayed first.
+        queue_file = get_pending_updates_file_path(tenant)
+        draining_file = queue_file + ".draining"
+        with pending_queue_locked(tenant):
+            if not os.path.exists(draining_file):
+                if not os.path.exists(queue_file):
+                    return 0
+                os.replace(queue_file, draining_file)
+        
+        entries = read_pending_updates_file(draining_file, tenant)
+        
+        previous_priority = set_outbound_priority(PRIORITY_REFRESH)
+        try:
+            applied, remaining = replay_pending_updates(tenant, entries)
+        finally:
+            set_outbound_priority(previous_priority)
+        
+        # Put whatever is left back at the front of the queue
+        with pending_queue_locked(tenant):
+            if remaining:
+                newer = read_pending_updates_file(queue_file, tenant)
+                write_pending_updates_file(queue_file, merge_pending_updates(remaining, newer))
+            os.remove(draining_file)
+        
+        schedule_pending_updates_retry(tenant, remaining)
+        logging.info(f"Applied {applied} queued location updates for tenant {tenant}, {len(remaining)} still pending")
+        return applied
+    except Exception as e:
+        logging.error(f"Error replaying pending updates for tenant {tenant}: {str(e)}")
+        return 0
+    finally:
+        drain_lock_file.close()
+
 # ROUTES
 
 @app.route('/')
@@ -958,6 +3546,34 @@ def test_page():
     """Serve test HTML for location dropdown"""
     return render_template('test.html')
 
+# Liveness and readiness probes for the load balancer
+@app.route('/healthz')
+def healthz():
+    """The worker process is up and serving requests"""
+    return jsonify({"status": "ok"})
+
+@app.route('/ready')
+def ready():
+    """Report ready only once this worker's warm-up has finished"""
+    # Servers without the gunicorn hook (e.g. the Flask dev server) warm up on the first probe
+    start_warmup()
+    status = {
+        "status": warmup_state["status"],
+        "pid": os.getpid(),
+        "tenants": dict(warmup_state["tenants"])
+    }
+    if warmup_state["status"] != "ready":
+        return jsonify(status), 503
+    return jsonify(status)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for the metrics of all workers"""
+    token_valid = bool(METRICS_TOKEN) and request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}"
+    if not token_valid and not session.get('admin_authenticated'):
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 # Route for getting test locations (reliable hardcoded data)
 @app.route('/get-test-locations')
 @app.route('/get-test-locations/<tenant>')
@@ -995,6 +3611,9 @@ def get_test_locations(tenant="default"):
 # Route for getting locations from Alchemy API
 @app.route('/get-locations/<tenant>')
 def get_locations(tenant):
+    previous_priority = set_outbound_priority(PRIORITY_READ)
+    bulkhead_entered = False
+    start_request_timing()
     try:
         # Check if tenant exists
         if tenant not in CONFIG["tenants"]:
@@ -1005,10 +3624,11 @@ def get_locations(tenant):
         
         # If using cache and it's not expired, return cached data
         if use_cache and not is_cache_expired(tenant):
-            cached_locations = load_locations_from_cache(tenant)
-            if cached_locations:
-                logging.info(f"Using cached locations for tenant {tenant} (count: {len(cached_locations)})")
-                return jsonify(cached_locations)
+            with timed_phase("cache"):
+                cached_response = cached_locations_response(tenant)
+            if cached_response is not None:
+                increment_counter("location_cache_requests_total", tenant=tenant, result="hit")
+                return cached_response
             else:
                 logging.info(f"No valid cache found for tenant {tenant}, fetching from API")
         else:
@@ -1016,21 +3636,51 @@ def get_locations(tenant):
                 logging.info(f"Location cache expired for tenant {tenant}, fetching from API")
             else:
                 logging.info(f"Cache bypass requested for tenant {tenant}, fetching from API")
+        increment_counter("location_cache_requests_total", tenant=tenant, result="miss" if use_cache else "bypass")
+        
+        # Don't wait on Alchemy while its filter endpoint is known to be down
+        if is_circuit_open(tenant, 'filter-records'):
+            logging.warning(f"Circuit for filter-records is open for tenant {tenant}, serving stale cache")
+            stale_response = cached_locations_response(tenant)
+            if stale_response is not None:
+                increment_counter("location_cache_requests_total", tenant=tenant, result="stale")
+                return stale_response
+            return jsonify(get_fallback_locations())
         
         # Get a fresh token and fetch from API
         tenant_config = get_tenant_config(tenant)
         
+        deadline = get_route_deadline("get_locations")
+        
+        # Enter the tenant's bulkhead and shed the read when the scheduler is already backed up;
+        # each Alchemy call then waits for its own outbound slot, operator updates going first
+        try:
+            with timed_phase("queue"):
+                enter_tenant_bulkhead(tenant)
+                bulkhead_entered = True
+                if is_scheduler_queue_full(PRIORITY_READ):
+                    raise SchedulerOverloaded("Too much read work queued, try again later")
+        except SchedulerOverloaded as e:
+            stale_response = cached_locations_response(tenant)
+            if stale_response is not None:
+                logging.warning(f"Outbound scheduler busy, serving stale cached locations for tenant {tenant}")
+                increment_counter("location_cache_requests_total", tenant=tenant, result="stale")
+                return stale_response
+            return overloaded_response(e)
+        
         # Get access token
-        access_token = refresh_alchemy_token(tenant)
+        with timed_phase("token"):
+            access_token = refresh_alchemy_token(tenant, deadline)
         
         if not access_token:
             logging.warning(f"Failed to get access token for tenant {tenant}, checking for stale cache")
             
             # Try to use stale cache if it exists
-            stale_locations = load_locations_from_cache(tenant)
-            if stale_locations:
+            stale_response = cached_locations_response(tenant)
+            if stale_response is not None:
                 logging.info(f"Using stale cached locations for tenant {tenant} as fallback")
-                return jsonify(stale_locations)
+                increment_counter("location_cache_requests_total", tenant=tenant, result="stale")
+                return stale_response
             
             logging.warning(f"No stale cache found, returning fallback locations")
             return jsonify(get_fallback_locations())
@@ -1052,8 +3702,10 @@ def get_locations(tenant):
         }
         
         filter_url = tenant_config.get('filter_url')
-        logging.info(f"Fetching locations from Alchemy API for tenant {tenant}: {json.dumps(filter_payload)}")
-        response = requests.put(filter_url, headers=headers, json=filter_payload)
+        log_hot_path("Fetching locations from Alchemy API for tenant %s: %s", tenant, LazyLogValue(json.dumps, filter_payload))
+        with timed_phase("fetch"):
+            response = alchemy_request(tenant, 'filter-records', filter_url, deadline, headers=headers, json=filter_payload,
+                                       stream=STREAM_LOCATION_RESPONSES)
         
         # Log response for debugging
         logging.info(f"Alchemy API response status code for tenant {tenant}: {response.status_code}")
@@ -1062,50 +3714,32 @@ def get_locations(tenant):
             logging.error(f"Error fetching locations for tenant {tenant}: {response.text}")
             
             # Try to use stale cache if it exists
-            stale_locations = load_locations_from_cache(tenant)
-            if stale_locations:
+            stale_response = cached_locations_response(tenant)
+            if stale_response is not None:
                 logging.info(f"Using stale cached locations for tenant {tenant} as fallback")
-                return jsonify(stale_locations)
+                increment_counter("location_cache_requests_total", tenant=tenant, result="stale")
+                return stale_response
             
             return jsonify(get_fallback_locations())
         
-        # Process the response
-        locations_data = response.json()
-        logging.info(f"Received {len(locations_data)} locations from API for tenant {tenant}")
-        
-        # Debug the API response structure
-        debug_api_response(locations_data)
-        
-        # Transform the data into the format needed by the frontend
-        formatted_locations = []
-        
-        for location in locations_data:
-            try:
-                # Extract location ID - use recordId if it exists, otherwise fall back to id
-                location_id = str(location.get("recordId") or location.get("id", "unknown"))
-                
-                # Extract location name using improved method
-                location_name = extract_location_name_improved(location)
-                
-                # Extract sublocations - improved version
-                sublocations = extract_sublocations_improved(location)
-                
-                # Create location info object
-                location_info = {
-                    "id": location_id,
-                    "name": location_name,
-                    "sublocations": sublocations
-                }
-                
-                formatted_locations.append(location_info)
-                logging.info(f"Added location for tenant {tenant}: {location_name} (ID: {location_id}) with {len(sublocations)} sublocations")
-                
-            except Exception as e:
-                logging.error(f"Error processing location {location.get('recordId', location.get('id', 'unknown'))} for tenant {tenant}: {str(e)}")
+        # Process the response record by record (streamed, so this includes reading the body)
+        with timed_phase("transform"):
+            records = iter_response_records(response, deadline)
+            first_record = next(records, None)
+            
+            # Debug the API response structure (only the first record is kept while streaming)
+            if first_record is not None:
+                if should_log_hot_path():
+                    debug_api_response([first_record])
+                records = chain([first_record], records)
+            
+            # Transform the data into the format needed by the frontend
+            formatted_locations = transform_locations(records, tenant)
         
         # Save the processed locations to cache
         if formatted_locations:
-            save_locations_to_cache(tenant, formatted_locations)
+            with timed_phase("save"):
+                save_locations_to_cache(tenant, formatted_locations)
         
         # If no locations were found, add fallback locations
         if not formatted_locations:
@@ -1118,12 +3752,137 @@ def get_locations(tenant):
         logging.error(f"Error fetching locations for tenant {tenant}: {str(e)}")
         
         # Try to use stale cache if it exists
-        stale_locations = load_locations_from_cache(tenant)
-        if stale_locations:
+        stale_response = cached_locations_response(tenant)
+        if stale_response is not None:
             logging.info(f"Using stale cached locations for tenant {tenant} as fallback after error")
-            return jsonify(stale_locations)
+            increment_counter("location_cache_requests_total", tenant=tenant, result="stale")
+            return stale_response
             
         return jsonify(get_fallback_locations())
+    finally:
+        set_outbound_priority(previous_priority)
+        if bulkhead_entered:
+            leave_tenant_bulkhead(tenant)
+
+# Routes for the location hierarchy index
+@app.route('/locations/<tenant>/tree')
+def get_location_tree(tenant):
+    """Return the cached location hierarchy, optionally limited in depth"""
+    if tenant not in CONFIG["tenants"]:
+        return jsonify({"error": f"Unknown tenant: {tenant}"}), 404
+    
+    index = get_location_index(tenant)
+    if index is None:
+        return jsonify({"error": f"No cached locations for tenant {tenant}"}), 404
+    
+    max_depth = request.args.get('depth', type=int)
+    return jsonify([build_location_subtree(index, root_id, max_depth) for root_id in index["roots"]])
+
+@app.route('/locations/<tenant>/subtree/<location_id>')
+def get_location_subtree(tenant, location_id):
+    """Return the part of the location hierarchy below a location"""
+    if tenant not in CONFIG["tenants"]:
+        return jsonify({"error": f"Unknown tenant: {tenant}"}), 404
+    
+    index = get_location_index(tenant)
+    if index is None:
+        return jsonify({"error": f"No cached locations for tenant {tenant}"}), 404
+    if location_id not in index["nodes"]:
+        return jsonify({"error": f"Unknown location ID: {location_id}"}), 404
+    
+    max_depth = request.args.get('depth', type=int)
+    subtree = build_location_subtree(index, location_id, max_depth)
+    subtree["path"] = [{"id": node_id, "name": index["nodes"][node_id].name}
+                       for node_id in index["nodes"][location_id].path]
+    return jsonify(subtree)
+
+@app.route('/locations/<tenant>/ancestors/<location_id>')
+def get_location_ancestors(tenant, location_id):
+    """Return the ancestors of a location, from the root down to its parent"""
+    if tenant not in CONFIG["tenants"]:
+        return jsonify({"error": f"Unknown tenant: {tenant}"}), 404
+    
+    index = get_location_index(tenant)
+    if index is None:
+        return jsonify({"error": f"No cached locations for tenant {tenant}"}), 404
+    if location_id not in index["nodes"]:
+        return jsonify({"error": f"Unknown location ID: {location_id}"}), 404
+    
+    nodes = index["nodes"]
+    return jsonify([{"id": node_id, "name": nodes[node_id].name, "type": nodes[node_id].type}
+                    for node_id in nodes[location_id].path])
+
+@app.route('/search-locations/<tenant>')
+def search_locations(tenant):
+    """Return the top matches for a location typeahead query"""
+    if tenant not in CONFIG["tenants"]:
+        return jsonify({"error": f"Unknown tenant: {tenant}"}), 404
+    
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int), 1), SEARCH_MAX_LIMIT)
+    
+    index = get_location_index(tenant)
+    if index is None:
+        return jsonify([])
+    return jsonify(search_location_index(index, query, limit))
+
+@app.route('/locations/<tenant>/page')
+def get_locations_page(tenant):
+    """
+    Return one page of flattened location rows from the cache.
+    Supports sort=hierarchy|name|id, order=asc|desc, q (name contains) and
+    level=0|1 filters; pass the returned next_cursor to get the following page.
+    """
+    if tenant not in CONFIG["tenants"]:
+        return jsonify({"error": f"Unknown tenant: {tenant}"}), 404
+    
+    index = get_location_index(tenant)
+    if index is None:
+        return jsonify({"error": f"No cached locations for tenant {tenant}"}), 404
+    
+    limit = min(max(request.args.get('limit', PAGE_DEFAULT_LIMIT, type=int), 1), PAGE_MAX_LIMIT)
+    token = request.args.get('cursor')
+    
+    if token:
+        # The cursor carries the query it was issued for
+        try:
+            cursor = decode_page_cursor(token)
+            sort, descending, query, level, position = (
+                cursor["sort"], cursor["desc"], cursor["q"], cursor["level"], cursor["pos"]
+            )
+            if not (isinstance(sort, str) and isinstance(descending, bool) and isinstance(query, str) and
+                    (level is None or (isinstance(level, int) and not isinstance(level, bool))) and
+                    isinstance(position, int) and not isinstance(position, bool) and position >= 0):
+                raise TypeError("Cursor fields have the wrong type")
+        except (ValueError, KeyError, TypeError):
+            return jsonify({"error": "Invalid cursor"}), 400
+        if cursor.get("v") != index["version"]:
+            return jsonify({"error": "Location data changed, restart paging from the first page"}), 410
+    else:
+        sort = request.args.get('sort', 'hierarchy')
+        descending = request.args.get('order', 'asc').lower() == 'desc'
+        query = request.args.get('q', '').strip().casefold()
+        level = request.args.get('level', type=int)
+        position = 0
+    
+    if sort not in PAGE_SORT_FIELDS:
+        return jsonify({"error": f"Unsupported sort field: {sort}"}), 400
+    
+    listing = get_location_listing(index)
+    order = get_filtered_row_order(listing, sort, descending, query, level)
+    page = [listing["rows"][i].to_dict() for i in order[position:position + limit]]
+    
+    next_position = position + len(page)
+    next_cursor = None
+    if next_position < len(order):
+        next_cursor = encode_page_cursor({
+            "v": index["version"], "sort": sort, "desc": descending,
+            "q": query, "level": level, "pos": next_position
+        })
+    
+    response = jsonify({"rows": page, "next_cursor": next_cursor, "total": len(order)})
+    response.headers["X-Total-Count"] = str(len(order))
+    return response
 
 # Route for updating record location in Alchemy
 @app.route('/update-location/<tenant>', methods=['POST'])
@@ -1133,6 +3892,10 @@ def update_location(tenant):
     if not data:
         return jsonify({"status": "error", "message": "No data provided"}), 400
     
+    # Operator updates get the highest outbound priority
+    previous_priority = set_outbound_priority(PRIORITY_UPDATE)
+    bulkhead_entered = False
+    phases = start_request_timing()
     try:
         # Check if tenant exists
         if tenant not in CONFIG["tenants"]:
@@ -1150,114 +3913,503 @@ def update_location(tenant):
         if not location_id:
             return jsonify({"status": "error", "message": "No location ID provided"}), 400
         
+        # Reject location IDs that the cached hierarchy doesn't know about
+        with timed_phase("validate"):
+            location_error = validate_location_ids(tenant, location_id, sublocation_id)
+        if location_error:
+            return jsonify({"status": "error", "message": location_error}), 400
+        
+        deadline = get_route_deadline("update_location")
+        batch_started_at = time.monotonic()
+        
+        with timed_phase("queue"):
+            # Enter the tenant's bulkhead so a slow tenant can't take every worker thread
+            enter_tenant_bulkhead(tenant)
+            bulkhead_entered = True
+            
+            # Shed the batch when even the update queue is full
+            if is_scheduler_queue_full(PRIORITY_UPDATE):
+                raise SchedulerOverloaded("Too much update work queued, try again later")
+        
         # Get a fresh access token from Alchemy
-        access_token = refresh_alchemy_token(tenant)
+        with timed_phase("token"):
+            access_token = refresh_alchemy_token(tenant, deadline)
         
         if not access_token:
+            if time.monotonic() >= deadline:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Timed out authenticating with Alchemy API for tenant {tenant}",
+                    "successful": [],
+                    "failed": [{"id": barcode, "error": "Timed out before this barcode could be processed", "timed_out": True}
+                               for barcode in barcode_codes],
+                    "queued": [],
+                    "timed_out": list(barcode_codes)
+                }), 504
             return jsonify({
                 "status": "error", 
                 "message": f"Failed to authenticate with Alchemy API for tenant {tenant}"
             }), 500
         
-        success_records = []
-        failed_records = []
+        update_circuit_open = is_circuit_open(tenant, 'update-record')
         
-        for barcode in barcode_codes:
+        def update_barcode(barcode):
+            """Update one barcode, returning an (outcome, error message) pair"""
+            if time.monotonic() >= deadline:
+                return "timed_out", "Timed out before this barcode could be processed"
+            
             try:
-                # First, find the record ID from the barcode
-                record_id = find_record_id_by_barcode(barcode, access_token, tenant)
-                
-                if not record_id:
-                    failed_records.append({
-                        "id": barcode,
-                        "error": f"Record not found for this barcode in tenant {tenant_config['display_name']}"
-                    })
-                    continue
-                
-                # Format data for Alchemy API update
-                alchemy_payload = {
-                    "recordId": int(record_id),
-                    "fields": [
-                        {
-                            "identifier": "Location",
-                            "rows": [
-                                {
-                                    "row": 0,
-                                    "values": [
-                                        {
-                                            "value": location_id,
-                                            "valuePreview": ""
-                                        }
-                                    ]
-                                }
-                            ]
-                        }
-                    ]
-                }
-                
-                # Add sublocation if provided
-                if sublocation_id:
-                    alchemy_payload["fields"].append({
-                        "identifier": "Sublocation",
-                        "rows": [
-                            {
-                                "row": 0,
-                                "values": [
-                                    {
-                                        "value": sublocation_id,
-                                        "valuePreview": ""
-                                    }
-                                ]
-                            }
-                        ]
-                    })
+                if update_circuit_open:
+                    raise CircuitOpenError(f"Alchemy update-record endpoint is unavailable for tenant {tenant} (circuit open)")
                 
-                # Send update to Alchemy API
-                headers = {
-                    "Authorization": f"Bearer {access_token}",
-                    "Content-Type": "application/json"
-                }
+                error = update_record_location(barcode, access_token, tenant, location_id, sublocation_id, deadline)
+                return ("success", None) if error is None else ("failed", error)
                 
-                api_url = tenant_config.get('api_url')
-                logging.info(f"Sending update for record {record_id} (barcode: {barcode}) to Alchemy for tenant {tenant}: {json.dumps(alchemy_payload)}")
-                response = requests.put(api_url, headers=headers, json=alchemy_payload)
+            except DeadlineExceeded as e:
+                logging.warning(f"Deadline reached while processing barcode {barcode} for tenant {tenant}: {str(e)}")
+                return "timed_out", "Timed out while processing this barcode; its update may or may not have been applied"
                 
-                # Log response for debugging
-                logging.info(f"Alchemy API response status code for tenant {tenant}: {response.status_code}")
-                if response.text:
-                    logging.info(f"Alchemy API response for tenant {tenant}: {response.text}")
+            except SchedulerOverloaded as e:
+                if time.monotonic() >= deadline:
+                    return "timed_out", "Timed out before this barcode could be processed"
+                return "failed", str(e)
                 
-                # Check if the request was successful
-                if response.ok:
-                    success_records.append(barcode)
-                else:
-                    logging.error(f"Error updating record {record_id} (barcode: {barcode}) for tenant {tenant}: {response.text}")
-                    failed_records.append({
-                        "id": barcode,
-                        "error": f"API returned status code {response.status_code}"
-                    })
+            except CircuitOpenError as e:
+                logging.warning(f"Skipping barcode {barcode} for tenant {tenant}: {str(e)}")
+                if QUEUE_UPDATES_WHEN_CIRCUIT_OPEN:
+                    queue_pending_update(tenant, barcode, location_id, sublocation_id)
+                    return "queued", "Alchemy is unavailable; update queued and will be applied automatically"
+                return "failed", str(e)
                 
             except Exception as e:
                 logging.error(f"Error processing barcode {barcode} for tenant {tenant}: {str(e)}")
-                failed_records.append({
-                    "id": barcode,
-                    "error": str(e)
-                })
+                return "failed", str(e)
+        
+        profile = g.get("profiler_session")
+        
+        def process_barcode(barcode):
+            """Update one barcode on a pool thread, also returning its phase timings"""
+            timings = start_phase_timings()
+            set_outbound_priority(PRIORITY_UPDATE)
+            if profile is not None:
+                # Sample this pool thread as part of the profiled request
+                add_profiled_thread(profile, "update_location (tenant pool)")
+            try:
+                outcome, error = update_barcode(barcode)
+            finally:
+                stop_phase_timings()
+                if profile is not None:
+                    remove_profiled_thread(profile)
+            return outcome, error, timings
+        
+        # Process the barcodes in parallel on the tenant's own bounded pool
+        with timed_phase("barcodes"):
+            futures = [submit_to_tenant_pool(tenant, process_barcode, barcode) for barcode in barcode_codes]
+            wait(futures, timeout=max(0, deadline - time.monotonic()))
+        
+        # Don't let barcodes still waiting for a pool thread start after the deadline;
+        # running ones stop at their next Alchemy call, which checks the deadline
+        cancelled = {future for future in futures if not future.done() and future.cancel()}
+        
+        success_records = []
+        failed_records = []
+        queued_records = []
+        timed_out_records = []
+        barcode_timings = []
+        
+        for barcode, future in zip(barcode_codes, futures):
+            if future in cancelled:
+                # Still waiting for a pool thread when the deadline hit
+                outcome, error = "timed_out", "Timed out before this barcode could be processed"
+            elif future.done():
+                outcome, error, timings = future.result()
+                barcode_timings.append(timings)
+            else:
+                # Still running when the deadline hit
+                outcome, error = "timed_out", "Timed out while processing this barcode; its update may or may not have been applied"
+            
+            if outcome == "success":
+                success_records.append(barcode)
+                continue
+            
+            if outcome == "queued":
+                # Accepted: the update is stored and will be applied when Alchemy recovers
+                queued_records.append(barcode)
+                continue
+            
+            failed_entry = {"id": barcode, "error": error}
+            if outcome == "timed_out":
+                failed_entry["timed_out"] = True
+                timed_out_records.append(barcode)
+            failed_records.append(failed_entry)
+        
+        for outcome, barcodes in (("success", success_records), ("queued", queued_records),
+                                  ("timed_out", timed_out_records)):
+            if barcodes:
+                increment_counter("update_barcodes_total", len(barcodes), tenant=tenant, outcome=outcome)
+        failed_count = len(failed_records) - len(timed_out_records)
+        if failed_count:
+            increment_counter("update_barcodes_total", failed_count, tenant=tenant, outcome="failed")
+        increment_counter("update_batches_total", tenant=tenant, status="success" if not failed_records else "partial")
+        observe_histogram("update_batch_duration_seconds", time.monotonic() - batch_started_at, tenant=tenant)
+        merge_barcode_timings(phases, g.phase_descriptions, barcode_timings)
         
         # Return results
+        message = f"Updated {len(success_records)} of {len(barcode_codes)} records in tenant {tenant_config['display_name']}"
+        if queued_records:
+            message += f"; {len(queued_records)} queued until Alchemy is available again"
         return jsonify({
             "status": "success" if not failed_records else "partial",
-            "message": f"Updated {len(success_records)} of {len(barcode_codes)} records in tenant {tenant_config['display_name']}",
+            "message": message,
             "successful": success_records,
-            "failed": failed_records
+            "failed": failed_records,
+            "queued": queued_records,
+            "timed_out": timed_out_records
         })
         
+    except SchedulerOverloaded as e:
+        logging.warning(f"Shedding location update for tenant {tenant}: {str(e)}")
+        increment_counter("update_batches_total", tenant=tenant, status="shed")
+        return overloaded_response(e)
     except Exception as e:
         logging.error(f"Error updating locations for tenant {tenant}: {e}")
+        increment_counter("update_batches_total", tenant=tenant, status="error")
         return jsonify({
             "status": "error", 
             "message": str(e)
         }), 500
+    finally:
+        set_outbound_priority(previous_priority)
+        if bulkhead_entered:
+            leave_tenant_bulkhead(tenant)
+
+# On-demand sampling profiler (admin only). A session is started through any worker and
+# stored in PROFILES_DIR/active.json, which every worker checks; while it runs, each worker
+# samples the stacks of the threads serving profiled requests (and of tenant pool threads
+# working on them) and adds them to the session's collapsed stacks, ready for
+# flamegraph.pl or speedscope.
+PROFILES_DIR = os.path.join(RENDER_CONFIG_DIR, 'profiles')
+PROFILER_ACTIVE_FILE = os.path.join(PROFILES_DIR, 'active.json')
+PROFILER_DEFAULT_INTERVAL = 0.01  # seconds between samples
+PROFILER_MAX_DURATION = 600  # seconds, also the limit for request-count sessions
+PROFILER_POLL_INTERVAL = 0.5  # seconds between checks of the shared session file
+PROFILER_KEEP = 50  # profiles kept on disk
+PROFILER_EXCLUDED_ENDPOINTS = ("static", "profiler_status", "start_profiler", "stop_profiler", "download_profile")
+
+profiler_state = {"profile": None, "checked_at": 0.0, "file_id": None, "shared": None}
+profiler_lock = threading.Lock()
+
+def get_frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def acquire_profiler_file_lock(name):
+    """Take a cross-worker lock in PROFILES_DIR; close the returned file to release it"""
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    lock_file = open(os.path.join(PROFILES_DIR, f"{name}.lock"), 'w')
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+def read_shared_profile():
+    """Read the session shared by all workers, or None if there is none"""
+    try:
+        with open(PROFILER_ACTIVE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_shared_profile(shared):
+    """Replace the shared session file. Caller must hold the "active" profiler file lock."""
+    temp_file = f"{PROFILER_ACTIVE_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, 'w') as f:
+            json.dump(shared, f)
+        os.replace(temp_file, PROFILER_ACTIVE_FILE)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def is_shared_profile_running(shared):
+    """Check whether a shared session still admits requests"""
+    return (shared is not None and not shared.get("stopped") and time.time() < shared["ends_at"] and
+            shared["remaining"] != 0)
+
+def start_profiler_session(endpoint=None, request_count=None, duration=None, sample_rate=1.0,
+                           interval=PROFILER_DEFAULT_INTERVAL):
+    """
+    Start profiling, in every worker, either the next request_count sampled requests
+    or every request for duration seconds, optionally only those served by one endpoint.
+    """
+    lock_file = acquire_profiler_file_lock("active")
+    try:
+        if is_shared_profile_running(read_shared_profile()):
+            raise ValueError("A profiling session is already running")
+        started_at = time.time()
+        profile = {
+            "id": f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}",
+            "mode": "requests" if request_count else "window",
+            "endpoint": endpoint,
+            "remaining": request_count,
+            "sample_rate": sample_rate,
+            "interval": interval,
+            "started_at": started_at,
+            "ends_at": started_at + min(duration or PROFILER_MAX_DURATION, PROFILER_MAX_DURATION),
+            "stopped": False
+        }
+        write_shared_profile(profile)
+    finally:
+        lock_file.close()
+    logging.info(f"Started profiling session {profile['id']} ({profile['mode']}, endpoint: {endpoint or 'any'})")
+    return profile
+
+def stop_profiler_session():
+    """Mark the shared session stopped; each worker writes its samples when it notices. Returns it or None."""
+    lock_file = acquire_profiler_file_lock("active")
+    try:
+        shared = read_shared_profile()
+        if not is_shared_profile_running(shared):
+            return None
+        shared["stopped"] = True
+        write_shared_profile(shared)
+        return shared
+    finally:
+        lock_file.close()
+
+def get_shared_profile():
+    """The shared session as of the last check, re-reading the file at most every PROFILER_POLL_INTERVAL"""
+    now = time.monotonic()
+    if now - profiler_state["checked_at"] < PROFILER_POLL_INTERVAL:
+        return profiler_state["shared"]
+    profiler_state["checked_at"] = now
+    try:
+        file_stat = os.stat(PROFILER_ACTIVE_FILE)
+        file_id = (file_stat.st_ino, file_stat.st_mtime_ns)
+    except OSError:
+        file_id = None
+    if file_id != profiler_state["file_id"]:
+        profiler_state["file_id"] = file_id
+        profiler_state["shared"] = read_shared_profile() if file_id else None
+    return profiler_state["shared"]
+
+def join_shared_profile(shared):
+    """Get this worker's part of a running shared session, starting its sampler on first use"""
+    with profiler_lock:
+        profile = profiler_state["profile"]
+        if profile is not None and profile["id"] == shared["id"]:
+            return profile
+        if profile is not None:
+            # An earlier session's sampler is still finishing; join the new one on a later request
+            return None
+        profile = dict(shared, threads={}, stacks=Counter(), samples=0, requests=0, stop=threading.Event())
+        profiler_state["profile"] = profile
+    threading.Thread(target=run_profiler_sampler, args=(profile,), name="profiler", daemon=True).start()
+    return profile
+
+def claim_profiled_request(profile):
+    """Take one of a request-count session's remaining requests, shared by all workers"""
+    if random.random() >= profile["sample_rate"]:
+        return False
+    lock_file = acquire_profiler_file_lock("active")
+    try:
+        shared = read_shared_profile()
+        if not is_shared_profile_running(shared) or shared["id"] != profile["id"]:
+            return False
+        shared["remaining"] -= 1
+        write_shared_profile(shared)
+        return True
+    finally:
+        lock_file.close()
+
+def is_profile_finished(profile):
+    """Check whether this worker's part of a session is over (checked by its sampler)"""
+    if profile["stop"].is_set():
+        return True
+    shared = get_shared_profile()
+    if shared is None or shared["id"] != profile["id"] or shared.get("stopped") or time.time() >= shared["ends_at"]:
+        return True
+    # A request-count session ends once no requests are left and this worker's are done
+    with profiler_lock:
+        return shared["remaining"] == 0 and not profile["threads"]
+
+def run_profiler_sampler(profile):
+    """Sample the profiled threads' stacks until the session is over"""
+    own_id = threading.get_ident()
+    while not profile["stop"].wait(profile["interval"]) and not is_profile_finished(profile):
+        with profiler_lock:
+            threads = dict(profile["threads"])
+        if not threads:
+            continue
+        for thread_id, frame in sys._current_frames().items():
+            label = threads.get(thread_id)
+            if label is None or thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(get_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(label)
+            profile["stacks"][";".join(reversed(stack))] += 1
+            profile["samples"] += 1
+    finish_profiler_session(profile)
+
+def finish_profiler_session(profile):
+    """Add this worker's collapsed stacks and counts to the session's files in PROFILES_DIR"""
+    with profiler_lock:
+        if profiler_state["profile"] is profile:
+            profiler_state["profile"] = None
+    
+    lock_file = None
+    try:
+        lock_file = acquire_profiler_file_lock(profile["id"])
+        stacks_file = os.path.join(PROFILES_DIR, f"{profile['id']}.folded")
+        summary_file = os.path.join(PROFILES_DIR, f"{profile['id']}.json")
+        
+        # Merge with the parts other workers have already written
+        stacks = Counter(profile["stacks"])
+        if os.path.exists(stacks_file):
+            with open(stacks_file, 'r') as f:
+                for line in f:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack:
+                        stacks[stack] += int(count)
+        summary = {"requests": 0, "samples": 0, "workers": []}
+        if os.path.exists(summary_file):
+            with open(summary_file, 'r') as f:
+                summary = json.load(f)
+        
+        leaf_counts = Counter()
+        for stack, count in stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        summary.update({
+            "id": profile["id"],
+            "mode": profile["mode"],
+            "endpoint": profile["endpoint"],
+            "started": datetime.fromtimestamp(profile["started_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_seconds": max(summary.get("duration_seconds", 0), round(time.time() - profile["started_at"], 1)),
+            "interval_ms": profile["interval"] * 1000,
+            "requests": summary["requests"] + profile["requests"],
+            "samples": summary["samples"] + profile["samples"],
+            "workers": summary["workers"] + [os.getpid()],
+            "top_frames": leaf_counts.most_common(20)
+        })
+        with open(stacks_file, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(summary_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        for old_summary in list_profiles()[PROFILER_KEEP:]:
+            for extension in (".json", ".folded", ".lock"):
+                old_file = os.path.join(PROFILES_DIR, old_summary["id"] + extension)
+                if os.path.exists(old_file):
+                    os.remove(old_file)
+        logging.info(f"Profiling session {profile['id']} finished in worker {os.getpid()}: "
+                     f"{profile['samples']} samples from {profile['requests']} requests")
+    except Exception as e:
+        logging.error(f"Error writing profile {profile['id']}: {str(e)}")
+    finally:
+        if lock_file is not None:
+            lock_file.close()
+
+def list_profiles():
+    """List the stored profile summaries, newest first"""
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    profiles = []
+    for filename in os.listdir(PROFILES_DIR):
+        if filename.endswith(".json") and filename != os.path.basename(PROFILER_ACTIVE_FILE):
+            try:
+                with open(os.path.join(PROFILES_DIR, filename), 'r') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(profiles, key=lambda profile: profile["id"], reverse=True)
+
+profiled_thread = threading.local()
+
+def add_profiled_thread(profile, label):
+    """Sample the current thread under a label until remove_profiled_thread"""
+    with profiler_lock:
+        profile["threads"][threading.get_ident()] = label
+    profiled_thread.profile = profile
+    profiled_thread.label = label
+
+def remove_profiled_thread(profile):
+    with profiler_lock:
+        profile["threads"].pop(threading.get_ident(), None)
+    profiled_thread.profile = profiled_thread.label = None
+
+def get_profiled_thread():
+    """Get the profile and label this thread is sampled under, or (None, None)"""
+    return getattr(profiled_thread, "profile", None), getattr(profiled_thread, "label", None)
+
+@app.before_request
+def start_request_profiling():
+    """Register this request's thread with the running profiling session if it is selected"""
+    shared = get_shared_profile()
+    if not is_shared_profile_running(shared) or request.endpoint in PROFILER_EXCLUDED_ENDPOINTS:
+        return None
+    if shared["endpoint"] and request.endpoint != shared["endpoint"]:
+        return None
+    profile = join_shared_profile(shared)
+    if profile is None:
+        return None
+    if shared["remaining"] is not None and not claim_profiled_request(profile):
+        return None
+    add_profiled_thread(profile, request.endpoint or "unknown")
+    with profiler_lock:
+        profile["requests"] += 1
+    g.profiler_session = profile
+    return None
+
+@app.teardown_request
+def stop_request_profiling(error=None):
+    profile = g.pop("profiler_session", None)
+    if profile is not None:
+        remove_profiled_thread(profile)
+
+@app.route('/admin/profiler', methods=['GET'])
+def profiler_status():
+    """Report the running profiling session and the stored profiles"""
+    shared = read_shared_profile()
+    running = None
+    if is_shared_profile_running(shared):
+        running = {key: shared[key] for key in ("id", "mode", "endpoint", "remaining")}
+        running["ends_in_seconds"] = round(shared["ends_at"] - time.time(), 1)
+    return jsonify({"running": running, "profiles": list_profiles()})
+
+@app.route('/admin/profiler/start', methods=['POST'])
+def start_profiler():
+    """Start a profiling session in every worker"""
+    data = request.get_json(silent=True) or request.form
+    try:
+        endpoint = data.get('endpoint') or None
+        if endpoint and endpoint not in app.view_functions:
+            raise ValueError(f"Unknown route: {endpoint}")
+        request_count = int(data['requests']) if data.get('requests') else None
+        duration = float(data['duration']) if data.get('duration') else None
+        sample_rate = float(data.get('sample_rate') or 1)
+        interval = float(data.get('interval_ms') or PROFILER_DEFAULT_INTERVAL * 1000) / 1000
+        if not request_count and not duration:
+            raise ValueError("Give a number of requests or a duration to profile")
+        if (request_count is not None and request_count < 1) or not 0 < sample_rate <= 1 or interval < 0.001:
+            raise ValueError("Invalid profiler settings")
+        profile = start_profiler_session(endpoint, request_count, duration, sample_rate, interval)
+    except (ValueError, TypeError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "message": f"Profiling session {profile['id']} started", "id": profile["id"]})
+
+@app.route('/admin/profiler/stop', methods=['POST'])
+def stop_profiler():
+    """Stop the running profiling session; every worker then writes its part of the profile"""
+    profile = stop_profiler_session()
+    if profile is None:
+        return jsonify({"status": "error", "message": "No profiling session is running"}), 404
+    return jsonify({"status": "success", "message": f"Profiling session {profile['id']} stopped"})
+
+@app.route('/admin/profiles/<path:filename>')
+def download_profile(filename):
+    """Download a stored profile summary (.json) or collapsed stack file (.folded)"""
+    return send_from_directory(PROFILES_DIR, filename, as_attachment=True)
 
 # Admin login routes
 @app.route('/admin/login', methods=['GET', 'POST'])
@@ -1295,6 +4447,12 @@ def admin_panel():
     return render_template('admin.html', 
                            tenants=CONFIG["tenants"], 
                            default_tenant=DEFAULT_TENANT,
+                           default_max_in_flight=TENANT_MAX_IN_FLIGHT,
+                           default_pool_size=TENANT_POOL_SIZE,
+                           profiles=list_profiles(),
+                           profiler_running=is_shared_profile_running(read_shared_profile()),
+                           profiler_endpoints=sorted(name for name in app.view_functions
+                                                     if name not in PROFILER_EXCLUDED_ENDPOINTS),
                            active_page='admin')
 
 # Add these routes for cache management
@@ -1306,11 +4464,28 @@ def admin_refresh_location_cache(tenant):
         if tenant not in CONFIG["tenants"]:
             return jsonify({"status": "error", "message": f"Unknown tenant: {tenant}"}), 404
         
+        if is_scheduler_queue_full(PRIORITY_REFRESH):
+            return overloaded_response(SchedulerOverloaded("Too many cache refreshes queued, try again later"))
+        
+        # Like the scheduled refresh, skip the tenant if another worker is refreshing it
+        lock_file = acquire_refresh_file_lock(tenant, blocking=False)
+        if lock_file is None:
+            return jsonify({"status": "error", "message": f"A cache refresh for tenant {tenant} is already running"}), 409
+        
+        def refresh_and_unlock():
+            try:
+                refresh_location_cache(tenant)
+            finally:
+                lock_file.close()
+        
         # Start a background thread to refresh the cache
-        import threading
-        refresh_thread = threading.Thread(target=refresh_location_cache, args=(tenant,))
-        refresh_thread.daemon = True
-        refresh_thread.start()
+        try:
+            refresh_thread = threading.Thread(target=refresh_and_unlock)
+            refresh_thread.daemon = True
+            refresh_thread.start()
+        except Exception:
+            lock_file.close()
+            raise
         
         return jsonify({
             "status": "success", 
@@ -1325,8 +4500,10 @@ def admin_refresh_location_cache(tenant):
 def admin_refresh_all_location_caches():
     """Endpoint to manually refresh location cache for all tenants"""
     try:
+        if is_scheduler_queue_full(PRIORITY_REFRESH):
+            return overloaded_response(SchedulerOverloaded("Too many cache refreshes queued, try again later"))
+        
         # Start a background thread to refresh all caches
-        import threading
         refresh_thread = threading.Thread(target=refresh_all_location_caches)
         refresh_thread.daemon = True
         refresh_thread.start()
@@ -1340,6 +4517,28 @@ def admin_refresh_all_location_caches():
         logging.error(f"Error starting location cache refresh for all tenants: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/admin/drain-pending-updates/<tenant>', methods=['POST'])
+def admin_drain_pending_updates(tenant):
+    """Endpoint to replay queued location updates for a tenant"""
+    try:
+        # Check if tenant exists
+        if tenant not in CONFIG["tenants"]:
+            return jsonify({"status": "error", "message": f"Unknown tenant: {tenant}"}), 404
+        
+        # Start a background thread to drain the queue
+        drain_thread = threading.Thread(target=drain_pending_updates, args=(tenant,))
+        drain_thread.daemon = True
+        drain_thread.start()
+        
+        return jsonify({
+            "status": "success",
+            "message": f"Replaying {count_pending_updates(tenant)} queued updates for tenant {tenant}",
+            "note": "The replay is running in the background. Check the status endpoint for details."
+        })
+    except Exception as e:
+        logging.error(f"Error starting pending update replay for tenant {tenant}: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route('/admin/location-cache-status', methods=['GET'])
 def admin_location_cache_status():
     """Endpoint to get location cache status for all tenants"""
@@ -1352,7 +4551,8 @@ def admin_location_cache_status():
             "system": {
                 "cache_directory": LOCATION_CACHE_DIR,
                 "directory_exists": os.path.exists(LOCATION_CACHE_DIR),
-                "refresh_interval_days": CACHE_REFRESH_INTERVAL / (24 * 60 * 60)
+                "refresh_interval_days": CACHE_REFRESH_INTERVAL / (24 * 60 * 60),
+                "outbound_scheduler": get_scheduler_metrics()
             }
         }
         
@@ -1361,6 +4561,7 @@ def admin_location_cache_status():
             cache_file = get_location_cache_file_path(tenant_id)
             cache_exists = os.path.exists(cache_file)
             cache_size = os.path.getsize(cache_file) if cache_exists else 0
+            snapshot_file = get_location_snapshot_file_path(tenant_id)
             
             last_refreshed = metadata["last_refreshed"].get(tenant_id, 0)
             refresh_status = metadata["refresh_status"].get(tenant_id, {
@@ -1395,12 +4596,18 @@ def admin_location_cache_status():
                 "display_name": CONFIG["tenants"][tenant_id].get("display_name", tenant_id),
                 "cache_exists": cache_exists,
                 "cache_size_bytes": cache_size,
+                "snapshot_size_bytes": os.path.getsize(snapshot_file) if os.path.exists(snapshot_file) else 0,
                 "location_count": location_count,
                 "last_refreshed_timestamp": last_refreshed,
                 "last_refreshed_formatted": formatted_time,
                 "next_scheduled_refresh": next_refresh,
                 "is_expired": is_expired,
-                "refresh_status": refresh_status
+                "refresh_status": refresh_status,
+                "throttle": get_rate_limit_metrics(tenant_id),
+                "circuits": get_circuit_metrics(tenant_id),
+                "hedging": get_hedge_metrics(tenant_id),
+                "bulkhead": get_bulkhead_metrics(tenant_id),
+                "pending_updates": count_pending_updates(tenant_id)
             }
         
         return jsonify(status_data)
@@ -1432,7 +4639,9 @@ def update_tenant_token():
         
         # Verify token by calling Alchemy's token validation/refresh endpoint
         try:
-            response = requests.put(
+            response = alchemy_request(
+                tenant_id,
+                'refresh-token',
                 DEFAULT_URLS['refresh_url'], 
                 json={"refreshToken": refresh_token},
                 headers={"Content-Type": "application/json"}
@@ -1460,16 +4669,14 @@ def update_tenant_token():
         try:
             # Directly modify the global CONFIG
             CONFIG["tenants"][tenant_id]["stored_refresh_token"] = refresh_token
+            rebuild_tenant_configs()
             
             # Attempt to save configuration
             save_result = save_config(CONFIG)
             
             if not save_result:
                 logging.error(f"Failed to save configuration for tenant {tenant_id}")
-                return jsonify({
-                    "status": "error", 
-                    "message": "Failed to save configuration"
-                }), 500
+                return config_save_failed_response()
         except Exception as config_error:
             logging.error(f"Error updating configuration: {config_error}")
             return jsonify({
@@ -1490,6 +4697,19 @@ def update_tenant_token():
         logging.error(f"Unexpected error updating tenant token: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def parse_bulkhead_form():
+    """Read the optional bulkhead limits from the tenant form, None meaning the default"""
+    settings = {}
+    for field in ("max_in_flight", "pool_size"):
+        value = request.form.get(field, '').strip()
+        if not value:
+            settings[field] = None
+            continue
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f"{field} must be a positive whole number")
+        settings[field] = int(value)
+    return settings
+
 @app.route('/admin/add-tenant', methods=['POST'])
 def add_tenant():
     """Add a new tenant to the configuration"""
@@ -1510,6 +4730,11 @@ def add_tenant():
         if tenant_id in CONFIG["tenants"]:
             return jsonify({"status": "error", "message": f"Tenant {tenant_id} already exists"}), 400
         
+        try:
+            bulkhead_settings = parse_bulkhead_form()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
         # Create tenant config
         new_tenant = {
             "tenant_name": tenant_name,
@@ -1519,6 +4744,7 @@ def add_tenant():
             "env_token_var": env_token_var,
             "use_custom_urls": use_custom_urls
         }
+        new_tenant.update({key: value for key, value in bulkhead_settings.items() if value is not None})
         
         # Add custom URLs if needed
         if use_custom_urls:
@@ -1532,9 +4758,11 @@ def add_tenant():
         
         # Update configuration in memory
         CONFIG["tenants"][tenant_id] = new_tenant
+        rebuild_tenant_configs()
         
         # Save configuration to file
-        save_config(CONFIG)
+        if not save_config(CONFIG):
+            return config_save_failed_response()
         
         return jsonify({"status": "success", "message": f"Tenant {display_name} added successfully"})
     except Exception as e:
@@ -1560,6 +4788,11 @@ def update_tenant(tenant_id):
         if not tenant_name or not display_name or not env_token_var:
             return jsonify({"status": "error", "message": "Missing required fields"}), 400
         
+        try:
+            bulkhead_settings = parse_bulkhead_form()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
         # Update tenant config
         CONFIG["tenants"][tenant_id].update({
             "tenant_name": tenant_name,
@@ -1582,8 +4815,18 @@ def update_tenant(tenant_id):
         elif "custom_urls" in CONFIG["tenants"][tenant_id]:
             del CONFIG["tenants"][tenant_id]["custom_urls"]
         
+        # Update bulkhead limits (empty means use the defaults)
+        for key, value in bulkhead_settings.items():
+            if value is None:
+                CONFIG["tenants"][tenant_id].pop(key, None)
+            else:
+                CONFIG["tenants"][tenant_id][key] = value
+        rebuild_tenant_configs()
+        
         # Save configuration to file
-        save_config(CONFIG)
+        if not save_config(CONFIG):
+            return config_save_failed_response()
+        reset_rate_limiter(tenant_id)
         
         return jsonify({"status": "success", "message": f"Tenant {display_name} updated successfully"})
     except Exception as e:
@@ -1605,9 +4848,20 @@ def delete_tenant(tenant_id):
         # Delete tenant
         display_name = CONFIG["tenants"][tenant_id].get("display_name", tenant_id)
         del CONFIG["tenants"][tenant_id]
+        rebuild_tenant_configs()
         
         # Save configuration to file
-        save_config(CONFIG)
+        if not save_config(CONFIG):
+            return config_save_failed_response()
+        reset_rate_limiter(tenant_id)
+        reset_tenant_bulkhead(tenant_id)
+        
+        # Remove the tenant's cached locations so no worker keeps serving or mapping them
+        drop_location_index(tenant_id)
+        remove_location_snapshot(tenant_id)
+        cache_file = get_location_cache_file_path(tenant_id)
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
         
         return jsonify({"status": "success", "message": f"Tenant {display_name} deleted successfully"})
     except Exception as e:
@@ -1617,15 +4871,13 @@ def delete_tenant(tenant_id):
 @app.route('/admin/reload-config', methods=['POST'])
 def reload_config_route():
     """Reload the configuration from disk"""
-    global CONFIG, DEFAULT_URLS, DEFAULT_TENANT
     try:
-        CONFIG = load_config()
-        DEFAULT_URLS = CONFIG["default_urls"]
-        DEFAULT_TENANT = CONFIG["default_tenant"]
+        with config_state_lock:
+            apply_config(load_config())
         
         # Clear token cache to force token refresh for all tenants
-        global token_cache
-        token_cache = {}
+        token_cache.clear()
+        reset_rate_limiter()
         
         return jsonify({"status": "success", "message": "Configuration reloaded successfully"})
     except Exception as e:
@@ -1648,7 +4900,8 @@ def get_refresh_token():
                 "email": data['email'],
                 "password": data['password']
             },
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
+            timeout=DEFAULT_OUTBOUND_TIMEOUT
         )
         
         # Return the response directly
@@ -1658,6 +4911,10 @@ def get_refresh_token():
         logging.error(f"Error getting refresh token: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# Without fast startup the configuration is loaded while importing, as before
+if not FAST_STARTUP:
+    init_config()
+
 if __name__ == '__main__':
     # Get port from environment variable or default to 5000
     port = int(os.environ.get('PORT', 5000))
@@ -1981,7 +5238,7 @@ if __name__ == '__main__':
     # Log that we're starting with location caching
     logging.info(f"Starting application with location caching enabled. Cache directory: {LOCATION_CACHE_DIR}")
     
-    # Initialize location caching system
-    init_location_cache()
+    # Initialize location caching system and warm up tokens and caches
+    start_warmup()
     
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,210 @@
+"""
+Local stand-in for the Alchemy API, for benchmarks and offline experiments.
+
+Usage:
+    python benchmarks/alchemy_stub.py [--port 8900] [--latency lognormal:80:0.4]
+        [--endpoint-latency filter-records=uniform:200:600] [--error-rate 0.01]
+        [--throttle-rate 0.02] [--locations 1000] [--barcodes 100000]
+
+Serves PUT .../refresh-token, .../find-records, .../filter-records and
+.../update-record under any path prefix, so a tenant's URLs can point at
+http://127.0.0.1:<port>/core/api/v2/<endpoint>. Latency specs are "<ms>",
+"uniform:<low>:<high>", "lognormal:<median>:<sigma>" or "exp:<mean>" (all in
+milliseconds). Failed calls return 500, throttled ones 429 with Retry-After.
+refresh-token returns a token for every name in --tenant-names; find-records
+finds barcodes BC0..BC<barcodes - 1>; filter-records returns the whole
+synthetic location set regardless of drop/take. GET /stats returns the number
+of calls per endpoint and status.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_filter_records_payload  # noqa: E402
+
+ENDPOINTS = ("refresh-token", "find-records", "filter-records", "update-record")
+
+BARCODE_QUERY = re.compile(r"Result\.Code == '([^']*)'")
+
+def parse_latency(spec):
+    """Turn a latency spec into a function returning one delay in seconds"""
+    kind, _, params = str(spec).partition(":")
+    if not params:
+        delay = float(kind) / 1000
+        return lambda: delay
+    values = [float(value) for value in params.split(":")]
+    if kind == "uniform":
+        low, high = values[0] / 1000, values[1] / 1000
+        return lambda: random.uniform(low, high)
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0] / 1000), values[1]
+        return lambda: random.lognormvariate(mu, sigma)
+    if kind == "exp":
+        rate = 1000 / values[0]
+        return lambda: random.expovariate(rate)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+class AlchemyStub:
+    """A threaded HTTP server that answers like the four Alchemy endpoints the app calls"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency="0", endpoint_latency=None, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=1, locations=100, sublocations=8, barcodes=100000,
+                 tenant_names=("stub",)):
+        self.latency = {endpoint: parse_latency(latency) for endpoint in ENDPOINTS}
+        for endpoint, spec in (endpoint_latency or {}).items():
+            self.latency[endpoint] = parse_latency(spec)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.barcodes = barcodes
+        self.filter_body = json.dumps(make_filter_records_payload(locations, sublocations)).encode()
+        self.token_body = json.dumps({"tokens": [{"tenant": name, "accessToken": f"stub-token-{name}", "expiresIn": 3600}
+                                                 for name in tenant_names]}).encode()
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/core/api/v2/"
+
+    def config_urls(self):
+        """The URL settings that point a tenant at this stub"""
+        return {
+            "refresh_url": self.base_url + "refresh-token",
+            "api_url": self.base_url + "update-record",
+            "filter_url": self.base_url + "filter-records",
+            "find_records_url": self.base_url + "find-records",
+            "base_url": self.base_url
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, endpoint, status):
+        with self.stats_lock:
+            self.stats[f"{endpoint} {status}"] += 1
+
+    def respond(self, endpoint, body):
+        """Return (status, headers, body) for one call, after the simulated latency"""
+        time.sleep(self.latency[endpoint]())
+
+        roll = random.random()
+        if roll < self.throttle_rate:
+            return 429, {"Retry-After": str(self.retry_after)}, b'{"message": "Too many requests"}'
+        if roll < self.throttle_rate + self.error_rate:
+            return 500, {}, b'{"message": "Simulated failure"}'
+
+        if endpoint == "refresh-token":
+            return 200, {}, self.token_body
+        if endpoint == "filter-records":
+            return 200, {}, self.filter_body
+        if endpoint == "find-records":
+            match = BARCODE_QUERY.search(body.get("queryTerm", ""))
+            barcode = match.group(1) if match else ""
+            if barcode.startswith("BC") and barcode[2:].isdigit() and int(barcode[2:]) < self.barcodes:
+                return 200, {}, json.dumps([{"recordId": int(barcode[2:]) + 1}]).encode()
+            return 200, {}, b"[]"
+        return 200, {}, json.dumps({"recordId": body.get("recordId")}).encode()
+
+    def make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def send_body(self, status, headers, body):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_PUT(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw_body = self.rfile.read(length) if length else b""
+                endpoint = self.path.rstrip("/").rsplit("/", 1)[-1].split("?")[0]
+                if endpoint not in ENDPOINTS:
+                    stub.count(endpoint, 404)
+                    self.send_body(404, {}, b'{"message": "Unknown endpoint"}')
+                    return
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                except ValueError:
+                    stub.count(endpoint, 400)
+                    self.send_body(400, {}, b'{"message": "Invalid JSON"}')
+                    return
+                status, headers, response_body = stub.respond(endpoint, body)
+                stub.count(endpoint, status)
+                self.send_body(status, headers, response_body)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    with stub.stats_lock:
+                        stats = dict(stub.stats)
+                    self.send_body(200, {}, json.dumps(stats, sort_keys=True).encode())
+                else:
+                    self.send_body(404, {}, b'{"message": "Not found"}')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def add_stub_arguments(parser):
+    """Add the stub's options to a benchmark's argument parser"""
+    parser.add_argument("--latency", default="lognormal:80:0.4", help="latency spec for every endpoint")
+    parser.add_argument("--endpoint-latency", action="append", default=[], metavar="ENDPOINT=SPEC",
+                        help="latency spec for one endpoint, e.g. filter-records=uniform:200:600")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--locations", type=int, default=100, help="locations returned by filter-records")
+    parser.add_argument("--barcodes", type=int, default=100000, help="barcodes find-records knows")
+
+def stub_from_arguments(args, **kwargs):
+    """Build an AlchemyStub from the options added by add_stub_arguments"""
+    endpoint_latency = dict(option.split("=", 1) for option in args.endpoint_latency)
+    return AlchemyStub(latency=args.latency, endpoint_latency=endpoint_latency, error_rate=args.error_rate,
+                       throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                       locations=args.locations, barcodes=args.barcodes, **kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--tenant-names", nargs="+", default=["stub"], help="tenant names refresh-token answers for")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    stub = stub_from_arguments(args, host=args.host, port=args.port, tenant_names=args.tenant_names)
+    print(f"Alchemy stub listening on {stub.base_url}")
+    print(json.dumps({"default_urls": stub.config_urls()}, indent=2))
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+End-to-end throughput and latency benchmark against the local Alchemy stub.
+
+Usage:
+    python benchmarks/bench_end_to_end.py [--scenarios update locations cached refresh]
+        [--concurrency 4] [--duration 10] [--batch 5] [--workers 1] [--threads 8]
+        [stub options, see alchemy_stub.py --help]
+
+Starts benchmarks/alchemy_stub.py in-process and the app under gunicorn (with
+gunicorn.conf.py) in a temporary RENDER_CONFIG_DIR whose tenant points at the
+stub, waits for /ready, then drives each scenario with --concurrency clients
+for --duration seconds:
+
+    update     POST /update-location/default with --batch random barcodes
+    locations  GET /get-locations/default?use_cache=false (always calls filter-records)
+    cached     GET /get-locations/default
+    refresh    refresh_location_cache("default") in a separate process, run serially
+
+Reported per scenario: completed requests, errors (non-2xx, by status),
+throughput and p50/p95/p99 latency in milliseconds, plus the stub's call
+counts. Concurrency above the tenant bulkhead (TENANT_MAX_IN_FLIGHT, default
+4) is shed with 503s; raise it with --app-env TENANT_MAX_IN_FLIGHT=16.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alchemy_stub import add_stub_arguments, stub_from_arguments  # noqa: E402
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REFRESH_SCRIPT = """
+import json, sys, time
+import app
+durations = []
+for _ in range(int(sys.argv[1])):
+    started = time.perf_counter()
+    ok = app.refresh_location_cache("default")
+    durations.append((time.perf_counter() - started, ok))
+print(json.dumps(durations))
+"""
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def write_stub_config(config_dir, stub, tenant_ids=("default",)):
+    """Write a config whose tenants (the first is the default) all use the stub's URLs"""
+    config = {
+        "default_tenant": tenant_ids[0],
+        "default_urls": stub.config_urls(),
+        "tenants": {
+            tenant_id: {
+                "tenant_name": "stub",
+                "display_name": f"Alchemy stub ({tenant_id})",
+                "description": "Local benchmark stub",
+                "button_class": "primary",
+                "env_token_var": "DEFAULT_REFRESH_TOKEN",
+                "use_custom_urls": False
+            }
+            for tenant_id in tenant_ids
+        }
+    }
+    with open(os.path.join(config_dir, "config.json"), "w") as f:
+        json.dump(config, f, indent=2)
+
+def app_environment(config_dir, **overrides):
+    """
+    Environment for an app process serving the stub tenant. The app's own
+    per-tenant rate limit is lifted so the stub's throttling decides the 429s.
+    """
+    env = dict(os.environ, RENDER_CONFIG_DIR=config_dir, DEFAULT_REFRESH_TOKEN="stub-refresh-token",
+               CONFIG_POLL_INTERVAL="0", LOG_LEVEL="WARNING", SLOW_REQUEST_THRESHOLD="0",
+               ALCHEMY_RATE_LIMIT_PER_SECOND="10000", ALCHEMY_RATE_LIMIT_BURST="10000")
+    env.update(overrides)
+    return env
+
+def start_app_server(config_dir, port, workers=1, threads=8, worker_class="gthread", env=None, app_dir=APP_DIR):
+    """Start the app (from app_dir) under gunicorn and wait until every worker reports ready"""
+    command = [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+               "--workers", str(workers), "--threads", str(threads), "--worker-class", worker_class, "app:app"]
+    process = subprocess.Popen(command, cwd=app_dir, env=env or app_environment(config_dir),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    ready_pids = set()
+    give_up_at = time.monotonic() + 60
+    while len(ready_pids) < workers:
+        if process.poll() is not None or time.monotonic() > give_up_at:
+            stop_app_server(process)
+            raise RuntimeError("App server did not become ready")
+        try:
+            response = requests.get(f"http://127.0.0.1:{port}/ready", timeout=2)
+            if response.status_code == 200:
+                ready_pids.add(response.json()["pid"])
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    return process
+
+def stop_app_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def run_load(send, concurrency, duration):
+    """
+    Call send(session) from `concurrency` threads for `duration` seconds.
+    Returns (latencies in seconds, failures by status code, elapsed seconds).
+    """
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                status = send(session).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not isinstance(status, int) or status >= 400:
+                    errors[status] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def summarize(latencies, errors, elapsed):
+    """Throughput and latency percentiles (in ms) for one run; errors maps status to count"""
+    if not latencies:
+        return {"requests": 0, "errors": dict(errors), "throughput": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {
+        "requests": len(latencies),
+        "errors": {str(status): count for status, count in errors.items()},
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+    }
+
+def print_summary_header(label="scenario", width=10):
+    print(f"{label:>{width}} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+def print_summary(name, summary, width=10):
+    errors = sum(summary["errors"].values())
+    line = (f"{name:>{width}} {summary['requests']:>9} {errors:>7} {summary['throughput']:>8.1f} "
+            f"{summary['p50']:>8.1f} {summary['p95']:>8.1f} {summary['p99']:>8.1f}")
+    if errors:
+        line += "  (" + ", ".join(f"{status}: {count}" for status, count in sorted(summary["errors"].items())) + ")"
+    print(line)
+
+def random_barcodes(count, known_barcodes):
+    return [f"BC{random.randrange(known_barcodes)}" for _ in range(count)]
+
+def run_refresh(env, runs):
+    """Time refresh_location_cache in its own process; returns a summary like summarize()"""
+    result = subprocess.run([sys.executable, "-c", REFRESH_SCRIPT, str(runs)], cwd=APP_DIR,
+                            env=env, capture_output=True, text=True, check=True)
+    durations = json.loads(result.stdout.strip().splitlines()[-1])
+    elapsed = sum(duration for duration, _ in durations)
+    errors = Counter("failed" for _, ok in durations if not ok)
+    return summarize([duration for duration, _ in durations], errors, elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["update", "locations", "cached", "refresh"],
+                        choices=["update", "locations", "cached", "refresh"])
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--batch", type=int, default=5, help="barcodes per /update-location request")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--refresh-runs", type=int, default=5, help="cache refreshes timed in the refresh scenario")
+    parser.add_argument("--app-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment for the app, e.g. OUTBOUND_MAX_CONCURRENT=16")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    stub = stub_from_arguments(args).start()
+    base_url = location_id = None
+    process = None
+    try:
+        with tempfile.TemporaryDirectory() as config_dir:
+            write_stub_config(config_dir, stub)
+            env = app_environment(config_dir, **dict(option.split("=", 1) for option in args.app_env))
+            http_scenarios = [name for name in args.scenarios if name != "refresh"]
+            if http_scenarios:
+                port = free_port()
+                base_url = f"http://127.0.0.1:{port}"
+                process = start_app_server(config_dir, port, args.workers, args.threads, env=env)
+                location_id = requests.get(f"{base_url}/get-locations/default", timeout=60).json()[0]["id"]
+
+            senders = {
+                "update": lambda session: session.post(
+                    f"{base_url}/update-location/default",
+                    json={"recordIds": random_barcodes(args.batch, args.barcodes), "locationId": location_id}, timeout=120),
+                "locations": lambda session: session.get(f"{base_url}/get-locations/default?use_cache=false", timeout=120),
+                "cached": lambda session: session.get(f"{base_url}/get-locations/default", timeout=120),
+            }
+
+            print_summary_header()
+            for name in args.scenarios:
+                if name == "refresh":
+                    summary = run_refresh(env, args.refresh_runs)
+                else:
+                    summary = summarize(*run_load(senders[name], args.concurrency, args.duration))
+                print_summary(name, summary)
+    finally:
+        if process is not None:
+            stop_app_server(process)
+        stub.stop()
+
+    print("stub calls: " + ", ".join(f"{key}={value}" for key, value in sorted(stub.stats.items())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the memory held for a tenant's cached locations.
+
+Usage:
+    python benchmarks/bench_location_memory.py [--sizes 10000 50000 100000] [--index]
+
+Compares the nested dicts produced by load_locations_from_cache with the
+slot-based LocationRecord model a worker keeps instead. Sizes are the bytes
+still allocated (tracemalloc) once the cache has been loaded and any
+intermediate objects freed. --index also measures the hierarchy, search and
+listing index built on top of the records.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_filter_records_payload  # noqa: E402
+
+def retained_bytes(build, *args):
+    """Bytes still allocated after build(*args) returns, with its result kept alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(*args)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--sublocations", type=int, default=8, help="sublocations per location")
+    parser.add_argument("--index", action="store_true", help="also measure the location index")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    import app  # noqa: E402
+
+    print(f"{'locations':>10} {'dicts MB':>9} {'records MB':>11} {'saving':>7}" + (f" {'index MB':>9}" if args.index else ""))
+    for size in args.sizes:
+        payload = make_filter_records_payload(size, args.sublocations)
+        cached_json = json.dumps(app.transform_locations(payload, "benchmark"))
+        del payload
+
+        dict_bytes, locations = retained_bytes(json.loads, cached_json)
+        del locations
+        record_bytes, records = retained_bytes(lambda text: app.load_location_records(json.loads(text)), cached_json)
+
+        line = f"{size:>10} {dict_bytes / 1e6:>9.1f} {record_bytes / 1e6:>11.1f} {1 - record_bytes / dict_bytes:>6.0%}"
+        if args.index:
+            index_bytes, index = retained_bytes(app.build_location_index, records)
+            listing_bytes, listing = retained_bytes(app.build_location_rows, records)
+            search_bytes, search = retained_bytes(app.build_search_index, index["nodes"])
+            line += f" {(index_bytes + listing_bytes + search_bytes) / 1e6:>9.1f}"
+            del index, listing, search
+        print(line)
+        del records
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the location transformer on large synthetic filter-records payloads.
+
+Usage:
+    python benchmarks/bench_location_transform.py [--sizes 10000 50000 100000] [--legacy]
+
+Reports CPU time per run and per location so that refresh cost can be
+checked to scale linearly with the number of locations. --legacy also
+times the previous two-pass extractor with list-based deduplication.
+"""
+import argparse
+import gc
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_filter_records_payload  # noqa: E402
+
+def legacy_transform(locations_data):
+    """The previous transform loop: name and sublocations extracted in separate passes"""
+    formatted = []
+    for location in locations_data:
+        location_id = str(location.get("recordId") or location.get("id", "unknown"))
+        name = location.get("name")
+        if not name:
+            name = f"Location {location.get('recordId') or location.get('id', 'unknown')}"
+            for field in location.get("fields", []):
+                if field.get("identifier", "") in ["LocationName", "RecordName", "Name"]:
+                    if field.get("rows") and len(field["rows"]) > 0:
+                        row = field["rows"][0]
+                        if row.get("values") and len(row["values"]) > 0:
+                            value = row["values"][0].get("value")
+                            if value and isinstance(value, str) and value.strip():
+                                name = value
+                                break
+        sublocations = []
+        for field in location.get("fields", []):
+            if field.get("identifier") == "Item":
+                for row in field.get("rows", []):
+                    if row.get("values") and len(row["values"]) > 0:
+                        value = row["values"][0].get("value")
+                        if isinstance(value, dict) and "recordId" in value and "name" in value:
+                            sublocation = {"id": str(value.get("recordId")), "name": value.get("name")}
+                            if not any(sub["id"] == sublocation["id"] for sub in sublocations):
+                                sublocations.append(sublocation)
+        for field in location.get("fields", []):
+            if field.get("identifier") == "LocatedAt":
+                for row in field.get("rows", []):
+                    pass
+        formatted.append({"id": location_id, "name": name, "sublocations": sublocations})
+    return formatted
+
+def time_cpu(function, *args, repeat=3):
+    """Best-of-N CPU time of a call, with its result"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.process_time()
+            result = function(*args)
+            elapsed = time.process_time() - started
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 25_000, 50_000, 100_000])
+    parser.add_argument("--sublocations", type=int, default=8, help="average sublocations per location")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy", action="store_true", help="also time the previous implementation")
+    args = parser.parse_args()
+    
+    import app
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    print(f"{'locations':>10} {'cpu s':>8} {'us/location':>12}" + (f" {'legacy s':>9} {'speedup':>8}" if args.legacy else ""))
+    for size in args.sizes:
+        payload = make_filter_records_payload(size, args.sublocations)
+        elapsed, result = time_cpu(app.transform_locations, payload, "benchmark", repeat=args.repeat)
+        line = f"{size:>10} {elapsed:>8.3f} {elapsed / size * 1e6:>12.2f}"
+        if args.legacy:
+            legacy_elapsed, legacy_result = time_cpu(legacy_transform, payload, repeat=args.repeat)
+            # The previous implementation predates parentId
+            without_parent = [{key: value for key, value in location.items() if key != "parentId"} for location in result]
+            assert legacy_result == without_parent, "transformer output differs from the previous implementation"
+            line += f" {legacy_elapsed:>9.3f} {legacy_elapsed / elapsed:>7.2f}x"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark the logging cost of /update-location and /get-locations.
+
+Usage:
+    python benchmarks/bench_logging.py [--requests 200] [--batch 10] [--locations 100]
+
+Each HOT_PATH_LOG_MODE runs in a fresh interpreter at LOG_LEVEL=INFO with the log
+written to a file, and Alchemy replaced by canned responses so only the app's own
+work is timed. "verbose" logs every payload and per-barcode line, as the app did
+before the mode existed. Reported per request: CPU milliseconds (all threads) and
+bytes of log written.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, "benchmarks")
+import requests
+import app
+from synthetic import make_filter_records_payload
+
+requests_count, batch_size, location_count = (int(arg) for arg in sys.argv[1:4])
+filter_body = json.dumps(make_filter_records_payload(location_count)).encode()
+
+def canned_response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response._content_consumed = True
+    return response
+
+def fake_alchemy_request(tenant, endpoint, url, deadline=None, **kwargs):
+    if endpoint == "refresh-token":
+        tenant_name = app.get_tenant_config(tenant)["tenant_name"]
+        return canned_response(json.dumps({"tokens": [{"tenant": tenant_name, "accessToken": "token", "expiresIn": 3600}]}).encode())
+    if endpoint == "find-records":
+        return canned_response(json.dumps([{"recordId": 1234}]).encode())
+    if endpoint == "filter-records":
+        return canned_response(filter_body)
+    return canned_response(json.dumps({"recordId": 1234, "status": "updated"}).encode())
+
+app.alchemy_request = fake_alchemy_request
+client = app.app.test_client()
+update_body = {"recordIds": [f"BC{i:05d}" for i in range(batch_size)], "locationId": "1"}
+results = {}
+for name, call in (("update", lambda: client.post("/update-location/default", json=update_body)),
+                   ("locations", lambda: client.get("/get-locations/default?use_cache=false"))):
+    call()  # warm up
+    sys.stderr.flush()
+    log_start = sys.stderr.tell()
+    cpu_start = time.process_time()
+    for _ in range(requests_count):
+        response = call()
+        assert response.status_code == 200, response.status_code
+    sys.stderr.flush()
+    results[name] = {"cpu_ms": (time.process_time() - cpu_start) * 1000 / requests_count,
+                     "log_bytes": (sys.stderr.tell() - log_start) / requests_count}
+print(json.dumps(results))
+"""
+
+def run_mode(mode, args, work_dir):
+    """Run the worker script in one logging mode and return its per-request figures"""
+    env = dict(os.environ, HOT_PATH_LOG_MODE=mode, LOG_LEVEL="INFO", RENDER_CONFIG_DIR=work_dir,
+               CONFIG_POLL_INTERVAL="0", DEFAULT_REFRESH_TOKEN="benchmark",
+               VALIDATE_LOCATION_IDS="false", SLOW_REQUEST_THRESHOLD="0")
+    with open(os.path.join(work_dir, f"{mode}.log"), "w+") as log_file:
+        result = subprocess.run([sys.executable, "-c", WORKER_SCRIPT, str(args.requests), str(args.batch),
+                                 str(args.locations)], cwd=APP_DIR, env=env, stderr=log_file,
+                                stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--batch", type=int, default=10, help="barcodes per /update-location request")
+    parser.add_argument("--locations", type=int, default=100, help="locations returned by filter-records")
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'update ms':>10} {'update log B':>13} {'locations ms':>13} {'locations log B':>16}")
+    for mode in ("verbose", "sampled", "debug"):
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = run_mode(mode, args, work_dir)
+        print(f"{mode:>8} {results['update']['cpu_ms']:>10.2f} {results['update']['log_bytes']:>13.0f} "
+              f"{results['locations']['cpu_ms']:>13.2f} {results['locations']['log_bytes']:>16.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Micro-benchmarks for the CPU-bound helpers on the request path, with saved baselines.
+
+Usage:
+    python benchmarks/bench_micro.py run [--save NAME] [--filter TEXT] [--quick]
+    python benchmarks/bench_micro.py compare NAME [--against OTHER] [--threshold 0.10]
+    python benchmarks/bench_micro.py list
+
+"run" times every case and prints the best time per call; --save stores the
+results as benchmarks/baselines/NAME.json. "compare" runs the suite again (or
+loads --against, another saved run) and flags every case that got more than
+--threshold slower than baseline NAME, exiting with status 1 if any did.
+Baselines only mean something on the machine that recorded them.
+
+Cases, each at several scales:
+    extract_location_name      extract_location_name_improved over N filter-records items
+    extract_sublocations       extract_sublocations_improved over N filter-records items
+    get_tenant_config          known and unknown tenant lookups with N tenants configured
+    is_cache_expired           with N tenants in the cache metadata
+    load_locations_from_cache  a cache file of N locations
+    serialize_locations        jsonify of N cached locations, as /get-locations sends them
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_filter_records_payload  # noqa: E402
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+SCALES = {
+    "extract_location_name": [100, 1000, 10000],
+    "extract_sublocations": [100, 1000, 10000],
+    "get_tenant_config": [1, 10, 100],
+    "is_cache_expired": [1, 10, 100],
+    "load_locations_from_cache": [100, 1000, 10000],
+    "serialize_locations": [100, 1000, 10000],
+}
+
+def setup_cases(app, names):
+    """Build (case id, callable, items per call) for every case and scale, writing fixtures as needed"""
+    cases = []
+    for name in names:
+        for scale in SCALES[name]:
+            case_id = f"{name}[{scale}]"
+            if name in ("extract_location_name", "extract_sublocations"):
+                payload = make_filter_records_payload(scale)
+                extract = app.extract_location_name_improved if name == "extract_location_name" else app.extract_sublocations_improved
+                cases.append((case_id, lambda payload=payload, extract=extract: [extract(item) for item in payload], scale))
+            elif name == "get_tenant_config":
+                tenants = dict(app.CONFIG["tenants"])
+                for index in range(scale - 1):
+                    tenants[f"tenant{index}"] = dict(app.CONFIG["tenants"][app.DEFAULT_TENANT], tenant_name=f"tenant{index}")
+                configs = {tenant_id: app.build_tenant_config(tenant_id, tenant) for tenant_id, tenant in tenants.items()}
+
+                def lookup(configs=configs):
+                    app.tenant_configs = configs
+                    for tenant_id in configs:
+                        app.get_tenant_config(tenant_id)
+                    app.get_tenant_config("unknown-tenant")
+                cases.append((case_id, lookup, scale + 1))
+            elif name == "is_cache_expired":
+                now = time.time()
+                metadata = {"last_refreshed": {f"tenant{index}": now for index in range(scale)},
+                            "refresh_status": {f"tenant{index}": {"status": "success", "timestamp": now}
+                                               for index in range(scale)}}
+                metadata_path = os.path.join(app.LOCATION_CACHE_DIR, f"metadata_{scale}.json")
+                with open(metadata_path, "w") as f:
+                    json.dump(metadata, f, indent=2)
+
+                def check(metadata_path=metadata_path):
+                    app.LOCATION_CACHE_METADATA = metadata_path
+                    app.is_cache_expired("tenant0")
+                cases.append((case_id, check, 1))
+            elif name == "load_locations_from_cache":
+                tenant = f"bench{scale}"
+                locations = app.transform_locations(make_filter_records_payload(scale), tenant)
+                with open(app.get_location_cache_file_path(tenant), "w") as f:
+                    json.dump(locations, f, indent=2)
+                cases.append((case_id, lambda tenant=tenant: app.load_locations_from_cache(tenant), scale))
+            elif name == "serialize_locations":
+                locations = app.transform_locations(make_filter_records_payload(scale), "benchmark")
+
+                def serialize(locations=locations):
+                    with app.app.app_context():
+                        app.jsonify(locations).get_data()
+                cases.append((case_id, serialize, scale))
+    return cases
+
+def time_case(function, repeat, min_time):
+    """Best time per call in seconds, timeit-style: enough calls per repeat to last min_time"""
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def run_suite(filter_text=None, quick=False):
+    """Run every case in a scratch RENDER_CONFIG_DIR and return the results document"""
+    names = [name for name in SCALES if not filter_text or filter_text in name]
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.environ.update(RENDER_CONFIG_DIR=config_dir, CONFIG_POLL_INTERVAL="0", FAST_STARTUP="false",
+                          LOCATION_SNAPSHOT_ENABLED="false")
+        logging.disable(logging.CRITICAL)
+        import app
+        app.ensure_location_cache_directory()
+
+        results = {}
+        for case_id, function, items in setup_cases(app, names):
+            seconds = time_case(function, repeat=3 if quick else 7, min_time=0.05 if quick else 0.2)
+            results[case_id] = {"seconds": seconds, "items": items}
+            print(f"{case_id:>36} {seconds * 1e6:>12.2f} us/call {seconds / items * 1e9:>10.1f} ns/item")
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "recorded": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+
+def baseline_path(name):
+    return os.path.join(BASELINES_DIR, f"{name}.json")
+
+def load_baseline(name):
+    with open(baseline_path(name)) as f:
+        return json.load(f)
+
+def save_baseline(name, document):
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    with open(baseline_path(name), "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    print(f"Saved baseline {baseline_path(name)}")
+
+def compare(baseline, current, threshold):
+    """Print the change per case; returns the case ids that regressed beyond the threshold"""
+    regressions = []
+    print(f"{'case':>36} {'baseline us':>12} {'current us':>11} {'change':>8}")
+    for case_id, result in current["results"].items():
+        if case_id not in baseline["results"]:
+            print(f"{case_id:>36} {'-':>12} {result['seconds'] * 1e6:>11.2f} {'new':>8}")
+            continue
+        before = baseline["results"][case_id]["seconds"]
+        change = result["seconds"] / before - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(case_id)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{case_id:>36} {before * 1e6:>12.2f} {result['seconds'] * 1e6:>11.2f} {change:>+7.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="time every case")
+    run_parser.add_argument("--save", metavar="NAME", help="store the results as baseline NAME")
+    compare_parser = subparsers.add_parser("compare", help="flag cases slower than a saved baseline")
+    compare_parser.add_argument("baseline", metavar="NAME")
+    compare_parser.add_argument("--against", metavar="OTHER", help="compare a saved run instead of running the suite")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, default 0.10 (10%%)")
+    compare_parser.add_argument("--save", metavar="NAME", help="also store the new run as baseline NAME")
+    for subparser in (run_parser, compare_parser):
+        subparser.add_argument("--filter", metavar="TEXT", help="only cases whose name contains TEXT")
+        subparser.add_argument("--quick", action="store_true", help="fewer and shorter repeats")
+    subparsers.add_parser("list", help="list saved baselines")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        names = sorted(name[:-5] for name in os.listdir(BASELINES_DIR) if name.endswith(".json")) if os.path.isdir(BASELINES_DIR) else []
+        for name in names:
+            document = load_baseline(name)
+            print(f"{name}: {len(document['results'])} cases, recorded {document['recorded']} (Python {document['python']})")
+        return 0
+
+    if args.command == "compare":
+        baseline = load_baseline(args.baseline)
+        current = load_baseline(args.against) if args.against else run_suite(args.filter, args.quick)
+        if args.save and not args.against:
+            save_baseline(args.save, current)
+        print()
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nNo case regressed by more than {args.threshold:.0%}")
+        return 0
+
+    document = run_suite(args.filter, args.quick)
+    if args.save:
+        save_baseline(args.save, document)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
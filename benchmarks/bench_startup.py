@@ -0,0 +1,70 @@
+"""
+Benchmark worker time-to-first-request for cold and warm boots.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5]
+
+Each run starts a fresh interpreter that imports app.py and serves one request
+through the Flask test client, the way a new gunicorn worker would. A cold boot
+starts from an empty RENDER_CONFIG_DIR (the config file has to be created); a
+warm boot reuses one written by an earlier run. Both are measured with and
+without FAST_STARTUP and reported as medians.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/get-test-locations/default')
+served = time.perf_counter()
+print(json.dumps({"import": imported - started, "first_request": served - imported, "status": response.status_code}))
+"""
+
+def boot_worker(config_dir, fast_startup):
+    """Start one worker process and return its timings, including interpreter startup"""
+    env = dict(os.environ, RENDER_CONFIG_DIR=config_dir, CONFIG_POLL_INTERVAL="0",
+               FAST_STARTUP="true" if fast_startup else "false")
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", WORKER_SCRIPT], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["total"] = time.perf_counter() - started
+    if timings["status"] != 200:
+        raise RuntimeError(f"first request failed with status {timings['status']}")
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="boots per configuration")
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'boot':>5} {'import ms':>10} {'first req ms':>13} {'total ms':>9}")
+    for fast_startup in (False, True):
+        with tempfile.TemporaryDirectory() as warm_dir:
+            boot_worker(warm_dir, fast_startup)  # writes the config file for the warm boots
+            for boot in ("cold", "warm"):
+                runs = []
+                for _ in range(args.runs):
+                    if boot == "cold":
+                        with tempfile.TemporaryDirectory() as cold_dir:
+                            runs.append(boot_worker(cold_dir, fast_startup))
+                    else:
+                        runs.append(boot_worker(warm_dir, fast_startup))
+                medians = {key: statistics.median(run[key] for run in runs) * 1000
+                           for key in ("import", "first_request", "total")}
+                print(f"{'fast' if fast_startup else 'default':>8} {boot:>5} {medians['import']:>10.1f} "
+                      f"{medians['first_request']:>13.1f} {medians['total']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
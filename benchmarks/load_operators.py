@@ -0,0 +1,213 @@
+"""
+Simulate scanner operators against the app and the local Alchemy stub to find saturation throughput.
+
+Usage:
+    python benchmarks/load_operators.py [--worker-classes gthread sync] [--workers 1 2 4]
+        [--threads 8] [--operators 5 10 20 40 80] [--step-duration 20]
+        [--tenant-mix default=3 north=1] [--think-scale 1.0] [--slo-ms 2000]
+        [--app-env NAME=VALUE ...] [stub options, see alchemy_stub.py --help]
+
+Each simulated operator repeatedly runs a session: pick a tenant by the
+--tenant-mix weights, open /tenant/<tenant>, load /get-locations/<tenant>,
+then scan several batches of barcodes (a think time per scan) and send each
+batch to /update-location with a random location, pausing between batches.
+Think times are lognormal around the --scan-seconds and --batch-pause
+medians, times --think-scale (0 removes them).
+
+For every gunicorn worker class and worker count the app is started once,
+fronted by the stub, and the operator count is stepped up. A step is
+saturated when its p95 exceeds --slo-ms, more than 1% of requests fail, or
+throughput grows less than 5% over the previous step. Reported per step:
+requests and barcodes per second, p95 and error rate; per configuration the
+best unsaturated step. Worker classes whose package is not installed (gevent,
+eventlet) are skipped.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alchemy_stub import add_stub_arguments, stub_from_arguments  # noqa: E402
+from bench_end_to_end import (app_environment, free_port, percentile, start_app_server,  # noqa: E402
+                              stop_app_server, write_stub_config)
+
+WORKER_CLASS_PACKAGES = {"gevent": "gevent", "eventlet": "eventlet"}
+
+class OperatorStats:
+    """Latencies and outcomes shared by every operator in a step"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = Counter()
+        self.barcodes = 0
+
+    def record(self, elapsed, status, barcodes=0):
+        with self.lock:
+            self.latencies.append(elapsed)
+            if not isinstance(status, int) or status >= 400:
+                self.errors[status] += 1
+            elif barcodes:
+                self.barcodes += barcodes
+
+def think(median, scale, stop):
+    """Wait a lognormal think time; returns False when the step is over"""
+    if scale <= 0:
+        return not stop.is_set()
+    return not stop.wait(random.lognormvariate(0, 0.5) * median * scale)
+
+def run_operator(base_url, tenants, weights, args, stats, stop):
+    """One operator's sessions until the step ends"""
+    session = requests.Session()
+
+    def call(method, path, barcodes=0, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, timeout=60, **kwargs)
+            status = response.status_code
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        stats.record(time.perf_counter() - started, status, barcodes)
+        return response
+
+    while not stop.is_set():
+        tenant = random.choices(tenants, weights)[0]
+        call("GET", f"/tenant/{tenant}")
+        response = call("GET", f"/get-locations/{tenant}")
+        try:
+            locations = response.json() if response is not None and response.ok else []
+        except ValueError:
+            locations = []
+        if not locations:
+            think(args.batch_pause, args.think_scale, stop)
+            continue
+
+        for _ in range(random.randint(*args.batches)):
+            batch = [f"BC{random.randrange(args.barcodes)}" for _ in range(random.randint(*args.batch_size))]
+            for _ in batch:
+                if not think(args.scan_seconds, args.think_scale, stop):
+                    return
+            location = random.choice(locations)
+            payload = {"recordIds": batch, "locationId": location["id"]}
+            if location.get("sublocations"):
+                payload["sublocationId"] = random.choice(location["sublocations"])["id"]
+            call("POST", f"/update-location/{tenant}", barcodes=len(batch), json=payload)
+            if not think(args.batch_pause, args.think_scale, stop):
+                return
+
+def run_step(base_url, operators, tenants, weights, args):
+    """Run a number of operators for one step and summarize it"""
+    stats = OperatorStats()
+    stop = threading.Event()
+    threads = [threading.Thread(target=run_operator, args=(base_url, tenants, weights, args, stats, stop), daemon=True)
+               for _ in range(operators)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.step_duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for thread in threads:
+        thread.join(timeout=60)
+
+    requests_done = len(stats.latencies)
+    errors = sum(stats.errors.values())
+    return {
+        "operators": operators,
+        "throughput": requests_done / elapsed,
+        "barcodes_per_second": stats.barcodes / elapsed,
+        "p95": percentile(stats.latencies, 0.95) * 1000 if stats.latencies else 0.0,
+        "error_rate": errors / requests_done if requests_done else 0.0,
+        "errors": dict(stats.errors),
+    }
+
+def is_saturated(step, previous, slo_ms):
+    if step["p95"] > slo_ms or step["error_rate"] > 0.01:
+        return True
+    return previous is not None and step["throughput"] < previous["throughput"] * 1.05
+
+def parse_range(text):
+    """"3" or "1-10" as an inclusive (low, high) pair"""
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--worker-classes", nargs="+", default=["gthread", "sync"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="gunicorn worker counts")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gthread worker")
+    parser.add_argument("--operators", type=int, nargs="+", default=[5, 10, 20, 40, 80], help="operator steps")
+    parser.add_argument("--step-duration", type=float, default=20, help="seconds per step")
+    parser.add_argument("--tenant-mix", nargs="+", default=["default=1"], metavar="TENANT=WEIGHT")
+    parser.add_argument("--scan-seconds", type=float, default=2.0, help="median think time per scanned barcode")
+    parser.add_argument("--batch-pause", type=float, default=5.0, help="median pause after each batch")
+    parser.add_argument("--batch-size", type=parse_range, default=(1, 10), help="barcodes per batch, e.g. 1-10")
+    parser.add_argument("--batches", type=parse_range, default=(3, 12), help="batches per session, e.g. 3-12")
+    parser.add_argument("--think-scale", type=float, default=1.0, help="multiplier for think times; 0 removes them")
+    parser.add_argument("--slo-ms", type=float, default=2000, help="p95 latency above which a step is saturated")
+    parser.add_argument("--app-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment for the app, e.g. TENANT_MAX_IN_FLIGHT=16")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    mix = [option.split("=", 1) for option in args.tenant_mix]
+    tenants = [tenant for tenant, _ in mix]
+    weights = [float(weight) for _, weight in mix]
+
+    stub = stub_from_arguments(args).start()
+    best = []
+    try:
+        for worker_class in args.worker_classes:
+            package = WORKER_CLASS_PACKAGES.get(worker_class)
+            if package and importlib.util.find_spec(package) is None:
+                print(f"Skipping {worker_class} workers: {package} is not installed")
+                continue
+            for workers in args.workers:
+                threads = args.threads if worker_class == "gthread" else 1
+                label = f"{worker_class} x{workers}" + (f" ({threads} threads)" if worker_class == "gthread" else "")
+                with tempfile.TemporaryDirectory() as config_dir:
+                    write_stub_config(config_dir, stub, tenants)
+                    env = app_environment(config_dir, **dict(option.split("=", 1) for option in args.app_env))
+                    port = free_port()
+                    process = start_app_server(config_dir, port, workers, threads, worker_class, env=env)
+                    try:
+                        print(f"\n{label}")
+                        print(f"{'operators':>10} {'req/s':>8} {'barcodes/s':>11} {'p95 ms':>8} {'errors':>7}")
+                        previous = None
+                        sustained = None
+                        saturated_at = None
+                        for operators in args.operators:
+                            step = run_step(f"http://127.0.0.1:{port}", operators, tenants, weights, args)
+                            saturated = is_saturated(step, previous, args.slo_ms)
+                            print(f"{operators:>10} {step['throughput']:>8.1f} {step['barcodes_per_second']:>11.1f} "
+                                  f"{step['p95']:>8.0f} {step['error_rate']:>6.1%}" + ("  saturated" if saturated else ""))
+                            if saturated:
+                                saturated_at = operators
+                                break
+                            sustained = previous = step
+                        best.append((label, sustained, saturated_at))
+                    finally:
+                        stop_app_server(process)
+    finally:
+        stub.stop()
+
+    print(f"\n{'configuration':>28} {'operators':>10} {'req/s':>8} {'barcodes/s':>11} {'p95 ms':>8} {'saturates at':>13}")
+    for label, step, saturated_at in best:
+        saturation = str(saturated_at) if saturated_at else "not reached"
+        if step is None:
+            print(f"{label:>28} {'-':>10} {'-':>8} {'-':>11} {'-':>8} {saturation:>13}")
+        else:
+            print(f"{label:>28} {step['operators']:>10} {step['throughput']:>8.1f} "
+                  f"{step['barcodes_per_second']:>11.1f} {step['p95']:>8.0f} {saturation:>13}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Replay recorded traffic through the app offline, against recorded Alchemy responses.
+
+Usage:
+    python benchmarks/replay_traffic.py CASSETTE_DIR [--speed 1.0] [--concurrency 16]
+        [--latency-scale 1.0] [--workers 1] [--threads 8] [--app-dir PATH]
+        [--save results.json] [--compare baseline.json]
+
+Record first by running the app with ALCHEMY_CASSETTE_MODE=record (and
+ALCHEMY_CASSETTE_DIR, default RENDER_CONFIG_DIR/cassettes): every Alchemy call
+is stored, with tokens and credentials masked, in <tenant>-<pid>.jsonl, the
+operator requests that caused them in inbound-<pid>.jsonl, and the tenant
+configuration in config.json.
+
+This script starts the app under gunicorn with ALCHEMY_CASSETTE_MODE=replay
+in a scratch RENDER_CONFIG_DIR using that configuration, then sends the
+recorded inbound requests in their original order and spacing divided by
+--speed (0 sends them as fast as --concurrency allows). Alchemy calls are
+answered from the cassettes after their recorded latency times
+--latency-scale, with no network. Reported per route: requests, errors,
+p50/p95/p99 latency, plus the CPU time used by the app's processes.
+--app-dir replays through another checkout, so two versions can be compared
+with --save on one run and --compare on the other.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_end_to_end import (APP_DIR, app_environment, free_port, print_summary, print_summary_header,  # noqa: E402
+                              start_app_server, stop_app_server, summarize)
+
+def load_inbound_requests(cassette_dir):
+    """Every recorded operator request, oldest first"""
+    inbound = []
+    for filename in os.listdir(cassette_dir):
+        if filename.startswith("inbound-") and filename.endswith(".jsonl"):
+            with open(os.path.join(cassette_dir, filename)) as f:
+                inbound.extend(json.loads(line) for line in f if line.strip())
+    return sorted(inbound, key=lambda entry: entry["recorded_at"])
+
+def write_replay_config(cassette_dir, config_dir):
+    """Configure the recorded tenants, each with a placeholder refresh token (the real ones are masked)"""
+    with open(os.path.join(cassette_dir, "config.json")) as f:
+        config = json.load(f)
+    for tenant in config["tenants"].values():
+        tenant["stored_refresh_token"] = "replay"
+    with open(os.path.join(config_dir, "config.json"), "w") as f:
+        json.dump(config, f, indent=2)
+
+def route_name(path):
+    """Group requests by their first path segment, e.g. /update-location"""
+    return "/" + path.lstrip("/").split("/", 1)[0].split("?", 1)[0]
+
+def replay(inbound, base_url, speed, concurrency):
+    """Send the recorded requests on their recorded schedule; returns latencies and errors per route"""
+    latencies = defaultdict(list)
+    errors = defaultdict(Counter)
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(entry):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        route = route_name(entry["path"])
+        started = time.perf_counter()
+        try:
+            status = session.request(entry["method"], base_url + entry["path"], json=entry.get("json"), timeout=120).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies[route].append(elapsed)
+            if not isinstance(status, int) or status >= 400:
+                errors[route][status] += 1
+
+    first_recorded = inbound[0]["recorded_at"]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for entry in inbound:
+            if speed > 0:
+                delay = (entry["recorded_at"] - first_recorded) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(send, entry)
+    return latencies, errors, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette_dir")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up; 0 sends as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=16, help="most requests in flight at once")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier for recorded Alchemy latencies")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--app-dir", default=APP_DIR, help="checkout to run the app from")
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="results saved by an earlier run to compare with")
+    args = parser.parse_args()
+
+    cassette_dir = os.path.abspath(args.cassette_dir)
+    inbound = load_inbound_requests(cassette_dir)
+    if not inbound:
+        parser.error(f"No recorded inbound requests in {cassette_dir}")
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        write_replay_config(cassette_dir, config_dir)
+        env = app_environment(config_dir, ALCHEMY_CASSETTE_MODE="replay", ALCHEMY_CASSETTE_DIR=cassette_dir,
+                              ALCHEMY_REPLAY_LATENCY_SCALE=str(args.latency_scale))
+        port = free_port()
+        cpu_before = os.times()
+        process = start_app_server(config_dir, port, args.workers, args.threads, env=env, app_dir=args.app_dir)
+        try:
+            latencies, errors, elapsed = replay(inbound, f"http://127.0.0.1:{port}", args.speed, args.concurrency)
+        finally:
+            stop_app_server(process)
+        # Exited and reaped workers count towards our children's CPU time
+        cpu_after = os.times()
+        app_cpu = (cpu_after.children_user - cpu_before.children_user) + (cpu_after.children_system - cpu_before.children_system)
+
+    results = {
+        "requests": len(inbound),
+        "elapsed": elapsed,
+        "app_cpu_seconds": app_cpu,
+        "routes": {route: summarize(route_latencies, errors[route], elapsed) for route, route_latencies in latencies.items()},
+    }
+    print(f"Replayed {len(inbound)} requests in {elapsed:.1f}s, app CPU {app_cpu:.2f}s (including start-up)")
+    print_summary_header("route", 20)
+    for route, summary in sorted(results["routes"].items()):
+        print_summary(route, summary, 20)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\n{'route':>20} {'p50':>8} {'p95':>8} {'p99':>8}  (change vs {args.compare})")
+        for route, summary in sorted(results["routes"].items()):
+            before = baseline["routes"].get(route)
+            if before:
+                changes = [summary[key] / before[key] - 1 if before[key] else 0.0 for key in ("p50", "p95", "p99")]
+                print(f"{route:>20} " + " ".join(f"{change:>+8.1%}" for change in changes))
+        print(f"{'app CPU':>20} {app_cpu / baseline['app_cpu_seconds'] - 1:>+8.1%}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
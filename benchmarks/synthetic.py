@@ -0,0 +1,77 @@
+"""
+Synthetic Alchemy payloads for benchmarks.
+
+The generated records follow the shape of real filter-records responses:
+a top-level name plus a "fields" list whose entries hold "rows" of "values".
+"""
+import random
+
+NOISE_FIELD_IDENTIFIERS = ["Status", "Description", "Temperature", "Capacity", "Owner", "Barcode"]
+
+def make_location_record(record_id, sublocation_ids, parent_id=None, with_top_level_name=True, rng=random):
+    """Build one AC_Location record as returned by filter-records"""
+    name = f"Location {record_id:06d} {rng.choice(['Freezer', 'Shelf', 'Lab', 'Cabinet', 'Rack', 'Warehouse'])}"
+    fields = []
+    
+    # Noise fields the transformer has to skip over
+    for identifier in NOISE_FIELD_IDENTIFIERS:
+        fields.append({
+            "identifier": identifier,
+            "rows": [{"row": 0, "values": [{"value": f"{identifier} value {record_id}", "valuePreview": ""}]}]
+        })
+    
+    fields.append({
+        "identifier": "Name",
+        "rows": [{"row": 0, "values": [{"value": name, "valuePreview": ""}]}]
+    })
+    
+    # Sublocations, with a few duplicated rows like real data has
+    item_rows = []
+    for index, sublocation_id in enumerate(sublocation_ids):
+        item_rows.append({"row": index, "values": [{
+            "value": {"recordId": sublocation_id, "name": f"Sublocation {sublocation_id}"},
+            "valuePreview": ""
+        }]})
+    if sublocation_ids:
+        item_rows.append({"row": len(item_rows), "values": [{
+            "value": {"recordId": sublocation_ids[0], "name": f"Sublocation {sublocation_ids[0]}"},
+            "valuePreview": ""
+        }]})
+    fields.append({"identifier": "Item", "rows": item_rows})
+    
+    if parent_id is not None:
+        fields.append({
+            "identifier": "LocatedAt",
+            "rows": [{"row": 0, "values": [{
+                "value": {"recordId": parent_id, "name": f"Location {parent_id:06d}"},
+                "valuePreview": ""
+            }]}]
+        })
+    
+    record = {
+        "recordId": record_id,
+        "fields": fields,
+        "fieldGroups": [{"identifier": "General", "fields": [f["identifier"] for f in fields]}]
+    }
+    if with_top_level_name:
+        record["name"] = name
+    return record
+
+def make_filter_records_payload(location_count, sublocations_per_location=8, seed=42):
+    """
+    Build a filter-records response with a multi-level location hierarchy.
+    Every location after the first few is LocatedAt an earlier one.
+    """
+    rng = random.Random(seed)
+    records = []
+    next_sublocation_id = 10_000_000
+    for record_id in range(1, location_count + 1):
+        sublocation_count = rng.randint(0, sublocations_per_location * 2)
+        sublocation_ids = list(range(next_sublocation_id, next_sublocation_id + sublocation_count))
+        next_sublocation_id += sublocation_count
+        parent_id = rng.randint(1, record_id - 1) if record_id > 10 else None
+        records.append(make_location_record(
+            record_id, sublocation_ids, parent_id,
+            with_top_level_name=rng.random() > 0.1, rng=rng
+        ))
+    return records
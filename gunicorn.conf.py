@@ -0,0 +1,23 @@
+"""
+Gunicorn settings. Gunicorn reads ./gunicorn.conf.py automatically.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+def on_starting(server):
+    """Forget the metrics published by the workers of a previous run"""
+    metrics_dir = os.path.join(os.getenv('RENDER_CONFIG_DIR', '/opt/render/project/config'), 'metrics')
+    if os.path.isdir(metrics_dir):
+        for filename in os.listdir(metrics_dir):
+            os.remove(os.path.join(metrics_dir, filename))
+
+def post_worker_init(worker):
+    """Warm up tokens and location caches in each new worker; /ready reports 503 until done"""
+    from app import start_warmup
+    start_warmup()
+
+def worker_exit(server, worker):
+    """Publish the exiting worker's final metrics so the totals keep them"""
+    from app import publish_worker_metrics
+    publish_worker_metrics()
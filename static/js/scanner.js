@@ -567,6 +567,16 @@ function handleLocationChange() {
             `;
         }
         
+        if (result.queued && result.queued.length > 0 && (result.status === 'success' || result.status === 'partial')) {
+            html += '<p>Queued until Alchemy is available again (applied automatically):</p><ul class="list-group mb-3">';
+            
+            result.queued.forEach(id => {
+                html += `<li class="list-group-item">Barcode: ${id}</li>`;
+            });
+            
+            html += '</ul>';
+        }
+        
         // Update results content and show results section
         resultsContent.innerHTML = html;
         updateResults.style.display = 'block';
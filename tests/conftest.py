@@ -0,0 +1,52 @@
+"""
+Shared setup for the unit tests. The app reads its settings at import time, so the
+environment points it at a throwaway config directory before it is first imported.
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_DIR = tempfile.mkdtemp(prefix="alchemy-tests-")
+
+os.environ.update(RENDER_CONFIG_DIR=CONFIG_DIR, CONFIG_POLL_INTERVAL="0", FAST_STARTUP="true",
+                  DEFAULT_REFRESH_TOKEN="test-refresh-token")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+logging.disable(logging.CRITICAL)
+
+import app as app_module  # noqa: E402
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(CONFIG_DIR, ignore_errors=True)
+
+@pytest.fixture
+def app():
+    """The app module with its config loaded and limiter, breaker, queue and location state reset"""
+    app_module.init_config()
+    app_module.reset_rate_limiter()
+    app_module.circuit_breakers.clear()
+    app_module.location_indexes.clear()
+    app_module.location_snapshots.clear()
+    for directory in (app_module.PENDING_UPDATES_DIR, app_module.LOCATION_CACHE_DIR):
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+    yield app_module
+    app_module.reset_rate_limiter()
+    app_module.circuit_breakers.clear()
+
+@pytest.fixture
+def locations(app):
+    """Transformed locations of a synthetic 200-location filter-records response"""
+    from synthetic import make_filter_records_payload
+    return app.transform_locations(make_filter_records_payload(200), "default")
+
+@pytest.fixture
+def client(app, locations):
+    """A test client for an app whose default tenant has the synthetic locations cached"""
+    assert app.save_locations_to_cache("default", locations)
+    return app.app.test_client()
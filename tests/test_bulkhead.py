@@ -0,0 +1,17 @@
+import pytest
+
+def test_bulkhead_rejects_beyond_max_in_flight(app):
+    max_in_flight = app.get_bulkhead_settings("default")[0]
+    try:
+        for _ in range(max_in_flight):
+            app.enter_tenant_bulkhead("default")
+        with pytest.raises(app.SchedulerOverloaded):
+            app.enter_tenant_bulkhead("default")
+    finally:
+        app.reset_tenant_bulkhead("default")
+
+def test_leaving_a_reset_bulkhead_is_harmless(app):
+    app.enter_tenant_bulkhead("default")
+    app.reset_tenant_bulkhead("default")
+    app.leave_tenant_bulkhead("default")
+    assert app.get_bulkhead_metrics("default")["in_flight"] == 0
@@ -0,0 +1,31 @@
+import threading
+
+import pytest
+
+@pytest.fixture
+def admin_client(app):
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session["admin_authenticated"] = True
+    return client
+
+def test_manual_refresh_holds_the_cross_worker_lock(app, admin_client, monkeypatch):
+    refreshing = threading.Event()
+    finish = threading.Event()
+    
+    def refresh_location_cache(tenant):
+        refreshing.set()
+        finish.wait(5)
+        return True
+    
+    monkeypatch.setattr(app, "refresh_location_cache", refresh_location_cache)
+    assert admin_client.post("/admin/refresh-location-cache/default").status_code == 200
+    assert refreshing.wait(5)
+    
+    # A second refresh, here or in another worker, is skipped while the first one runs
+    assert app.acquire_refresh_file_lock("default", blocking=False) is None
+    assert admin_client.post("/admin/refresh-location-cache/default").status_code == 409
+    
+    finish.set()
+    lock_file = app.acquire_refresh_file_lock("default")
+    lock_file.close()
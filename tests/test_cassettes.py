@@ -0,0 +1,13 @@
+import json
+
+def test_first_recorded_request_loads_the_config(app, monkeypatch, tmp_path):
+    # With FAST_STARTUP the config is only loaded by a before_request hook
+    monkeypatch.setattr(app, "CONFIG", None)
+    monkeypatch.setattr(app, "CASSETTE_MODE", "record")
+    monkeypatch.setattr(app, "CASSETTE_DIR", str(tmp_path))
+    monkeypatch.setitem(app.cassette_state, "config_saved", False)
+    
+    response = app.app.test_client().get("/search-locations/default?q=abc")
+    assert response.status_code == 200
+    assert "default" in json.loads((tmp_path / "config.json").read_text())["tenants"]
+    assert any(path.name.startswith("inbound-") for path in tmp_path.iterdir())
@@ -0,0 +1,40 @@
+import pytest
+
+ENDPOINT = "update-record"
+
+def open_circuit(app):
+    for _ in range(app.CIRCUIT_MIN_REQUESTS):
+        app.before_circuit_call("default", ENDPOINT)
+        app.record_circuit_result("default", ENDPOINT, False)
+
+def test_stays_closed_below_minimum_requests(app):
+    for _ in range(app.CIRCUIT_MIN_REQUESTS - 1):
+        app.record_circuit_result("default", ENDPOINT, False)
+    assert not app.is_circuit_open("default", ENDPOINT)
+
+def test_opens_on_failure_ratio_and_rejects_calls(app):
+    open_circuit(app)
+    assert app.is_circuit_open("default", ENDPOINT)
+    with pytest.raises(app.CircuitOpenError):
+        app.before_circuit_call("default", ENDPOINT)
+    assert app.circuit_breakers[("default", ENDPOINT)]["rejected_calls"] == 1
+
+def test_half_open_probe_closes_on_success(app, monkeypatch):
+    open_circuit(app)
+    monkeypatch.setattr(app, "CIRCUIT_OPEN_SECONDS", 0)
+    app.before_circuit_call("default", ENDPOINT)
+    assert app.circuit_breakers[("default", ENDPOINT)]["state"] == "half_open"
+    # Only CIRCUIT_HALF_OPEN_PROBES calls get through while probing
+    with pytest.raises(app.CircuitOpenError):
+        app.before_circuit_call("default", ENDPOINT)
+    app.record_circuit_result("default", ENDPOINT, True)
+    assert app.circuit_breakers[("default", ENDPOINT)]["state"] == "closed"
+
+def test_failed_probe_reopens_and_released_probe_frees_slot(app, monkeypatch):
+    open_circuit(app)
+    monkeypatch.setattr(app, "CIRCUIT_OPEN_SECONDS", 0)
+    app.before_circuit_call("default", ENDPOINT)
+    app.release_circuit_probe("default", ENDPOINT)
+    app.before_circuit_call("default", ENDPOINT)
+    app.record_circuit_result("default", ENDPOINT, False)
+    assert app.circuit_breakers[("default", ENDPOINT)]["state"] == "open"
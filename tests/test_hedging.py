@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+class FakeResponse:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {}
+    
+    def close(self):
+        pass
+
+@pytest.fixture
+def alchemy(app, monkeypatch):
+    """Answer find-records calls in order: the first is slow, later ones are fast"""
+    calls = []
+    release_slow = threading.Event()
+    
+    def send_alchemy_request(tenant, endpoint, url, timeout, kwargs):
+        calls.append(threading.current_thread().name)
+        if len(calls) == 1:
+            release_slow.wait(5)
+            return FakeResponse(503, "slow")
+        return FakeResponse(200, "fast")
+    
+    monkeypatch.setattr(app, "send_alchemy_request", send_alchemy_request)
+    monkeypatch.setattr(app, "HEDGE_DEFAULT_DELAY", 0.05)
+    monkeypatch.setattr(app, "HEDGE_MIN_SAMPLES", 10 ** 6)
+    app.hedge_state.clear()
+    yield calls, release_slow
+    release_slow.set()
+    app.reset_tenant_bulkhead("default")
+
+def hedged_lookup(app):
+    return app.hedged_alchemy_request("default", "find-records", "http://alchemy.invalid/find-records")
+
+def test_hedge_wins_on_the_tenant_pool(app, alchemy):
+    calls, release_slow = alchemy
+    assert hedged_lookup(app).text == "fast"
+    assert all(name.startswith("tenant-default") for name in calls)
+    assert app.hedge_state["default"]["hedges_won"] == 1
+    
+    # The slow copy lost the race, so its 503 does not count against the circuit
+    release_slow.set()
+    give_up_at = time.monotonic() + 5
+    while app.get_bulkhead_metrics("default")["pool_busy"]:
+        assert time.monotonic() < give_up_at
+        time.sleep(0.01)
+    assert list(app.circuit_breakers[("default", "find-records")]["outcomes"]) == [True]
+
+def test_busy_pool_sends_the_lookup_unhedged(app, alchemy, monkeypatch):
+    calls, release_slow = alchemy
+    release_slow.set()
+    monkeypatch.setattr(app, "get_bulkhead_settings", lambda tenant: (4, 1))
+    blocker = threading.Event()
+    app.submit_to_tenant_pool("default", blocker.wait, 5)
+    try:
+        assert hedged_lookup(app).text == "slow"
+        assert calls == [threading.current_thread().name]
+    finally:
+        blocker.set()
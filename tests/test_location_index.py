@@ -0,0 +1,20 @@
+def test_index_links_children_and_paths(app, locations):
+    index = app.build_location_index(app.load_location_records(locations))
+    nodes = index["nodes"]
+    for location in locations:
+        node = nodes[location["id"]]
+        for sublocation in location["sublocations"]:
+            assert sublocation["id"] in node.children
+            assert nodes[sublocation["id"]].path == node.path + (node.id,)
+        if location["parentId"]:
+            assert node.path[-1] == location["parentId"]
+    assert all(nodes[root_id].path == () for root_id in index["roots"])
+
+def test_index_breaks_located_at_cycles(app):
+    records = app.load_location_records([
+        {"id": "a", "name": "A", "sublocations": [], "parentId": "b"},
+        {"id": "b", "name": "B", "sublocations": [], "parentId": "a"},
+    ])
+    index = app.build_location_index(records)
+    assert len(index["roots"]) == 1
+    assert {node.path for node in index["nodes"].values()} == {(), (index["roots"][0],)}
@@ -0,0 +1,35 @@
+import pytest
+
+def test_cursor_pages_through_all_rows(client):
+    response = client.get("/locations/default/page?limit=50&sort=name")
+    body = response.get_json()
+    rows = body["rows"]
+    while body["next_cursor"]:
+        body = client.get(f"/locations/default/page?limit=50&cursor={body['next_cursor']}").get_json()
+        rows += body["rows"]
+    assert len(rows) == body["total"]
+    names = [row["name"].casefold() for row in rows]
+    assert names == sorted(names)
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    {"sort": "name", "desc": False, "q": "", "level": None},
+    {"sort": "name", "desc": "no", "q": "", "level": None, "pos": 0},
+    {"sort": "name", "desc": False, "q": 3, "level": None, "pos": 0},
+    {"sort": "name", "desc": False, "q": "", "level": True, "pos": 0},
+    {"sort": "name", "desc": False, "q": "", "level": None, "pos": -1},
+    {"sort": "name", "desc": False, "q": "", "level": None, "pos": "5"},
+])
+def test_malformed_cursor_is_rejected(app, client, cursor):
+    if isinstance(cursor, dict):
+        cursor = app.encode_page_cursor(dict(cursor, v=app.get_location_index("default")["version"]))
+    response = client.get(f"/locations/default/page?cursor={cursor}")
+    assert response.status_code == 400
+
+def test_cursor_from_old_data_is_gone(app, client):
+    cursor = client.get("/locations/default/page?limit=10").get_json()["next_cursor"]
+    index = app.get_location_index("default")
+    stale = app.decode_page_cursor(cursor)
+    stale["v"] = index["version"] - 1
+    response = client.get(f"/locations/default/page?cursor={app.encode_page_cursor(stale)}")
+    assert response.status_code == 410
@@ -0,0 +1,12 @@
+def test_search_prefix_and_typo(app):
+    records = app.load_location_records([
+        {"id": "1", "name": "Freezer Room", "sublocations": [{"id": "11", "name": "Freezer Shelf 1"}], "parentId": None},
+        {"id": "2", "name": "Cold Storage", "sublocations": [], "parentId": None},
+    ])
+    index = app.build_location_index(records)
+    assert [result["id"] for result in app.search_location_index(index, "freezer")][:2] == ["1", "11"]
+    typo = app.search_location_index(index, "cold storgae")
+    assert typo and typo[0]["id"] == "2"
+    shelf = app.search_location_index(index, "shelf 1")[0]
+    assert shelf["id"] == "11" and shelf["path"] == ["Freezer Room"]
+    assert app.search_location_index(index, "   ") == []
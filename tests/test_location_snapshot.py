@@ -0,0 +1,29 @@
+import pytest
+
+def test_snapshot_round_trip(app, locations, tmp_path):
+    path = tmp_path / "locations.snap"
+    path.write_bytes(app.encode_location_snapshot(locations))
+    snapshot = app.LocationSnapshot(str(path))
+    assert len(snapshot) == len(locations)
+    assert list(snapshot.iter_locations()) == locations
+    assert [record.to_dict() for record in snapshot.iter_records()] == locations
+    rendered = b"".join(snapshot.iter_json_chunks(chunk_size=1000))
+    assert app.json.loads(rendered) == locations
+
+def test_snapshot_rejects_other_files(app, tmp_path):
+    path = tmp_path / "not.snap"
+    path.write_bytes(b"X" * app.SNAPSHOT_HEADER.size)
+    with pytest.raises(ValueError):
+        app.LocationSnapshot(str(path))
+
+def test_snapshot_older_than_cache_is_not_served(app, client):
+    assert app.get_location_snapshot("default") is not None
+    cache_file = app.get_location_cache_file_path("default")
+    stat = app.os.stat(app.get_location_snapshot_file_path("default"))
+    app.os.utime(cache_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert app.get_location_snapshot("default") is None
+
+def test_get_locations_serves_snapshot(client, locations):
+    response = client.get("/get-locations/default")
+    assert response.status_code == 200
+    assert response.get_json() == locations
@@ -0,0 +1,17 @@
+from synthetic import make_filter_records_payload
+
+def test_transform_locations(app):
+    payload = make_filter_records_payload(30)
+    locations = app.transform_locations(payload, "default")
+    assert len(locations) == 30
+    first = locations[0]
+    assert first["id"] == "1"
+    assert first["name"].startswith("Location 000001")
+    # The duplicated Item row is only listed once
+    sublocation_ids = [sublocation["id"] for sublocation in first["sublocations"]]
+    assert len(sublocation_ids) == len(set(sublocation_ids))
+    assert all(location["parentId"] is not None for location in locations[10:])
+
+def test_transform_skips_broken_records(app):
+    payload = make_filter_records_payload(3) + [{"recordId": 99, "fields": "not a list"}]
+    assert [location["id"] for location in app.transform_locations(payload, "default")] == ["1", "2", "3"]
@@ -0,0 +1,113 @@
+import pytest
+
+timers = []  # delays of the retry drains scheduled by the tests
+
+@pytest.fixture(autouse=True)
+def clear_timers():
+    timers.clear()
+
+@pytest.fixture
+def alchemy(app, monkeypatch):
+    """Record the updates sent to Alchemy; outcomes maps a barcode to an exception or error message"""
+    sent = []
+    outcomes = {}
+    
+    def update_record_location(barcode, access_token, tenant, location_id, sublocation_id, deadline=None):
+        sent.append((barcode, location_id))
+        outcome = outcomes.get(barcode)
+        if callable(outcome):
+            outcome = outcome()
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    
+    monkeypatch.setattr(app, "refresh_alchemy_token", lambda tenant, deadline=None: "token")
+    monkeypatch.setattr(app, "update_record_location", update_record_location)
+    monkeypatch.setattr(app, "start_daemon_timer", lambda interval, function: timers.append(interval))
+    return sent, outcomes
+
+def queued(app):
+    return [(entry["barcode"], entry["locationId"]) for entry in app.load_pending_updates("default")]
+
+def test_drain_applies_queue_in_order(app, alchemy):
+    sent, _ = alchemy
+    for barcode, location in [("A", "L1"), ("B", "L2"), ("C", "L3")]:
+        app.queue_pending_update("default", barcode, location, None)
+    assert app.drain_pending_updates("default") == 3
+    assert sent == [("A", "L1"), ("B", "L2"), ("C", "L3")]
+    assert queued(app) == []
+
+def test_drain_keeps_latest_update_per_barcode(app, alchemy):
+    sent, _ = alchemy
+    for barcode, location in [("A", "L1"), ("B", "L2"), ("A", "L3")]:
+        app.queue_pending_update("default", barcode, location, None)
+    assert app.drain_pending_updates("default") == 2
+    assert sent == [("B", "L2"), ("A", "L3")]
+
+def test_postponed_entries_go_before_newer_ones(app, alchemy):
+    _, outcomes = alchemy
+    
+    def circuit_opens_while_a_is_requeued():
+        app.queue_pending_update("default", "A", "L-new", None)
+        return app.CircuitOpenError("down")
+    
+    outcomes["B"] = circuit_opens_while_a_is_requeued
+    for barcode, location in [("A", "L1"), ("B", "L2"), ("C", "L3")]:
+        app.queue_pending_update("default", barcode, location, None)
+    assert app.drain_pending_updates("default") == 1
+    # B and C were postponed and go back ahead of the update for A queued during the drain
+    assert queued(app) == [("B", "L2"), ("C", "L3"), ("A", "L-new")]
+    
+    # The postponed entries are retried by a timed drain, at the earliest once the circuit may be half-open
+    postponed = app.load_pending_updates("default")[:2]
+    assert all(entry["postponed_until"] >= app.time.time() + app.CIRCUIT_OPEN_SECONDS - 1 for entry in postponed)
+    assert len(timers) == 1 and timers[0] >= app.CIRCUIT_OPEN_SECONDS - 1
+
+def test_postponed_entries_are_sent_by_an_earlier_drain(app, alchemy):
+    sent, outcomes = alchemy
+    outcomes["A"] = app.SchedulerOverloaded("busy")
+    app.queue_pending_update("default", "A", "L1", None)
+    assert app.drain_pending_updates("default") == 0
+    assert timers == [pytest.approx(app.PENDING_UPDATE_RETRY_DELAY, abs=1)]
+    
+    # A drain started by the circuit closing does not wait for the postponement
+    del outcomes["A"]
+    assert app.drain_pending_updates("default") == 1
+    assert sent == [("A", "L1"), ("A", "L1")]
+
+def test_missing_token_postpones_the_queue(app, alchemy, monkeypatch):
+    monkeypatch.setattr(app, "refresh_alchemy_token", lambda tenant, deadline=None: None)
+    app.queue_pending_update("default", "A", "L1", None)
+    assert app.drain_pending_updates("default") == 0
+    assert queued(app) == [("A", "L1")]
+    assert len(timers) == 1
+
+def test_newer_update_supersedes_postponed_one(app):
+    remaining = [{"barcode": "A", "locationId": "L1"}, {"barcode": "B", "locationId": "L2"}]
+    newer = [{"barcode": "A", "locationId": "L3"}]
+    assert app.merge_pending_updates(remaining, newer) == [remaining[1], newer[0]]
+
+def test_retryable_failure_backs_off_and_rejection_is_dropped(app, alchemy):
+    sent, outcomes = alchemy
+    outcomes["A"] = app.AlchemyUnavailableError("update-record returned status code 503")
+    outcomes["B"] = "Record not found"
+    app.queue_pending_update("default", "A", "L1", None)
+    app.queue_pending_update("default", "B", "L2", None)
+    assert app.drain_pending_updates("default") == 0
+    
+    entries = app.load_pending_updates("default")
+    assert [entry["barcode"] for entry in entries] == ["A"]
+    assert entries[0]["attempts"] == 1
+    assert entries[0]["next_attempt_at"] > app.time.time()
+    
+    # Not due yet, so the next drain leaves it alone
+    sent.clear()
+    app.drain_pending_updates("default")
+    assert sent == []
+    assert queued(app) == [("A", "L1")]
+
+def test_retry_delay_grows_and_is_capped(app):
+    delays = [app.get_pending_update_retry_delay(attempts) for attempts in range(1, 20)]
+    assert delays[0] == app.PENDING_UPDATE_RETRY_DELAY
+    assert delays == sorted(delays)
+    assert delays[-1] == app.PENDING_UPDATE_MAX_RETRY_DELAY
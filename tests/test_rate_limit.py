@@ -0,0 +1,35 @@
+import pytest
+
+def test_burst_is_served_without_waiting(app):
+    burst = app.get_rate_limit_settings("default")[1]
+    for _ in range(int(burst)):
+        assert app.acquire_rate_limit("default") == 0.0
+    with app.rate_limit_lock:
+        assert app.get_rate_limit_entry("default")["requests"] == int(burst)
+
+def test_empty_bucket_respects_deadline(app):
+    with app.rate_limit_lock:
+        entry = app.get_rate_limit_entry("default")
+        entry["tokens"] = 0
+        entry["rate"] = 0.5
+    with pytest.raises(app.DeadlineExceeded):
+        app.acquire_rate_limit("default", deadline=app.time.monotonic() + 0.1)
+
+def test_wait_beyond_max_wait_is_rejected(app, monkeypatch):
+    monkeypatch.setattr(app, "RATE_LIMIT_MAX_WAIT", 1)
+    app.record_rate_limit_throttled("default", retry_after=60)
+    with pytest.raises(app.AlchemyRateLimitError):
+        app.acquire_rate_limit("default")
+
+def test_throttling_halves_rate_and_success_recovers_it(app):
+    ceiling = app.get_rate_limit_settings("default")[0]
+    app.record_rate_limit_throttled("default", retry_after=0)
+    with app.rate_limit_lock:
+        entry = app.get_rate_limit_entry("default")
+        assert entry["rate"] == pytest.approx(max(app.RATE_LIMIT_MIN_PER_SECOND, ceiling / 2))
+        assert entry["tokens"] == 0
+        assert entry["throttled_responses"] == 1
+    for _ in range(100):
+        app.record_rate_limit_success("default")
+    with app.rate_limit_lock:
+        assert app.get_rate_limit_entry("default")["rate"] == ceiling
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+@pytest.fixture
+def scheduler(app, monkeypatch):
+    """A scheduler with one slot and small queues"""
+    monkeypatch.setattr(app, "SCHEDULER_MAX_CONCURRENT", 1)
+    monkeypatch.setattr(app, "SCHEDULER_QUEUE_LIMITS",
+                        {app.PRIORITY_UPDATE: 4, app.PRIORITY_READ: 4, app.PRIORITY_REFRESH: 1})
+    assert app.scheduler_state["running"] == 0
+    yield app
+    assert app.scheduler_state["running"] == 0
+
+def wait_for_waiting(app, priority, count):
+    give_up_at = time.monotonic() + 5
+    while len(app.scheduler_state["waiting"][priority]) < count:
+        assert time.monotonic() < give_up_at
+        time.sleep(0.01)
+
+def test_higher_priority_is_served_first(scheduler):
+    app = scheduler
+    app.acquire_outbound_slot(app.PRIORITY_READ)
+    order = []
+    
+    def worker(priority):
+        app.acquire_outbound_slot(priority, deadline=time.monotonic() + 5)
+        order.append(priority)
+        app.release_outbound_slot()
+    
+    refresh = threading.Thread(target=worker, args=(app.PRIORITY_REFRESH,))
+    refresh.start()
+    wait_for_waiting(app, app.PRIORITY_REFRESH, 1)
+    update = threading.Thread(target=worker, args=(app.PRIORITY_UPDATE,))
+    update.start()
+    wait_for_waiting(app, app.PRIORITY_UPDATE, 1)
+    
+    app.release_outbound_slot()
+    refresh.join(5)
+    update.join(5)
+    assert order == [app.PRIORITY_UPDATE, app.PRIORITY_REFRESH]
+
+def test_full_queue_is_shed(scheduler):
+    app = scheduler
+    app.acquire_outbound_slot(app.PRIORITY_READ)
+    outcomes = []
+    
+    def wait_for_slot():
+        try:
+            app.acquire_outbound_slot(app.PRIORITY_REFRESH, deadline=time.monotonic() + 0.5)
+        except app.SchedulerOverloaded:
+            outcomes.append("shed")
+    
+    waiter = threading.Thread(target=wait_for_slot)
+    waiter.start()
+    wait_for_waiting(app, app.PRIORITY_REFRESH, 1)
+    try:
+        assert app.is_scheduler_queue_full(app.PRIORITY_REFRESH)
+        with pytest.raises(app.SchedulerOverloaded):
+            app.acquire_outbound_slot(app.PRIORITY_REFRESH)
+    finally:
+        waiter.join(5)
+        app.release_outbound_slot()
+    assert outcomes == ["shed"]
+
+def test_wait_past_deadline_is_shed(scheduler):
+    app = scheduler
+    app.acquire_outbound_slot(app.PRIORITY_READ)
+    try:
+        with pytest.raises(app.SchedulerOverloaded):
+            app.acquire_outbound_slot(app.PRIORITY_UPDATE, deadline=time.monotonic() + 0.05)
+        assert not app.scheduler_state["waiting"][app.PRIORITY_UPDATE]
+    finally:
+        app.release_outbound_slot()
+
+def test_outbound_priority_is_per_thread(app):
+    assert app.get_outbound_priority() == app.PRIORITY_READ
+    previous = app.set_outbound_priority(app.PRIORITY_UPDATE)
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(app.get_outbound_priority()))
+    thread.start()
+    thread.join()
+    app.set_outbound_priority(previous)
+    assert seen == [app.PRIORITY_READ]
+    assert app.get_outbound_priority() == app.PRIORITY_READ
+
+def test_tenant_cannot_take_every_slot(scheduler, monkeypatch):
+    app = scheduler
+    monkeypatch.setattr(app, "SCHEDULER_MAX_CONCURRENT", 3)
+    monkeypatch.setattr(app, "get_bulkhead_settings", lambda tenant: (4, 2))
+    app.acquire_outbound_slot(app.PRIORITY_READ, tenant="slow")
+    app.acquire_outbound_slot(app.PRIORITY_READ, tenant="slow")
+    order = []
+    
+    def worker(tenant):
+        app.acquire_outbound_slot(app.PRIORITY_UPDATE, deadline=time.monotonic() + 5, tenant=tenant)
+        order.append(tenant)
+        app.release_outbound_slot(tenant)
+    
+    # The slow tenant's next call waits at its limit without blocking the other tenant behind it
+    slow = threading.Thread(target=worker, args=("slow",))
+    slow.start()
+    wait_for_waiting(app, app.PRIORITY_UPDATE, 1)
+    other = threading.Thread(target=worker, args=("other",))
+    other.start()
+    other.join(5)
+    assert order == ["other"]
+    assert app.scheduler_state["tenant_running"] == {"slow": 2}
+    
+    app.release_outbound_slot("slow")
+    slow.join(5)
+    app.release_outbound_slot("slow")
+    assert order == ["other", "slow"]
+    assert app.scheduler_state["tenant_running"] == {}
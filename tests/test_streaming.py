@@ -0,0 +1,39 @@
+import json
+import time
+
+import pytest
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+ITEMS = [
+    {"recordId": 1, "name": "Café \"quoted\" [x] {y}", "fields": [{"rows": [1, 2, {"a": "\\"}]}]},
+    -2500.75,
+    "plain string with \\ and ü",
+    [1, [2, [3]]],
+    12345678901234567890,
+    True,
+    None,
+    {},
+]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 4096])
+def test_items_survive_any_chunking(app, chunk_size):
+    data = json.dumps(ITEMS, ensure_ascii=False).encode("utf-8")
+    assert list(app.iter_json_array(split(data, chunk_size))) == ITEMS
+
+def test_whitespace_and_empty_array(app):
+    assert list(app.iter_json_array([b" [ ", b"1 ,\n 2", b" ] "])) == [1, 2]
+    assert list(app.iter_json_array([b"[]"])) == []
+
+def test_rejects_non_array_and_truncated_body(app):
+    with pytest.raises(ValueError):
+        list(app.iter_json_array([b'{"a": 1}']))
+    with pytest.raises(ValueError):
+        list(app.iter_json_array([b'[{"a": 1}, {"b":']))
+
+def test_deadline_is_checked_between_chunks(app):
+    chunks = iter([b"[1,", b"2,", b"3]"])
+    items = app.iter_json_array(chunks, deadline=time.monotonic() - 1)
+    with pytest.raises(app.DeadlineExceeded):
+        next(items)